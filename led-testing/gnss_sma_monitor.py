@@ -3,16 +3,21 @@
 Мониторинг GNSS и SMA статусов с LED индикацией
 """
 
-import subprocess
 import json
 import time
 import sys
 import os
+from pathlib import Path
+
+# Общий модуль доступа к I2C из системы мониторинга
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'quantum-pci-monitoring' / 'api'))
+from i2c_bus import get_bus
 
 class GNSSSMAMonitorFixed:
     def __init__(self, bus=1, addr=0x37):
         self.bus = bus
         self.addr = addr
+        self.i2c = get_bus(bus)
         self.quantum_pci_timecard_sysfs = "/sys/class/timecard/ocp0"
         
         # ИСПРАВЛЕННАЯ схема нумерации LED
@@ -51,33 +56,30 @@ class GNSSSMAMonitorFixed:
     def check_i2c_device(self):
         """Проверка наличия I2C устройства"""
         try:
-            result = subprocess.run(['sudo', 'i2cdetect', '-y', str(self.bus)], 
-                                  capture_output=True, text=True, check=True)
-            # Ищем адрес в формате "37" (как отображается в i2cdetect)
-            return f"{self.addr:02x}" in result.stdout
-        except subprocess.CalledProcessError:
+            return self.i2c.probe(self.addr)
+        except OSError:
             return False
     
     def init_led_controller(self):
         """Инициализация LED контроллера"""
         try:
-            # Включение контроллера
-            subprocess.run(['sudo', 'i2cset', '-y', str(self.bus), f'0x{self.addr:02x}', '0x00', '0x01'], check=True)
-            
-            # Установка глобального тока
-            subprocess.run(['sudo', 'i2cset', '-y', str(self.bus), f'0x{self.addr:02x}', '0x6E', '0xFF'], check=True)
-            
-            # Настройка scaling регистров
-            for i in range(18):
-                reg = 0x4A + i
-                subprocess.run(['sudo', 'i2cset', '-y', str(self.bus), f'0x{self.addr:02x}', f'0x{reg:02x}', '0xFF'], check=True)
-            
-            # Обновление контроллера
-            subprocess.run(['sudo', 'i2cset', '-y', str(self.bus), f'0x{self.addr:02x}', '0x49', '0x00'], check=True)
+            with self.i2c.lock:
+                # Включение контроллера
+                self.i2c.write_byte_data(self.addr, 0x00, 0x01)
+                
+                # Установка глобального тока
+                self.i2c.write_byte_data(self.addr, 0x6E, 0xFF)
+                
+                # Настройка scaling регистров
+                for i in range(18):
+                    self.i2c.write_byte_data(self.addr, 0x4A + i, 0xFF)
+                
+                # Обновление контроллера
+                self.i2c.write_byte_data(self.addr, 0x49, 0x00)
             
             print("✅ LED контроллер инициализирован")
             return True
-        except subprocess.CalledProcessError as e:
+        except OSError as e:
             print(f"❌ Ошибка инициализации LED контроллера: {e}")
             return False
     
@@ -89,17 +91,18 @@ class GNSSSMAMonitorFixed:
         
         try:
             reg = self.led_registers[led_index]
-            subprocess.run(['sudo', 'i2cset', '-y', str(self.bus), f'0x{self.addr:02x}', f'0x{reg:02x}', f'0x{brightness:02x}'], check=True)
-            subprocess.run(['sudo', 'i2cset', '-y', str(self.bus), f'0x{self.addr:02x}', '0x49', '0x00'], check=True)
+            with self.i2c.lock:
+                self.i2c.write_byte_data(self.addr, reg, brightness)
+                self.i2c.write_byte_data(self.addr, 0x49, 0x00)
             return True
-        except subprocess.CalledProcessError as e:
+        except OSError as e:
             print(f"❌ Ошибка установки LED {led_index}: {e}")
             return False
     
     def read_sysfs_value(self, attribute):
         """Чтение значения из sysfs"""
         try:
-                            with open(f"{self.quantum_pci_timecard_sysfs}/{attribute}", 'r') as f:
+            with open(f"{self.quantum_pci_timecard_sysfs}/{attribute}", 'r') as f:
                 return f.read().strip()
         except (FileNotFoundError, PermissionError):
             return None
@@ -4,16 +4,27 @@ LED Monitor для TimeCard
 Интеграция управления светодиодами IS32FL3207 с системой мониторинга
 """
 
-import subprocess
+import sys
 import time
 import json
 import os
 from datetime import datetime
+from pathlib import Path
+
+# Общий модуль доступа к I2C из системы мониторинга
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'quantum-pci-monitoring' / 'api'))
+from i2c_bus import get_bus
+
+# Регистры IS32FL3207
+PWM_FIRST_REG = 0x01      # PWM первого канала
+PWM_LAST_REG = 0x23       # PWM последнего (18-го) канала
+UPDATE_REG = 0x49         # Регистр обновления (защелка PWM/scaling)
 
 class LEDMonitor:
     def __init__(self, bus=1, addr=0x37):
         self.bus = bus
         self.addr = addr
+        self.i2c = get_bus(bus)
         self.pwm_regs = [0x01, 0x03, 0x05, 0x07, 0x09, 0x0B, 0x0D, 0x0F, 
                          0x11, 0x13, 0x15, 0x17, 0x19, 0x1B, 0x1D, 0x1F, 
                          0x21, 0x23]
@@ -24,14 +35,13 @@ class LEDMonitor:
             12: "Info1", 13: "Info2", 14: "Info3", 15: "Info4",
             16: "Test1", 17: "Test2"
         }
+        # Кэш образа регистров PWM_FIRST_REG..PWM_LAST_REG (None - не прочитан)
+        self._pwm_image = None
         
     def check_i2c_device(self):
         """Проверка наличия IS32FL3207"""
         try:
-            result = subprocess.run(['sudo', 'i2cdetect', '-y', str(self.bus)], 
-                                  capture_output=True, text=True)
-            # Ищем адрес 37 в выводе i2cdetect
-            return "37" in result.stdout
+            return self.i2c.probe(self.addr)
         except Exception as e:
             print(f"❌ Ошибка проверки I2C: {e}")
             return False
@@ -39,15 +49,16 @@ class LEDMonitor:
     def init_led_controller(self):
         """Инициализация LED контроллера"""
         try:
-            # Включение чипа
-            subprocess.run(['sudo', 'i2cset', '-y', str(self.bus), f'0x{self.addr:02x}', '0x00', '0x01'])
-            
-            # Global Current Control
-            subprocess.run(['sudo', 'i2cset', '-y', str(self.bus), f'0x{self.addr:02x}', '0x6E', '0xFF'])
-            
-            # Scaling регистры для всех каналов
-            for reg in range(74, 92):
-                subprocess.run(['sudo', 'i2cset', '-y', str(self.bus), f'0x{self.addr:02x}', f'0x{reg:02x}', '0xFF'])
+            with self.i2c.lock:
+                # Включение чипа
+                self.i2c.write_byte_data(self.addr, 0x00, 0x01)
+                
+                # Global Current Control
+                self.i2c.write_byte_data(self.addr, 0x6E, 0xFF)
+                
+                # Scaling регистры для всех каналов
+                for reg in range(74, 92):
+                    self.i2c.write_byte_data(self.addr, reg, 0xFF)
             
             print("✅ LED контроллер инициализирован")
             return True
@@ -55,15 +66,65 @@ class LEDMonitor:
             print(f"❌ Ошибка инициализации: {e}")
             return False
     
+    def read_pwm_registers(self):
+        """
+        Чтение PWM регистров всех 18 каналов одной блочной транзакцией
+        
+        Обновляет кэш образа регистров и возвращает список яркостей.
+        """
+        image = self.i2c.read_block(self.addr, PWM_FIRST_REG, PWM_LAST_REG - PWM_FIRST_REG + 1)
+        self._pwm_image = image
+        return [image[reg - PWM_FIRST_REG] for reg in self.pwm_regs]
+    
+    def write_led_levels(self, levels):
+        """
+        Применение набора яркостей {индекс LED: яркость} с одной защелкой
+        
+        Новые значения сравниваются с кэшем образа регистров: неизменные
+        каналы не перезаписываются, соседние измененные каналы пишутся
+        одной блочной записью, а регистр обновления 0x49 пишется один раз.
+        Возвращает число измененных каналов.
+        """
+        with self.i2c.lock:
+            if self._pwm_image is None:
+                self.read_pwm_registers()
+            image = list(self._pwm_image)
+            
+            changed = sorted(
+                index for index, brightness in levels.items()
+                if image[self.pwm_regs[index] - PWM_FIRST_REG] != (brightness & 0xFF)
+            )
+            if not changed:
+                return 0
+            
+            for index in changed:
+                image[self.pwm_regs[index] - PWM_FIRST_REG] = levels[index] & 0xFF
+            
+            # Группировка соседних каналов в непрерывные блоки записи
+            runs = []
+            for index in changed:
+                if runs and index == runs[-1][1] + 1:
+                    runs[-1][1] = index
+                else:
+                    runs.append([index, index])
+            
+            for first, last in runs:
+                start = self.pwm_regs[first] - PWM_FIRST_REG
+                end = self.pwm_regs[last] - PWM_FIRST_REG
+                self.i2c.write_block(self.addr, self.pwm_regs[first], image[start:end + 1])
+            self.i2c.write_byte_data(self.addr, UPDATE_REG, 0x00)
+            
+            self._pwm_image = image
+            return len(changed)
+    
     def read_led_status(self, led_index):
         """Чтение статуса конкретного LED"""
         try:
             reg = self.pwm_regs[led_index]
-            result = subprocess.run(['sudo', 'i2cget', '-y', str(self.bus), f'0x{self.addr:02x}', f'0x{reg:02x}'], 
-                                  capture_output=True, text=True)
-            if result.returncode == 0:
-                return int(result.stdout.strip(), 16)
-            return 0
+            brightness = self.i2c.read_byte_data(self.addr, reg)
+            if self._pwm_image is not None:
+                self._pwm_image[reg - PWM_FIRST_REG] = brightness
+            return brightness
         except Exception as e:
             print(f"❌ Ошибка чтения LED {led_index}: {e}")
             return 0
@@ -71,9 +132,7 @@ class LEDMonitor:
     def set_led_brightness(self, led_index, brightness):
         """Установка яркости LED"""
         try:
-            reg = self.pwm_regs[led_index]
-            subprocess.run(['sudo', 'i2cset', '-y', str(self.bus), f'0x{self.addr:02x}', f'0x{reg:02x}', f'0x{brightness:02x}'])
-            subprocess.run(['sudo', 'i2cset', '-y', str(self.bus), f'0x{self.addr:02x}', '0x49', '0x00'])
+            self.write_led_levels({led_index: brightness})
             return True
         except Exception as e:
             print(f"❌ Ошибка установки LED {led_index}: {e}")
@@ -81,14 +140,24 @@ class LEDMonitor:
     
     def turn_off_all_leds(self):
         """Выключение всех LED"""
-        for i in range(18):
-            self.set_led_brightness(i, 0)
+        try:
+            self.write_led_levels({i: 0 for i in range(18)})
+            return True
+        except Exception as e:
+            print(f"❌ Ошибка выключения LED: {e}")
+            return False
     
     def get_all_led_status(self):
         """Получение статуса всех LED"""
+        try:
+            levels = self.read_pwm_registers()
+        except Exception as e:
+            print(f"❌ Ошибка чтения PWM регистров: {e}")
+            levels = [0] * 18
+        
         status = {}
         for i in range(18):
-            brightness = self.read_led_status(i)
+            brightness = levels[i]
             led_name = self.led_names.get(i, f"LED{i+1}")
             
             # Определение состояния
@@ -114,33 +183,35 @@ class LEDMonitor:
     def set_led_pattern(self, pattern_name):
         """Установка предопределенных паттернов LED"""
         patterns = {
-            "all_off": lambda: [self.set_led_brightness(i, 0) for i in range(18)],
-            "all_on": lambda: [self.set_led_brightness(i, 0xFF) for i in range(18)],
-            "power_on": lambda: [
-                self.set_led_brightness(0, 0xFF),  # Power LED
-                self.set_led_brightness(1, 0x80),  # Sync LED
-                self.set_led_brightness(2, 0x80),  # GNSS LED
-                self.set_led_brightness(3, 0x00)   # Alarm LED
-            ],
-            "error": lambda: [
-                self.set_led_brightness(0, 0xFF),  # Power LED
-                self.set_led_brightness(1, 0x00),  # Sync LED
-                self.set_led_brightness(2, 0x00),  # GNSS LED
-                self.set_led_brightness(3, 0xFF)   # Alarm LED
-            ],
-            "warning": lambda: [
-                self.set_led_brightness(0, 0xFF),  # Power LED
-                self.set_led_brightness(1, 0x80),  # Sync LED
-                self.set_led_brightness(2, 0x40),  # GNSS LED
-                self.set_led_brightness(3, 0x80)   # Alarm LED
-            ],
-            "test": lambda: [
-                self.set_led_brightness(i, 0x80 if i % 2 == 0 else 0x00) for i in range(18)
-            ]
+            "all_off": {i: 0 for i in range(18)},
+            "all_on": {i: 0xFF for i in range(18)},
+            "power_on": {
+                0: 0xFF,  # Power LED
+                1: 0x80,  # Sync LED
+                2: 0x80,  # GNSS LED
+                3: 0x00   # Alarm LED
+            },
+            "error": {
+                0: 0xFF,  # Power LED
+                1: 0x00,  # Sync LED
+                2: 0x00,  # GNSS LED
+                3: 0xFF   # Alarm LED
+            },
+            "warning": {
+                0: 0xFF,  # Power LED
+                1: 0x80,  # Sync LED
+                2: 0x40,  # GNSS LED
+                3: 0x80   # Alarm LED
+            },
+            "test": {i: 0x80 if i % 2 == 0 else 0x00 for i in range(18)}
         }
         
         if pattern_name in patterns:
-            patterns[pattern_name]()
+            try:
+                self.write_led_levels(patterns[pattern_name])
+            except Exception as e:
+                print(f"❌ Ошибка установки паттерна {pattern_name}: {e}")
+                return False
             print(f"✅ Установлен паттерн: {pattern_name}")
             return True
         else:
@@ -225,8 +296,7 @@ def main():
     
     # Выключение всех LED
     print("\n🔚 Выключение всех LED...")
-    for i in range(18):
-        monitor.set_led_brightness(i, 0)
+    monitor.turn_off_all_leds()
     
     print("✅ Все LED выключены")
     print("🎉 Демонстрация завершена!")
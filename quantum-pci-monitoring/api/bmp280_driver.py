@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+BMP280 Native Driver
+Python драйвер BMP280 поверх общего модуля i2c_bus (без bmp280_driver.sh)
+"""
+
+import struct
+import threading
+import time
+from typing import Dict, Optional
+
+from i2c_bus import get_bus
+
+# Регистры BMP280
+REG_CALIB_START = 0x88   # dig_T1..dig_P9 (24 байта)
+REG_CHIP_ID = 0xD0
+REG_CTRL_MEAS = 0xF4
+REG_CONFIG = 0xF5
+REG_DATA_START = 0xF7    # press_msb..temp_xlsb (6 байт)
+
+# Допустимые идентификаторы чипа (BMP280 и совместимый BME280)
+CHIP_IDS = (0x56, 0x57, 0x58, 0x60)
+
+# Те же настройки, что записывал bmp280_driver.sh:
+# oversampling x16 для T и P, normal mode, фильтр x16
+CTRL_MEAS_VALUE = 0xFF
+CONFIG_VALUE = 0xFF
+
+
+def _div_trunc(numerator: int, denominator: int) -> int:
+    """Целочисленное деление с округлением к нулю, как в C"""
+    quotient = abs(numerator) // abs(denominator)
+    return quotient if (numerator >= 0) == (denominator > 0) else -quotient
+
+
+def compensate(adc_t: int, adc_p: int, calibration: Dict[str, int]) -> Dict[str, Optional[float]]:
+    """
+    Компенсация сырых значений по целочисленным формулам даташита BMP280
+
+    Возвращает температуру в °C и давление в Па (None, если давление
+    не может быть вычислено).
+    """
+    t1, t2, t3 = calibration['dig_T1'], calibration['dig_T2'], calibration['dig_T3']
+    var1 = (((adc_t >> 3) - (t1 << 1)) * t2) >> 11
+    var2 = (((((adc_t >> 4) - t1) * ((adc_t >> 4) - t1)) >> 12) * t3) >> 14
+    t_fine = var1 + var2
+    temperature = ((t_fine * 5 + 128) >> 8) / 100
+
+    var1 = t_fine - 128000
+    var2 = var1 * var1 * calibration['dig_P6']
+    var2 = var2 + ((var1 * calibration['dig_P5']) << 17)
+    var2 = var2 + (calibration['dig_P4'] << 35)
+    var1 = ((var1 * var1 * calibration['dig_P3']) >> 8) + ((var1 * calibration['dig_P2']) << 12)
+    var1 = (((1 << 47) + var1) * calibration['dig_P1']) >> 33
+    if var1 == 0:
+        return {'temperature_c': temperature, 'pressure_pa': None}
+
+    p = 1048576 - adc_p
+    p = _div_trunc(((p << 31) - var2) * 3125, var1)
+    var1 = (calibration['dig_P9'] * (p >> 13) * (p >> 13)) >> 25
+    var2 = (calibration['dig_P8'] * p) >> 19
+    p = ((p + var1 + var2) >> 8) + (calibration['dig_P7'] << 4)
+
+    return {'temperature_c': temperature, 'pressure_pa': p / 256}
+
+
+class BMP280Driver:
+    """
+    Драйвер BMP280 с постоянной инициализацией
+
+    Датчик настраивается один раз, калибровочные коэффициенты читаются
+    одной блочной транзакцией и кэшируются, а каждое измерение - это одно
+    блочное чтение 6 байт данных.
+    """
+
+    def __init__(self, bus_number: int = 1, address: int = 0x76):
+        self.bus_number = bus_number
+        self.address = address
+        self.calibration = None
+        self.chip_id = None
+        self.initialized = False
+        self._lock = threading.Lock()
+
+    @property
+    def bus(self):
+        return get_bus(self.bus_number)
+
+    def initialize(self) -> None:
+        """Выбор каналов мультиплексора, проверка чипа и настройка измерений"""
+        bus = self.bus
+        with bus.lock:
+            try:
+                bus.select_mux_channels()
+            except OSError:
+                # Мультиплексор может отсутствовать (как и в bmp280_driver.sh)
+                pass
+            chip_id = bus.read_byte_data(self.address, REG_CHIP_ID)
+            if chip_id not in CHIP_IDS:
+                raise OSError(f"Неожиданный chip id BMP280: 0x{chip_id:02x}")
+            bus.write_byte_data(self.address, REG_CONFIG, CONFIG_VALUE)
+            bus.write_byte_data(self.address, REG_CTRL_MEAS, CTRL_MEAS_VALUE)
+        self.chip_id = chip_id
+        self.initialized = True
+
+    def read_calibration(self) -> Dict[str, int]:
+        """Чтение калибровочных коэффициентов dig_T1..dig_P9 одной транзакцией"""
+        raw = bytes(self.bus.read_i2c_block_data(self.address, REG_CALIB_START, 24))
+        values = struct.unpack('<HhhHhhhhhhhh', raw)
+        names = ['dig_T1', 'dig_T2', 'dig_T3', 'dig_P1', 'dig_P2', 'dig_P3',
+                 'dig_P4', 'dig_P5', 'dig_P6', 'dig_P7', 'dig_P8', 'dig_P9']
+        return dict(zip(names, values))
+
+    def read_raw(self):
+        """Чтение сырых значений давления и температуры (adc_P, adc_T)"""
+        data = self.bus.read_i2c_block_data(self.address, REG_DATA_START, 6)
+        adc_p = (data[0] << 12) | (data[1] << 4) | (data[2] >> 4)
+        adc_t = (data[3] << 12) | (data[4] << 4) | (data[5] >> 4)
+        return adc_p, adc_t
+
+    def read(self) -> Dict[str, Optional[float]]:
+        """
+        Измерение температуры и давления
+
+        При ошибке шины драйвер сбрасывает признак инициализации, и
+        следующее измерение заново настроит датчик.
+        """
+        with self._lock:
+            try:
+                if not self.initialized:
+                    self.initialize()
+                if self.calibration is None:
+                    self.calibration = self.read_calibration()
+                adc_p, adc_t = self.read_raw()
+            except OSError:
+                self.initialized = False
+                raise
+        reading = compensate(adc_t, adc_p, self.calibration)
+        reading['timestamp'] = time.time()
+        return reading
@@ -4,20 +4,20 @@ BMP280 Sensor Monitor Module
 Модуль для мониторинга датчика BMP280 (температура и давление)
 """
 
-import os
-import subprocess
-import time
-import json
-from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Dict, Optional
+
+from bmp280_driver import BMP280Driver
 
 class BMP280Monitor:
     """
     Мониторинг датчика BMP280 через I2C
+
+    Датчик читается нативным драйвером BMP280Driver: устройство
+    инициализируется один раз, калибровочные коэффициенты кэшируются.
     """
     
-    def __init__(self):
-        self.driver_script = "/home/shiwa-time/QuantumPCI-DRV/bmp280-sensor/bmp280_driver.sh"
+    def __init__(self, bus_number: int = 1, address: int = 0x76):
+        self.driver = BMP280Driver(bus_number, address)
         self.last_reading = None
         self.last_update = None
         self.error_count = 0
@@ -25,95 +25,39 @@ class BMP280Monitor:
         
     def is_available(self) -> bool:
         """Проверка доступности датчика BMP280"""
+        if self.driver.initialized:
+            return True
         try:
-            # Проверяем наличие драйвера
-            if not os.path.exists(self.driver_script):
-                return False
-                
-            # Проверяем права на выполнение
-            if not os.access(self.driver_script, os.X_OK):
-                return False
-                
-            # Проверяем наличие i2c-tools
-            result = subprocess.run(['which', 'i2cget'], 
-                                  capture_output=True, text=True)
-            if result.returncode != 0:
+            if not self.driver.bus.is_present():
                 return False
-                
+            self.driver.initialize()
             return True
-            
+        except OSError:
+            return False
         except Exception as e:
             print(f"❌ Ошибка проверки доступности BMP280: {e}")
             return False
     
+    def _read(self) -> Optional[Dict]:
+        """Одно измерение через драйвер (None при ошибке шины)"""
+        try:
+            return self.driver.read()
+        except OSError:
+            return None
+    
     def get_sensor_data(self) -> Dict:
         """
         Получение данных с датчика BMP280
         
         Returns:
-            Dict с данными датчика или None при ошибке
+            Dict с данными датчика или описанием ошибки
         """
         try:
-            # Выполняем команду получения всех данных
-            result = subprocess.run(
-                [self.driver_script, 'all'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            
-            if result.returncode != 0:
-                self.error_count += 1
-                return {
-                    'error': f'Ошибка выполнения драйвера: {result.stderr}',
-                    'available': False
-                }
-            
-            # Парсим вывод
-            output = result.stdout
-            temperature = None
-            pressure = None
-            
-            for line in output.split('\n'):
-                if 'Температура' in line and '°C' in line:
-                    try:
-                        temp_str = line.split('=')[1].strip().replace('°C', '').replace(' ', '')
-                        temperature = float(temp_str)
-                    except (IndexError, ValueError):
-                        pass
-                        
-                elif 'Давление' in line and 'Па' in line:
-                    try:
-                        press_str = line.split('=')[1].strip().replace('Па', '').replace(' ', '')
-                        pressure = float(press_str)
-                    except (IndexError, ValueError):
-                        pass
-            
-            if temperature is not None and pressure is not None:
-                self.last_reading = {
-                    'temperature_c': temperature,
-                    'pressure_pa': pressure,
-                    'pressure_hpa': pressure / 100,
-                    'pressure_mbar': pressure / 100,
-                    'timestamp': time.time(),
-                    'available': True,
-                    'error_count': self.error_count
-                }
-                self.last_update = time.time()
-                self.error_count = 0
-                return self.last_reading
-            else:
-                self.error_count += 1
-                return {
-                    'error': 'Не удалось распарсить данные датчика',
-                    'available': False,
-                    'error_count': self.error_count
-                }
-                
-        except subprocess.TimeoutExpired:
+            reading = self.driver.read()
+        except OSError as e:
             self.error_count += 1
             return {
-                'error': 'Таймаут выполнения команды',
+                'error': f'Ошибка чтения BMP280 по I2C: {e}',
                 'available': False,
                 'error_count': self.error_count
             }
@@ -124,15 +68,39 @@ class BMP280Monitor:
                 'available': False,
                 'error_count': self.error_count
             }
+        
+        pressure = reading['pressure_pa']
+        if pressure is None:
+            self.error_count += 1
+            return {
+                'error': 'Некорректные калибровочные коэффициенты датчика',
+                'available': False,
+                'error_count': self.error_count
+            }
+        
+        self.last_reading = {
+            'temperature_c': reading['temperature_c'],
+            'pressure_pa': pressure,
+            'pressure_hpa': pressure / 100,
+            'pressure_mbar': pressure / 100,
+            'timestamp': reading['timestamp'],
+            'available': True,
+            'error_count': self.error_count
+        }
+        self.last_update = reading['timestamp']
+        self.error_count = 0
+        return self.last_reading
     
     def get_sensor_info(self) -> Dict:
         """Получение информации о датчике"""
         return {
             'name': 'BMP280',
             'type': 'Barometric Pressure & Temperature Sensor',
-            'i2c_address': '0x76',
-            'i2c_bus': '1',
-            'driver_script': self.driver_script,
+            'i2c_address': f'0x{self.driver.address:02x}',
+            'i2c_bus': str(self.driver.bus_number),
+            'driver': 'native (i2c_bus)',
+            'chip_id': f'0x{self.driver.chip_id:02x}' if self.driver.chip_id is not None else None,
+            'calibration_cached': self.driver.calibration is not None,
             'available': self.is_available(),
             'last_update': self.last_update,
             'error_count': self.error_count
@@ -140,47 +108,13 @@ class BMP280Monitor:
     
     def get_temperature_only(self) -> Optional[float]:
         """Получение только температуры"""
-        try:
-            result = subprocess.run(
-                [self.driver_script, 'temp'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            
-            if result.returncode == 0:
-                for line in result.stdout.split('\n'):
-                    if 'Температура' in line and '°C' in line:
-                        try:
-                            temp_str = line.split('=')[1].strip().replace('°C', '').replace(' ', '')
-                            return float(temp_str)
-                        except (IndexError, ValueError):
-                            pass
-        except Exception:
-            pass
-        return None
+        reading = self._read()
+        return reading['temperature_c'] if reading else None
     
     def get_pressure_only(self) -> Optional[float]:
         """Получение только давления"""
-        try:
-            result = subprocess.run(
-                [self.driver_script, 'press'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            
-            if result.returncode == 0:
-                for line in result.stdout.split('\n'):
-                    if 'Давление' in line and 'Па' in line:
-                        try:
-                            press_str = line.split('=')[1].strip().replace('Па', '').replace(' ', '')
-                            return float(press_str)
-                        except (IndexError, ValueError):
-                            pass
-        except Exception:
-            pass
-        return None
+        reading = self._read()
+        return reading['pressure_pa'] if reading else None
 
 # Глобальный экземпляр монитора
 bmp280_monitor = BMP280Monitor()
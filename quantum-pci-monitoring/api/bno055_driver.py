@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+BNO055 Native Driver
+Python драйвер BNO055 поверх общего модуля i2c_bus (без bno055_driver.sh)
+"""
+
+import struct
+import threading
+import time
+from typing import Dict
+
+from i2c_bus import get_bus
+
+# Регистры BNO055 (страница 0)
+REG_CHIP_ID = 0x00
+REG_PAGE_ID = 0x07
+REG_DATA_START = 0x08    # ACC_DATA_X_LSB - начало блока данных
+REG_CALIB_STAT = 0x35
+REG_SYS_STATUS = 0x39
+REG_SYS_ERR = 0x3A
+REG_OPR_MODE = 0x3D
+REG_PWR_MODE = 0x3E
+
+CHIP_ID = 0xA0
+MODE_CONFIG = 0x00
+MODE_NDOF = 0x0C
+
+# Блок 0x08..0x3E: все измерения, калибровка, статус и режимы за одно чтение
+DATA_BLOCK_LENGTH = REG_PWR_MODE - REG_DATA_START + 1
+
+OPERATION_MODES = {
+    0x00: 'CONFIG', 0x01: 'ACCONLY', 0x02: 'MAGONLY', 0x03: 'GYROONLY',
+    0x04: 'ACCMAG', 0x05: 'ACCGYRO', 0x06: 'MAGGYRO', 0x07: 'AMG',
+    0x08: 'IMU', 0x09: 'COMPASS', 0x0A: 'M4G', 0x0B: 'NDOF_FMC_OFF',
+    0x0C: 'NDOF'
+}
+POWER_MODES = {0x00: 'NORMAL', 0x01: 'LOW_POWER', 0x02: 'SUSPEND'}
+
+
+def _vector(raw: bytes, offset: int, scale: float) -> Dict[str, float]:
+    x, y, z = struct.unpack_from('<hhh', raw, offset)
+    return {'x': x / scale, 'y': y / scale, 'z': z / scale}
+
+
+def parse_calibration(value: int) -> Dict[str, int]:
+    """Разбор регистра CALIB_STAT: SYS[7:6], GYR[5:4], ACC[3:2], MAG[1:0]"""
+    return {
+        'system': (value >> 6) & 0x03,
+        'gyro': (value >> 4) & 0x03,
+        'accel': (value >> 2) & 0x03,
+        'mag': value & 0x03
+    }
+
+
+def parse_data_block(raw: bytes) -> Dict:
+    """Разбор блока регистров 0x08..0x3E в структуру данных датчика"""
+    def at(register):
+        return register - REG_DATA_START
+
+    heading, roll, pitch = struct.unpack_from('<hhh', raw, at(0x1A))
+    w, x, y, z = struct.unpack_from('<hhhh', raw, at(0x20))
+    operation_mode = raw[at(REG_OPR_MODE)] & 0x0F
+    power_mode = raw[at(REG_PWR_MODE)] & 0x03
+
+    return {
+        'timestamp': time.time(),
+        'euler_angles': {'heading': heading / 16, 'roll': roll / 16, 'pitch': pitch / 16},
+        'quaternions': {'w': w / 16384, 'x': x / 16384, 'y': y / 16384, 'z': z / 16384},
+        'linear_acceleration': _vector(raw, at(0x28), 100),
+        'gravity_vector': _vector(raw, at(0x2E), 100),
+        'accelerometer': _vector(raw, at(0x08), 100),
+        'gyroscope': _vector(raw, at(0x14), 16),
+        'magnetometer': _vector(raw, at(0x0E), 16),
+        'temperature': struct.unpack_from('<b', raw, at(0x34))[0],
+        'calibration_status': parse_calibration(raw[at(REG_CALIB_STAT)]),
+        'operation_mode': OPERATION_MODES.get(operation_mode, f'0x{operation_mode:02x}'),
+        'power_mode': POWER_MODES.get(power_mode, f'0x{power_mode:02x}'),
+        'system_status': raw[at(REG_SYS_STATUS)],
+        'system_error': raw[at(REG_SYS_ERR)]
+    }
+
+
+class BNO055Driver:
+    """
+    Драйвер BNO055 с постоянной инициализацией
+
+    Датчик переводится в режим NDOF один раз; в отличие от
+    bno055_driver.sh, сброс (SYS_TRIGGER) не выполняется при каждом
+    вызове, поэтому накопленная калибровка fusion не теряется.
+    """
+
+    def __init__(self, bus_number: int = 1, address: int = 0x29):
+        self.bus_number = bus_number
+        self.address = address
+        self.initialized = False
+        self._lock = threading.Lock()
+
+    @property
+    def bus(self):
+        return get_bus(self.bus_number)
+
+    def initialize(self) -> None:
+        """Выбор каналов мультиплексора, проверка чипа и перевод в NDOF"""
+        bus = self.bus
+        with bus.lock:
+            try:
+                bus.select_mux_channels()
+            except OSError:
+                pass
+            chip_id = bus.read_byte_data(self.address, REG_CHIP_ID)
+            if chip_id != CHIP_ID:
+                raise OSError(f"Неожиданный chip id BNO055: 0x{chip_id:02x}")
+            bus.write_byte_data(self.address, REG_PAGE_ID, 0x00)
+            if bus.read_byte_data(self.address, REG_OPR_MODE) & 0x0F != MODE_NDOF:
+                bus.write_byte_data(self.address, REG_OPR_MODE, MODE_CONFIG)
+                time.sleep(0.025)
+                bus.write_byte_data(self.address, REG_OPR_MODE, MODE_NDOF)
+                time.sleep(0.02)
+        self.initialized = True
+
+    def _read(self, register: int, length: int) -> bytes:
+        with self._lock:
+            try:
+                if not self.initialized:
+                    self.initialize()
+                return bytes(self.bus.read_block(self.address, register, length))
+            except OSError:
+                self.initialized = False
+                raise
+
+    def read_all(self) -> Dict:
+        """Все измерения, калибровка и режимы одной блочной транзакцией"""
+        return parse_data_block(self._read(REG_DATA_START, DATA_BLOCK_LENGTH))
+
+    def read_calibration(self) -> Dict[str, int]:
+        """Статус калибровки (один байт CALIB_STAT)"""
+        return parse_calibration(self._read(REG_CALIB_STAT, 1)[0])
+
+    def read_modes(self) -> Dict[str, str]:
+        """Режим работы и режим питания (регистры 0x3D..0x3E)"""
+        raw = self._read(REG_OPR_MODE, 2)
+        operation_mode, power_mode = raw[0] & 0x0F, raw[1] & 0x03
+        return {
+            'operation_mode': OPERATION_MODES.get(operation_mode, f'0x{operation_mode:02x}'),
+            'power_mode': POWER_MODES.get(power_mode, f'0x{power_mode:02x}')
+        }
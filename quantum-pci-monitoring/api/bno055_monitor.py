@@ -4,142 +4,99 @@ BNO055 Sensor Monitor Module
 Модуль для мониторинга датчика BNO055 (9-DOF IMU с fusion алгоритмом)
 """
 
-import os
-import subprocess
+import threading
 import time
-import json
-from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Dict, Optional
+
+from bno055_driver import BNO055Driver
 
 class BNO055Monitor:
     """
     Мониторинг датчика BNO055 через I2C
     Поддерживает чтение ориентации, ускорения, гироскопа и магнетометра
+    
+    Датчик читается нативным драйвером BNO055Driver: режим NDOF
+    выставляется один раз, все данные читаются одной блочной транзакцией.
+    Экземпляр долгоживущий (см. bno055_monitor ниже): доступность
+    проверяется один раз и перепроверяется после ошибки с нарастающей
+    паузой, а калибровка и режимы берутся из того же fused чтения.
     """
     
-    def __init__(self):
-        self.driver_script = "/home/shiwa-time/QuantumPCI-DRV/bno055-sensor/bno055_driver.sh"
+    def __init__(self, bus_number: int = 1, address: int = 0x29,
+                 reading_max_age: float = 1.0, probe_backoff: float = 1.0,
+                 max_probe_backoff: float = 60.0):
+        self.driver = BNO055Driver(bus_number, address)
         self.last_reading = None
         self.last_update = None
         self.error_count = 0
         self.max_errors = 5
+        # Повторное использование fused чтения в пределах reading_max_age секунд
+        self.reading_max_age = reading_max_age
+        # Кэш доступности: None - еще не проверялась
+        self.available = None
+        self.next_probe = 0.0
+        self.initial_probe_backoff = probe_backoff
+        self.probe_backoff = probe_backoff
+        self.max_probe_backoff = max_probe_backoff
+        self._lock = threading.Lock()
         
+    def _schedule_probe(self):
+        """Пометка датчика недоступным и планирование повторной проверки"""
+        self.available = False
+        self.next_probe = time.monotonic() + self.probe_backoff
+        self.probe_backoff = min(self.probe_backoff * 2, self.max_probe_backoff)
+    
     def is_available(self) -> bool:
-        """Проверка доступности датчика BNO055"""
-        try:
-            # Проверяем наличие драйвера
-            if not os.path.exists(self.driver_script):
+        """Проверка доступности датчика BNO055 (с кэшированием результата)"""
+        if self.available:
+            return True
+        if self.available is False and time.monotonic() < self.next_probe:
+            return False
+        with self._lock:
+            try:
+                if not self.driver.bus.is_present():
+                    self._schedule_probe()
+                    return False
+                self.driver.initialize()
+            except OSError:
+                self._schedule_probe()
                 return False
-                
-            # Проверяем права на выполнение
-            if not os.access(self.driver_script, os.X_OK):
+            except Exception as e:
+                print(f"BNO055 availability check error: {e}")
+                self._schedule_probe()
                 return False
-                
-            # Пробуем запустить драйвер для проверки
-            result = subprocess.run(
-                [self.driver_script, "status"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            
-            return result.returncode == 0
-            
-        except (subprocess.TimeoutExpired, subprocess.CalledProcessError, FileNotFoundError):
-            return False
-        except Exception as e:
-            print(f"BNO055 availability check error: {e}")
-            return False
+            self.available = True
+            self.probe_backoff = self.initial_probe_backoff
+            return True
     
-    def _read_sensor_data(self) -> Optional[Dict]:
-        """Чтение данных с датчика BNO055"""
-        try:
-            # Запускаем драйвер для получения данных
-            result = subprocess.run(
-                [self.driver_script, "read"],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            
-            if result.returncode != 0:
+    def read_fused(self, max_age: float = 0.0) -> Optional[Dict]:
+        """
+        Fused чтение всех данных датчика одной транзакцией
+        
+        Если последнее чтение моложе max_age секунд, оно возвращается без
+        обращения к шине. При ошибке датчик помечается недоступным до
+        следующей перепроверки.
+        """
+        with self._lock:
+            if (self.last_reading is not None and max_age > 0 and
+                    time.time() - self.last_update < max_age):
+                return self.last_reading
+            try:
+                reading = self.driver.read_all()
+            except OSError:
                 self.error_count += 1
+                self._schedule_probe()
                 return None
-                
-            # Парсим вывод драйвера
-            output = result.stdout.strip()
-            if not output:
+            except Exception as e:
+                print(f"BNO055 read error: {e}")
                 self.error_count += 1
                 return None
-                
-            # Парсим JSON данные (если драйвер возвращает JSON)
-            try:
-                data = json.loads(output)
-                return data
-            except json.JSONDecodeError:
-                # Если не JSON, парсим текстовый вывод
-                return self._parse_text_output(output)
-                
-        except subprocess.TimeoutExpired:
-            self.error_count += 1
-            return None
-        except Exception as e:
-            print(f"BNO055 read error: {e}")
-            self.error_count += 1
-            return None
-    
-    def _parse_text_output(self, output: str) -> Dict:
-        """Парсинг текстового вывода драйвера"""
-        data = {
-            "timestamp": time.time(),
-            "euler_angles": {"heading": 0, "roll": 0, "pitch": 0},
-            "quaternions": {"w": 0, "x": 0, "y": 0, "z": 0},
-            "linear_acceleration": {"x": 0, "y": 0, "z": 0},
-            "gravity_vector": {"x": 0, "y": 0, "z": 0},
-            "accelerometer": {"x": 0, "y": 0, "z": 0},
-            "gyroscope": {"x": 0, "y": 0, "z": 0},
-            "magnetometer": {"x": 0, "y": 0, "z": 0},
-            "temperature": 0,
-            "calibration_status": {"system": 0, "gyro": 0, "accel": 0, "mag": 0},
-            "operation_mode": "unknown",
-            "power_mode": "unknown"
-        }
-        
-        lines = output.split('\n')
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Парсим различные типы данных
-            if "Heading:" in line:
-                try:
-                    data["euler_angles"]["heading"] = float(line.split(":")[1].strip())
-                except (ValueError, IndexError):
-                    pass
-            elif "Roll:" in line:
-                try:
-                    data["euler_angles"]["roll"] = float(line.split(":")[1].strip())
-                except (ValueError, IndexError):
-                    pass
-            elif "Pitch:" in line:
-                try:
-                    data["euler_angles"]["pitch"] = float(line.split(":")[1].strip())
-                except (ValueError, IndexError):
-                    pass
-            elif "Temperature:" in line:
-                try:
-                    data["temperature"] = float(line.split(":")[1].strip())
-                except (ValueError, IndexError):
-                    pass
-            elif "Operation Mode:" in line:
-                data["operation_mode"] = line.split(":")[1].strip()
-            elif "Power Mode:" in line:
-                data["power_mode"] = line.split(":")[1].strip()
-                
-        return data
+            self.last_reading = reading
+            self.last_update = reading['timestamp']
+            self.error_count = 0
+            return reading
     
-    def get_sensor_data(self) -> Dict:
+    def get_sensor_data(self, max_age: float = 0.0) -> Dict:
         """Получение данных с датчика BNO055"""
         if not self.is_available():
             return {
@@ -148,8 +105,7 @@ class BNO055Monitor:
                 "timestamp": time.time()
             }
         
-        # Читаем данные с датчика
-        sensor_data = self._read_sensor_data()
+        sensor_data = self.read_fused(max_age)
         
         if sensor_data is None:
             return {
@@ -158,13 +114,6 @@ class BNO055Monitor:
                 "timestamp": time.time()
             }
         
-        # Сбрасываем счетчик ошибок при успешном чтении
-        if self.error_count > 0:
-            self.error_count = 0
-            
-        self.last_reading = sensor_data
-        self.last_update = time.time()
-        
         return {
             "available": True,
             "data": sensor_data,
@@ -178,9 +127,9 @@ class BNO055Monitor:
             "name": "BNO055",
             "type": "9-DOF IMU Sensor",
             "description": "Bosch BNO055 9-DOF IMU с fusion алгоритмом",
-            "i2c_bus": 1,
-            "i2c_address": "0x29",
-            "driver_script": self.driver_script,
+            "i2c_bus": self.driver.bus_number,
+            "i2c_address": f"0x{self.driver.address:02x}",
+            "driver": "native (i2c_bus)",
             "features": [
                 "Euler angles (Heading, Roll, Pitch)",
                 "Quaternions (W, X, Y, Z)",
@@ -198,131 +147,57 @@ class BNO055Monitor:
             "error_count": self.error_count
         }
     
-    def get_calibration_status(self) -> Dict:
-        """Получение статуса калибровки"""
-        if not self.is_available():
-            return {
-                "available": False,
-                "error": "BNO055 sensor not available",
-                "timestamp": time.time()
-            }
+    def get_calibration_status(self, sensor_data: Optional[Dict] = None) -> Dict:
+        """
+        Получение статуса калибровки
         
-        try:
-            # Запускаем драйвер для получения статуса калибровки
-            result = subprocess.run(
-                [self.driver_script, "calibration"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            
-            if result.returncode != 0:
-                return {
-                    "available": False,
-                    "error": "Failed to get calibration status",
-                    "timestamp": time.time()
-                }
-            
-            # Парсим статус калибровки
-            output = result.stdout.strip()
-            calibration_data = {
-                "system": 0,
-                "gyro": 0,
-                "accel": 0,
-                "mag": 0,
-                "timestamp": time.time()
-            }
-            
-            lines = output.split('\n')
-            for line in lines:
-                line = line.strip()
-                if "System:" in line:
-                    try:
-                        calibration_data["system"] = int(line.split(":")[1].strip())
-                    except (ValueError, IndexError):
-                        pass
-                elif "Gyro:" in line:
-                    try:
-                        calibration_data["gyro"] = int(line.split(":")[1].strip())
-                    except (ValueError, IndexError):
-                        pass
-                elif "Accel:" in line:
-                    try:
-                        calibration_data["accel"] = int(line.split(":")[1].strip())
-                    except (ValueError, IndexError):
-                        pass
-                elif "Mag:" in line:
-                    try:
-                        calibration_data["mag"] = int(line.split(":")[1].strip())
-                    except (ValueError, IndexError):
-                        pass
-            
-            return {
-                "available": True,
-                "calibration": calibration_data,
-                "timestamp": time.time()
-            }
-            
-        except Exception as e:
-            return {
-                "available": False,
-                "error": f"Calibration status error: {e}",
-                "timestamp": time.time()
-            }
+        sensor_data - готовый результат get_sensor_data (например, из
+        снимка сэмплера); без него используется fused чтение.
+        """
+        if sensor_data is None:
+            sensor_data = self.get_sensor_data(self.reading_max_age)
+        if not sensor_data.get("available"):
+            return sensor_data
+        
+        reading = sensor_data["data"]
+        return {
+            "available": True,
+            "calibration": dict(reading["calibration_status"], timestamp=reading["timestamp"]),
+            "timestamp": time.time()
+        }
     
-    def get_operation_mode(self) -> Dict:
-        """Получение режима работы"""
-        if not self.is_available():
-            return {
-                "available": False,
-                "error": "BNO055 sensor not available",
-                "timestamp": time.time()
-            }
+    def get_operation_mode(self, sensor_data: Optional[Dict] = None) -> Dict:
+        """Получение режима работы (см. get_calibration_status)"""
+        if sensor_data is None:
+            sensor_data = self.get_sensor_data(self.reading_max_age)
+        if not sensor_data.get("available"):
+            return sensor_data
         
-        try:
-            # Запускаем драйвер для получения режима работы
-            result = subprocess.run(
-                [self.driver_script, "mode"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            
-            if result.returncode != 0:
-                return {
-                    "available": False,
-                    "error": "Failed to get operation mode",
-                    "timestamp": time.time()
-                }
-            
-            # Парсим режим работы
-            output = result.stdout.strip()
-            mode_data = {
-                "operation_mode": "unknown",
-                "power_mode": "unknown",
-                "timestamp": time.time()
-            }
-            
-            lines = output.split('\n')
-            for line in lines:
-                line = line.strip()
-                if "Operation Mode:" in line:
-                    mode_data["operation_mode"] = line.split(":")[1].strip()
-                elif "Power Mode:" in line:
-                    mode_data["power_mode"] = line.split(":")[1].strip()
-            
-            return {
-                "available": True,
-                "mode": mode_data,
-                "timestamp": time.time()
-            }
-            
-        except Exception as e:
-            return {
-                "available": False,
-                "error": f"Operation mode error: {e}",
-                "timestamp": time.time()
-            }
+        reading = sensor_data["data"]
+        return {
+            "available": True,
+            "mode": {
+                "operation_mode": reading["operation_mode"],
+                "power_mode": reading["power_mode"],
+                "timestamp": reading["timestamp"]
+            },
+            "timestamp": time.time()
+        }
+
+# Глобальный экземпляр монитора
+bno055_monitor = BNO055Monitor()
+
+def get_bno055_data() -> Dict:
+    """Получение данных BNO055 для API"""
+    return bno055_monitor.get_sensor_data()
+
+def get_bno055_info() -> Dict:
+    """Получение информации о BNO055 для API"""
+    return bno055_monitor.get_device_info()
+
+def is_bno055_available() -> bool:
+    """Проверка доступности BNO055"""
+    return bno055_monitor.is_available()
 
 # Функция для тестирования
 def test_bno055_monitor():
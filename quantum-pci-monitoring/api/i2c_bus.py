@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+I2C Bus Access Module
+Доступ к шине I2C без запуска i2cget/i2cset (ioctl на /dev/i2c-N)
+"""
+
+import ctypes
+import errno
+import fcntl
+import os
+import threading
+from typing import Dict, List, Optional
+
+# ioctl коды из linux/i2c-dev.h
+I2C_SLAVE = 0x0703
+I2C_RDWR = 0x0707
+I2C_SMBUS = 0x0720
+I2C_M_RD = 0x0001
+
+# Направление и типы транзакций SMBus (linux/i2c.h)
+I2C_SMBUS_WRITE = 0
+I2C_SMBUS_READ = 1
+I2C_SMBUS_BYTE = 1
+I2C_SMBUS_BYTE_DATA = 2
+I2C_SMBUS_WORD_DATA = 3
+I2C_SMBUS_I2C_BLOCK_DATA = 8
+I2C_SMBUS_BLOCK_MAX = 32
+
+# Мультиплексор I2C на плате Quantum-PCI
+MUX_ADDRESS = 0x70
+MUX_ALL_CHANNELS = 0x0F
+
+
+class _I2CSmbusData(ctypes.Union):
+    _fields_ = [
+        ('byte', ctypes.c_uint8),
+        ('word', ctypes.c_uint16),
+        ('block', ctypes.c_uint8 * (I2C_SMBUS_BLOCK_MAX + 2))
+    ]
+
+
+class _I2CSmbusIoctlData(ctypes.Structure):
+    _fields_ = [
+        ('read_write', ctypes.c_uint8),
+        ('command', ctypes.c_uint8),
+        ('size', ctypes.c_uint32),
+        ('data', ctypes.POINTER(_I2CSmbusData))
+    ]
+
+
+class _I2CMsg(ctypes.Structure):
+    _fields_ = [
+        ('addr', ctypes.c_uint16),
+        ('flags', ctypes.c_uint16),
+        ('len', ctypes.c_uint16),
+        ('buf', ctypes.POINTER(ctypes.c_uint8))
+    ]
+
+
+class _I2CRdwrIoctlData(ctypes.Structure):
+    _fields_ = [
+        ('msgs', ctypes.POINTER(_I2CMsg)),
+        ('nmsgs', ctypes.c_uint32)
+    ]
+
+
+class I2CBus:
+    """
+    Шина I2C через /dev/i2c-N
+
+    Все транзакции выполняются под блокировкой шины, поэтому несколько
+    мониторов могут безопасно использовать один экземпляр. Для групп
+    транзакций (например, выбор канала мультиплексора + чтение) можно
+    удерживать блокировку явно: ``with bus.lock: ...``.
+    """
+
+    def __init__(self, bus_number: int = 1):
+        self.bus_number = bus_number
+        self.path = f"/dev/i2c-{bus_number}"
+        self.lock = threading.RLock()
+        self._fd = None
+        self._address = None
+        self._mux_state = {}
+
+    def is_present(self) -> bool:
+        """Проверка наличия устройства шины"""
+        return os.path.exists(self.path)
+
+    def _open(self) -> int:
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR)
+            self._address = None
+        return self._fd
+
+    def _set_address(self, address: int) -> int:
+        fd = self._open()
+        if self._address != address:
+            fcntl.ioctl(fd, I2C_SLAVE, address)
+            self._address = address
+        return fd
+
+    def _smbus(self, address: int, read_write: int, command: int, size: int,
+               data: Optional[_I2CSmbusData] = None) -> _I2CSmbusData:
+        if data is None:
+            data = _I2CSmbusData()
+        with self.lock:
+            try:
+                fd = self._set_address(address)
+                request = _I2CSmbusIoctlData(read_write, command, size, ctypes.pointer(data))
+                fcntl.ioctl(fd, I2C_SMBUS, request)
+            except OSError:
+                # После ошибки переоткрываем шину при следующем обращении
+                self.close()
+                raise
+        return data
+
+    def read_byte(self, address: int) -> int:
+        """Чтение байта без указания регистра"""
+        return self._smbus(address, I2C_SMBUS_READ, 0, I2C_SMBUS_BYTE).byte
+
+    def write_byte(self, address: int, value: int) -> None:
+        """Запись байта без указания регистра (как i2cset без значения)"""
+        self._smbus(address, I2C_SMBUS_WRITE, value & 0xFF, I2C_SMBUS_BYTE)
+
+    def read_byte_data(self, address: int, register: int) -> int:
+        """Чтение байта из регистра"""
+        return self._smbus(address, I2C_SMBUS_READ, register, I2C_SMBUS_BYTE_DATA).byte
+
+    def write_byte_data(self, address: int, register: int, value: int) -> None:
+        """Запись байта в регистр"""
+        data = _I2CSmbusData()
+        data.byte = value & 0xFF
+        self._smbus(address, I2C_SMBUS_WRITE, register, I2C_SMBUS_BYTE_DATA, data)
+
+    def read_word_data(self, address: int, register: int) -> int:
+        """Чтение слова SMBus (младший байт первым, как i2cget ... w)"""
+        return self._smbus(address, I2C_SMBUS_READ, register, I2C_SMBUS_WORD_DATA).word
+
+    def write_word_data(self, address: int, register: int, value: int) -> None:
+        """Запись слова SMBus (младший байт первым)"""
+        data = _I2CSmbusData()
+        data.word = value & 0xFFFF
+        self._smbus(address, I2C_SMBUS_WRITE, register, I2C_SMBUS_WORD_DATA, data)
+
+    def read_i2c_block_data(self, address: int, register: int, length: int) -> List[int]:
+        """Блочное чтение до 32 байт начиная с регистра"""
+        length = min(length, I2C_SMBUS_BLOCK_MAX)
+        data = _I2CSmbusData()
+        data.block[0] = length
+        self._smbus(address, I2C_SMBUS_READ, register, I2C_SMBUS_I2C_BLOCK_DATA, data)
+        return list(data.block[1:length + 1])
+
+    def write_i2c_block_data(self, address: int, register: int, values: List[int]) -> None:
+        """Блочная запись до 32 байт начиная с регистра"""
+        values = list(values)[:I2C_SMBUS_BLOCK_MAX]
+        data = _I2CSmbusData()
+        data.block[0] = len(values)
+        for i, value in enumerate(values):
+            data.block[i + 1] = value & 0xFF
+        self._smbus(address, I2C_SMBUS_WRITE, register, I2C_SMBUS_I2C_BLOCK_DATA, data)
+
+    def _rdwr(self, messages: List[_I2CMsg]) -> None:
+        with self.lock:
+            try:
+                fd = self._open()
+                array = (_I2CMsg * len(messages))(*messages)
+                fcntl.ioctl(fd, I2C_RDWR, _I2CRdwrIoctlData(array, len(messages)))
+            except OSError:
+                self.close()
+                raise
+
+    def read_block(self, address: int, register: int, length: int) -> List[int]:
+        """
+        Чтение произвольного числа байт одной транзакцией
+
+        Запись адреса регистра и чтение объединены через repeated start
+        (I2C_RDWR), поэтому ограничение SMBus в 32 байта не действует.
+        Устройство должно поддерживать автоинкремент адреса регистра.
+        """
+        command = (ctypes.c_uint8 * 1)(register)
+        buffer = (ctypes.c_uint8 * length)()
+        self._rdwr([
+            _I2CMsg(address, 0, 1, command),
+            _I2CMsg(address, I2C_M_RD, length, buffer)
+        ])
+        return list(buffer)
+
+    def write_block(self, address: int, register: int, values: List[int]) -> None:
+        """Запись произвольного числа байт начиная с регистра одной транзакцией"""
+        payload = [register] + [value & 0xFF for value in values]
+        buffer = (ctypes.c_uint8 * len(payload))(*payload)
+        self._rdwr([_I2CMsg(address, 0, len(payload), buffer)])
+
+    def probe(self, address: int) -> bool:
+        """Проверка ответа устройства на адресе (аналог i2cdetect -r)"""
+        try:
+            self.read_byte(address)
+            return True
+        except OSError:
+            return False
+
+    def select_mux_channels(self, mask: int = MUX_ALL_CHANNELS, mux_address: int = MUX_ADDRESS,
+                            force: bool = False) -> None:
+        """
+        Выбор каналов мультиплексора с кэшированием состояния
+
+        Запись выполняется только при смене маски, поэтому вызов
+        перед каждым обращением к датчику почти ничего не стоит.
+        """
+        with self.lock:
+            if not force and self._mux_state.get(mux_address) == mask:
+                return
+            try:
+                self.write_byte(mux_address, mask)
+            except OSError:
+                self._mux_state.pop(mux_address, None)
+                raise
+            self._mux_state[mux_address] = mask
+
+    def close(self) -> None:
+        """Закрытие дескриптора шины"""
+        with self.lock:
+            if self._fd is not None:
+                try:
+                    os.close(self._fd)
+                except OSError:
+                    pass
+            self._fd = None
+            self._address = None
+            self._mux_state.clear()
+
+
+class FakeI2CBus:
+    """
+    Эмуляция шины I2C для тестов
+
+    Хранит образ регистров каждого устройства и журнал транзакций.
+    Обращение к отсутствующему адресу дает OSError(ENXIO), как и
+    на реальной шине.
+    """
+
+    def __init__(self, bus_number: int = 1):
+        self.bus_number = bus_number
+        self.path = f"fake-i2c-{bus_number}"
+        self.lock = threading.RLock()
+        self.devices = {}
+        self.transactions = []
+        self._mux_state = {}
+
+    def add_device(self, address: int, registers: Optional[Dict[int, int]] = None) -> bytearray:
+        """Добавление устройства с начальными значениями регистров"""
+        image = bytearray(256)
+        for register, value in (registers or {}).items():
+            image[register] = value & 0xFF
+        self.devices[address] = image
+        return image
+
+    def is_present(self) -> bool:
+        return True
+
+    def _device(self, address: int, operation: str, register: Optional[int] = None) -> bytearray:
+        self.transactions.append((operation, address, register))
+        if address not in self.devices:
+            raise OSError(errno.ENXIO, f"No device at 0x{address:02x}")
+        return self.devices[address]
+
+    def read_byte(self, address: int) -> int:
+        return self._device(address, 'read_byte')[0]
+
+    def write_byte(self, address: int, value: int) -> None:
+        self._device(address, 'write_byte', value)[0] = value & 0xFF
+
+    def read_byte_data(self, address: int, register: int) -> int:
+        return self._device(address, 'read_byte_data', register)[register]
+
+    def write_byte_data(self, address: int, register: int, value: int) -> None:
+        self._device(address, 'write_byte_data', register)[register] = value & 0xFF
+
+    def read_word_data(self, address: int, register: int) -> int:
+        image = self._device(address, 'read_word_data', register)
+        return image[register] | (image[(register + 1) & 0xFF] << 8)
+
+    def write_word_data(self, address: int, register: int, value: int) -> None:
+        image = self._device(address, 'write_word_data', register)
+        image[register] = value & 0xFF
+        image[(register + 1) & 0xFF] = (value >> 8) & 0xFF
+
+    def read_i2c_block_data(self, address: int, register: int, length: int) -> List[int]:
+        image = self._device(address, 'read_i2c_block_data', register)
+        length = min(length, I2C_SMBUS_BLOCK_MAX)
+        return list(image[register:register + length])
+
+    def write_i2c_block_data(self, address: int, register: int, values: List[int]) -> None:
+        image = self._device(address, 'write_i2c_block_data', register)
+        for i, value in enumerate(list(values)[:I2C_SMBUS_BLOCK_MAX]):
+            image[register + i] = value & 0xFF
+
+    def read_block(self, address: int, register: int, length: int) -> List[int]:
+        image = self._device(address, 'read_block', register)
+        return list(image[register:register + length])
+
+    def write_block(self, address: int, register: int, values: List[int]) -> None:
+        image = self._device(address, 'write_block', register)
+        for i, value in enumerate(values):
+            image[register + i] = value & 0xFF
+
+    def probe(self, address: int) -> bool:
+        try:
+            self.read_byte(address)
+            return True
+        except OSError:
+            return False
+
+    def select_mux_channels(self, mask: int = MUX_ALL_CHANNELS, mux_address: int = MUX_ADDRESS,
+                            force: bool = False) -> None:
+        with self.lock:
+            if not force and self._mux_state.get(mux_address) == mask:
+                return
+            self.write_byte(mux_address, mask)
+            self._mux_state[mux_address] = mask
+
+    def close(self) -> None:
+        self._mux_state.clear()
+
+
+# Общие экземпляры шин (один дескриптор и одна блокировка на шину)
+_buses = {}
+_buses_lock = threading.Lock()
+
+
+def get_bus(bus_number: int = 1):
+    """Получение общего экземпляра шины"""
+    with _buses_lock:
+        bus = _buses.get(bus_number)
+        if bus is None:
+            bus = I2CBus(bus_number)
+            _buses[bus_number] = bus
+        return bus
+
+
+def set_bus(bus_number: int, bus) -> None:
+    """Подмена шины (например, FakeI2CBus в тестах)"""
+    with _buses_lock:
+        previous = _buses.get(bus_number)
+        if previous is not None and previous is not bus:
+            previous.close()
+        _buses[bus_number] = bus
@@ -4,49 +4,31 @@ INA219 Voltage Monitor Module
 Модуль для мониторинга датчиков INA219BIDR (напряжение и ток)
 """
 
-import subprocess
 import time
 import json
-import statistics
 from pathlib import Path
 from typing import Dict, Optional, List
-from collections import deque
 
-class INA219Filter:
-    """Фильтр для устранения ложных значений INA219"""
-    
-    def __init__(self, window_size=5, valid_range=(2.5, 4.0)):
-        self.window_size = window_size
-        self.valid_range = valid_range
-        self.voltage_history = deque(maxlen=window_size)
-        self.last_valid_voltage = 3.3
-        
-    def is_valid_voltage(self, voltage):
-        """Проверка валидности напряжения"""
-        return self.valid_range[0] <= voltage <= self.valid_range[1]
-    
-    def filter_voltage(self, voltage, raw_value):
-        """Фильтрация напряжения"""
-        if not self.is_valid_voltage(voltage):
-            return self.last_valid_voltage, False, f"Вне диапазона {self.valid_range[0]}-{self.valid_range[1]}V"
-        
-        self.voltage_history.append(voltage)
-        
-        if len(self.voltage_history) < 3:
-            self.last_valid_voltage = voltage
-            return voltage, True, "Недостаточно данных"
-        
-        # Проверка на выбросы
-        median_voltage = statistics.median(self.voltage_history)
-        deviation = abs(voltage - median_voltage)
-        
-        if deviation > 0.5:
-            return self.last_valid_voltage, False, f"Выброс: отклонение {deviation:.3f}V"
-        
-        filtered_voltage = statistics.mean(self.voltage_history)
-        self.last_valid_voltage = filtered_voltage
-        
-        return filtered_voltage, True, "OK"
+from i2c_bus import get_bus
+from streaming_filter import HampelFilter
+
+# Фильтр Хампеля каждой шины: допустимый диапазон и номинал (значение до первых измерений)
+RAIL_FILTERS = {
+    '44': {'valid_range': (2.5, 4.0), 'initial': 3.3},    # 3.3V
+    '41': {'valid_range': (4.0, 6.0), 'initial': 5.0},    # 5V
+    '40': {'valid_range': (10.0, 15.0), 'initial': 12.0}  # 12V
+}
+FILTER_DEFAULTS = {'window_size': 5, 'n_sigmas': 3.0, 'min_deviation': 0.5}
+
+# Создаются при импорте, чтобы потоки не инициализировали их наперегонки
+_rail_filters = {
+    address: HampelFilter(**dict(FILTER_DEFAULTS, **config))
+    for address, config in RAIL_FILTERS.items()
+}
+
+def get_rail_filters() -> Dict[str, HampelFilter]:
+    """Фильтры шин, общие для всех экземпляров INA219Monitor (окна не сбрасываются между чтениями)"""
+    return _rail_filters
 
 class INA219Monitor:
     """
@@ -55,6 +37,7 @@ class INA219Monitor:
     
     def __init__(self):
         self.i2c_bus = 1
+        self.bus = get_bus(self.i2c_bus)
         self.devices = {
             '44': {'name': 'INA219 #1', 'description': '3.3V система (показывает ~3.3V)'},
             '41': {'name': 'INA219 #2', 'description': '5V система (показывает ~14.6V, ожидалось 5V)'},
@@ -65,35 +48,20 @@ class INA219Monitor:
         self.error_count = 0
         self.max_errors = 5
         
-        # Инициализация фильтров для каждого датчика
-        self.filters = {
-            '44': INA219Filter(window_size=5, valid_range=(2.5, 4.0)),  # 3.3V
-            '41': INA219Filter(window_size=5, valid_range=(4.0, 6.0)),  # 5V
-            '40': INA219Filter(window_size=5, valid_range=(10.0, 15.0)) # 12V
-        }
+        # Фильтры шин с состоянием окон (см. streaming_filter.py)
+        self.filters = get_rail_filters()
         
     def is_available(self) -> bool:
         """Проверка доступности I2C и INA219 датчиков"""
         try:
-            # Проверяем наличие i2c-tools
-            result = subprocess.run(['which', 'i2cget'], 
-                                  capture_output=True, text=True)
-            if result.returncode != 0:
-                return False
-                
             # Проверяем доступность I2C шины
-            result = subprocess.run(['i2cdetect', '-l'], 
-                                  capture_output=True, text=True)
-            if f'i2c-{self.i2c_bus}' not in result.stdout:
+            if not self.bus.is_present():
                 return False
                 
-            # Проверяем наличие INA219 устройств
-            result = subprocess.run(['i2cdetect', '-y', str(self.i2c_bus)], 
-                                  capture_output=True, text=True)
-            
+            # Проверяем наличие INA219 устройств (чтение регистра конфигурации)
             available_devices = []
-            for addr, info in self.devices.items():
-                if addr in result.stdout:
+            for addr in self.devices:
+                if self._read_i2c_register(addr, '0x00') is not None:
                     available_devices.append(addr)
                     
             return len(available_devices) > 0
@@ -105,19 +73,9 @@ class INA219Monitor:
     def _read_i2c_register(self, address: str, register: str) -> Optional[int]:
         """Чтение регистра I2C устройства"""
         try:
-            # Добавляем 0x к адресу если его нет
-            if not address.startswith('0x'):
-                address = f'0x{address}'
-                
-            result = subprocess.run([
-                'i2cget', '-y', str(self.i2c_bus), address, register, 'w'
-            ], capture_output=True, text=True, timeout=2)
-            
-            if result.returncode == 0:
-                return int(result.stdout.strip(), 16)
-            else:
-                return None
-                
+            return self.bus.read_word_data(int(address, 16), int(register, 16))
+        except OSError:
+            return None
         except Exception as e:
             print(f"❌ Ошибка чтения I2C {address}:{register} - {e}")
             return None
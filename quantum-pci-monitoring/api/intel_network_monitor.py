@@ -5,6 +5,7 @@
 """
 
 import subprocess
+import glob
 import json
 import time
 import os
@@ -13,6 +14,29 @@ from datetime import datetime
 from typing import Dict, List, Optional, Any
 import logging
 
+from sysfs_reader import get_reader
+
+# Обнаружение интерфейсов через rtnetlink/SIOCETHTOOL без запуска ip и ethtool
+try:
+    from netdev_native import NetdevCache, NETDEV_NATIVE_AVAILABLE
+except ImportError:
+    NETDEV_NATIVE_AVAILABLE = False
+
+# Время и частота PHC через clock_gettime/clock_adjtime без sudo testptp
+try:
+    from phc_clock import PHCRegistry, PHC_AVAILABLE
+except ImportError:
+    PHC_AVAILABLE = False
+
+# Состояние ptp4l через его UNIX сокет управления (как pmc) без pgrep
+try:
+    from ptp_management import PMCClient, PMC_AVAILABLE, DEFAULT_SOCKET
+except ImportError:
+    PMC_AVAILABLE = False
+
+# Опрос ptp4l не старше этого (сек) переиспользуется в get_ptp_status
+PTP4L_STATUS_MAX_AGE = 5.0
+
 # Настройка логирования
 logging.basicConfig(
     level=logging.INFO,
@@ -31,9 +55,32 @@ class PTPNetworkMonitor:
         self.interfaces = []
         self.quantum_pci_path = "/sys/class/timecard/ocp0"
         self.metrics = {}
+        self.netdev = None
+        if NETDEV_NATIVE_AVAILABLE:
+            try:
+                self.netdev = NetdevCache()
+            except OSError as e:
+                logger.warning(f"rtnetlink недоступен, используются ip/ethtool: {e}")
+        self.phc = PHCRegistry() if PHC_AVAILABLE else None
+        # Один клиент на процесс: путь его сокета - /var/run/pmc.<pid>
+        self.pmc = PMCClient(os.environ.get('PTP4L_UDS', DEFAULT_SOCKET)) if PMC_AVAILABLE else None
         
     def detect_ptp_interfaces(self) -> List[str]:
         """Обнаружение сетевых интерфейсов с поддержкой PTP hardware timestamping"""
+        if self.netdev is not None:
+            try:
+                interfaces = self.netdev.ptp_interfaces()
+            except OSError as e:
+                logger.error(f"Ошибка обнаружения интерфейсов через rtnetlink: {e}")
+                return []
+            if interfaces != self.interfaces:
+                logger.info(f"Найдены PTP интерфейсы: {interfaces}")
+            self.interfaces = interfaces
+            return interfaces
+        return self._detect_ptp_interfaces_tools()
+    
+    def _detect_ptp_interfaces_tools(self) -> List[str]:
+        """Обнаружение через ip link и ethtool -T (без поддержки rtnetlink)"""
         try:
             # Получение списка интерфейсов
             result = subprocess.run(['ip', 'link', 'show'], 
@@ -63,6 +110,82 @@ class PTPNetworkMonitor:
     
     def get_interface_info(self, interface: str) -> Dict[str, Any]:
         """Получение информации об интерфейсе"""
+        if self.netdev is None:
+            return self._get_interface_info_tools(interface)
+        
+        info = {
+            'interface': interface,
+            'timestamp': datetime.now().isoformat(),
+            'status': 'unknown',
+            'speed': 'unknown',
+            'timestamping': {},
+            'statistics': {},
+            'ptp_support': False
+        }
+        details = self.netdev.details(interface)
+        if details is None:
+            logger.error(f"Интерфейс {interface} не найден")
+            return info
+        
+        info['status'] = details.get('operstate', 'unknown')
+        info['mtu'] = details.get('mtu')
+        info['mac_address'] = details.get('address')
+        driver = details['driver'] or {}
+        info['driver'] = driver.get('driver', 'Unknown')
+        info['firmware'] = driver.get('fw_version')
+        info['bus_info'] = driver.get('bus_info')
+        settings = details['link_settings'] or {}
+        if settings.get('speed_mbps'):
+            info['speed'] = f"{settings['speed_mbps']}Mb/s"
+            info['duplex'] = settings['duplex']
+        timestamping = details['timestamping']
+        if timestamping:
+            info['timestamping'] = timestamping
+            if timestamping['phc_index'] >= 0:
+                info['ptp_support'] = True
+                info['ptp_clock'] = timestamping['phc_index']
+                info['ptp_device'] = f"/dev/ptp{timestamping['phc_index']}"
+        
+        # Счетчики драйвера (ETHTOOL_GSTATS) и скорости счетчиков PTP
+        statistics = self.netdev.interface_statistics(interface)
+        if statistics is not None:
+            info['statistics'] = statistics['counters']
+            info['statistics_rates'] = statistics['rates']
+        
+        return info
+    
+    def get_interface_statistics(self) -> Dict[str, Any]:
+        """
+        Счетчики и скорости в секунду всех PTP интерфейсов
+        
+        Одно чтение ETHTOOL_GSTATS на интерфейс, поэтому подходит для
+        опроса раз в секунду; без rtnetlink возвращает пустой словарь.
+        """
+        if self.netdev is None:
+            return {}
+        statistics = {}
+        for interface in self.detect_ptp_interfaces():
+            reading = self.netdev.interface_statistics(interface)
+            if reading is not None:
+                statistics[interface] = reading
+        return statistics
+    
+    def _parse_ethtool_statistics(self, output: str) -> Dict[str, Any]:
+        """Разбор вывода ethtool -S"""
+        statistics = {}
+        for line in output.split('\n'):
+            if ':' in line and not line.startswith('NIC statistics'):
+                key, value = line.split(':', 1)
+                key = key.strip()
+                value = value.strip()
+                try:
+                    statistics[key] = int(value)
+                except ValueError:
+                    statistics[key] = value
+        return statistics
+    
+    def _get_interface_info_tools(self, interface: str) -> Dict[str, Any]:
+        """Информация об интерфейсе через ip/ethtool (без поддержки rtnetlink)"""
         info = {
             'interface': interface,
             'timestamp': datetime.now().isoformat(),
@@ -121,18 +244,7 @@ class PTPNetworkMonitor:
             # Статистика
             stats_result = subprocess.run(['ethtool', '-S', interface], 
                                         capture_output=True, text=True, check=True)
-            statistics = {}
-            for line in stats_result.stdout.split('\n'):
-                if ':' in line and not line.startswith('NIC statistics'):
-                    key, value = line.split(':', 1)
-                    key = key.strip()
-                    value = value.strip()
-                    try:
-                        statistics[key] = int(value)
-                    except ValueError:
-                        statistics[key] = value
-            
-            info['statistics'] = statistics
+            info['statistics'] = self._parse_ethtool_statistics(stats_result.stdout)
             
         except subprocess.CalledProcessError as e:
             logger.error(f"Ошибка получения информации об интерфейсе {interface}: {e}")
@@ -159,42 +271,37 @@ class PTPNetworkMonitor:
             status['present'] = True
             
             try:
+                reader = get_reader(self.quantum_pci_path)
+                values = reader.read_many([
+                    'serialnum', 'gnss_sync', 'available_clock_sources', 'clock_source',
+                    'clock_status_drift', 'clock_status_offset', 'tod_correction', 'utc_tai_offset'
+                ])
+                
                 # Серийный номер
-                with open(os.path.join(self.quantum_pci_path, 'serialnum'), 'r') as f:
-                    status['serial'] = f.read().strip()
+                if values['serialnum'] is not None:
+                    status['serial'] = values['serialnum']
                 
                 # Статус GNSS
-                with open(os.path.join(self.quantum_pci_path, 'gnss_sync'), 'r') as f:
-                    status['gnss_sync'] = f.read().strip() == '1'
+                status['gnss_sync'] = values['gnss_sync'] == '1'
                 
                 # Доступные источники времени
-                with open(os.path.join(self.quantum_pci_path, 'available_clock_sources'), 'r') as f:
-                    status['available_sources'] = f.read().strip().split()
+                if values['available_clock_sources']:
+                    status['available_sources'] = values['available_clock_sources'].split()
                 
                 # Источник времени
-                with open(os.path.join(self.quantum_pci_path, 'clock_source'), 'r') as f:
-                    status['clock_source'] = f.read().strip()
-                
-                # Clock status drift (активно только для PTP)
-                with open(os.path.join(self.quantum_pci_path, 'clock_status_drift'), 'r') as f:
-                    status['clock_status_drift'] = int(f.read().strip())
+                if values['clock_source'] is not None:
+                    status['clock_source'] = values['clock_source']
                 
-                # Clock status offset (активно только для PTP)
-                with open(os.path.join(self.quantum_pci_path, 'clock_status_offset'), 'r') as f:
-                    status['clock_status_offset'] = int(f.read().strip())
-                
-                # TOD correction
-                with open(os.path.join(self.quantum_pci_path, 'tod_correction'), 'r') as f:
-                    status['tod_correction'] = int(f.read().strip())
-                
-                # UTC TAI offset
-                with open(os.path.join(self.quantum_pci_path, 'utc_tai_offset'), 'r') as f:
-                    status['utc_tai_offset'] = int(f.read().strip())
+                # Clock status drift/offset (активно только для PTP), TOD correction, UTC TAI offset
+                for attribute in ('clock_status_drift', 'clock_status_offset',
+                                  'tod_correction', 'utc_tai_offset'):
+                    if values[attribute] is not None:
+                        status[attribute] = int(values[attribute])
                 
                 # Специфичные метрики в зависимости от источника
                 status['source_specific_metrics'] = self._get_source_specific_metrics(status['clock_source'])
                     
-            except (IOError, OSError) as e:
+            except (OSError, ValueError) as e:
                 logger.error(f"Ошибка чтения статуса Quantum-PCI: {e}")
         
         return status
@@ -301,52 +408,73 @@ class PTPNetworkMonitor:
             'running': False
         }
         
-        # Поиск PTP устройств
-        try:
-            result = subprocess.run(['ls', '/dev/ptp*'], 
-                                  capture_output=True, text=True)
-            if result.returncode == 0:
-                ptp_devices = result.stdout.strip().split('\n')
-                for device in ptp_devices:
-                    if device:
-                        device_info = {
-                            'device': device,
-                            'time': None,
-                            'frequency': None
-                        }
-                        
-                        try:
-                            # Получение времени PTP
-                            time_result = subprocess.run(['sudo', 'testptp', '-d', device, '-g'], 
-                                                       capture_output=True, text=True)
-                            if time_result.returncode == 0:
-                                device_info['time'] = time_result.stdout.strip()
-                            
-                            # Получение частоты PTP
-                            freq_result = subprocess.run(['sudo', 'testptp', '-d', device, '-f'], 
-                                                       capture_output=True, text=True)
-                            if freq_result.returncode == 0:
-                                device_info['frequency'] = freq_result.stdout.strip()
-                                
-                        except subprocess.CalledProcessError:
-                            pass
-                        
-                        ptp_status['devices'].append(device_info)
-        except subprocess.CalledProcessError:
-            pass
+        # Время, частота и возможности PHC
+        if self.phc is not None:
+            ptp_status['devices'] = self.phc.status()
+        else:
+            ptp_status['devices'] = self._get_ptp_devices_tools()
         
-        # Проверка запущенного PTP4L
-        try:
-            result = subprocess.run(['pgrep', '-f', 'ptp4l'], 
-                                  capture_output=True, text=True)
-            ptp_status['running'] = result.returncode == 0
-            if ptp_status['running']:
-                ptp_status['pid'] = result.stdout.strip()
-        except subprocess.CalledProcessError:
-            pass
+        # Состояние ptp4l по сокету управления, без него - по наличию процесса
+        if self.pmc is not None and os.path.exists(self.pmc.server):
+            # Свежий результат get_ptp4l_status (источник network:ptp4l) вместо второго опроса
+            servo = self.pmc.latest(PTP4L_STATUS_MAX_AGE)
+            ptp_status['running'] = servo['running']
+            ptp_status['ptp4l'] = servo
+        else:
+            try:
+                result = subprocess.run(['pgrep', '-f', 'ptp4l'], 
+                                      capture_output=True, text=True)
+                ptp_status['running'] = result.returncode == 0
+                if ptp_status['running']:
+                    ptp_status['pid'] = result.stdout.strip()
+            except (subprocess.CalledProcessError, OSError):
+                pass
         
         return ptp_status
     
+    def get_ptp4l_status(self) -> Dict[str, Any]:
+        """Наборы данных ptp4l (CURRENT/PARENT/PORT_DATA_SET, TIME_STATUS_NP)"""
+        if self.pmc is None:
+            return {'running': False, 'error': 'UNIX сокеты недоступны'}
+        if not os.path.exists(self.pmc.server):
+            return {'running': False, 'socket': self.pmc.server, 'error': 'Сокет ptp4l не найден'}
+        return dict(self.pmc.poll(), client=self.pmc.stats())
+    
+    def get_phc_status(self) -> Dict[str, Any]:
+        """Статус PHC для частого опроса (без проверки ptp4l)"""
+        if self.phc is None:
+            return {'available': False, 'devices': []}
+        return {'available': True, 'devices': self.phc.status(), 'registry': self.phc.stats()}
+    
+    def _get_ptp_devices_tools(self) -> List[Dict[str, Any]]:
+        """Время и частота PHC через testptp (нужен sudo)"""
+        devices = []
+        for device in sorted(glob.glob('/dev/ptp*')):
+            device_info = {
+                'device': device,
+                'time': None,
+                'frequency': None
+            }
+            
+            try:
+                # Получение времени PTP
+                time_result = subprocess.run(['sudo', 'testptp', '-d', device, '-g'], 
+                                           capture_output=True, text=True)
+                if time_result.returncode == 0:
+                    device_info['time'] = time_result.stdout.strip()
+                
+                # Получение частоты PTP
+                freq_result = subprocess.run(['sudo', 'testptp', '-d', device, '-f'], 
+                                           capture_output=True, text=True)
+                if freq_result.returncode == 0:
+                    device_info['frequency'] = freq_result.stdout.strip()
+                    
+            except (subprocess.CalledProcessError, OSError):
+                pass
+            
+            devices.append(device_info)
+        return devices
+    
     def collect_metrics(self) -> Dict[str, Any]:
         """Сбор всех метрик"""
         metrics = {
@@ -371,6 +499,10 @@ class PTPNetworkMonitor:
         # Статус PTP
         metrics['ptp'] = self.get_ptp_status()
         
+        # Затраты на обнаружение (дампы rtnetlink, ioctl, события линков)
+        if self.netdev is not None:
+            metrics['discovery'] = self.netdev.stats()
+        
         # Системная информация
         metrics['system'] = {
             'uptime': self.get_system_uptime(),
@@ -582,6 +714,21 @@ def get_ptp_network_ptp_metrics():
     monitor = get_monitor()
     return monitor.get_ptp_metrics()
 
+def get_ptp_interface_statistics():
+    """API функция для получения счетчиков и их скоростей по PTP интерфейсам"""
+    monitor = get_monitor()
+    return monitor.get_interface_statistics()
+
+def get_ptp_phc_status():
+    """API функция для получения времени и частоты PHC"""
+    monitor = get_monitor()
+    return monitor.get_phc_status()
+
+def get_ptp4l_status():
+    """API функция для получения состояния ptp4l по сокету управления"""
+    monitor = get_monitor()
+    return monitor.get_ptp4l_status()
+
 def get_ptp_interface_metrics(interface: str):
     """API функция для получения метрик конкретного интерфейса"""
     monitor = get_monitor()
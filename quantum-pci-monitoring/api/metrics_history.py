@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Metrics History Module
+Многоуровневая история метрик: сырое кольцо и свертки 1 с / 1 мин / 1 ч
+
+Данные хранятся по колонкам в типизированных массивах (array, а при
+наличии NumPy запросы отдают numpy массивы без копирования каждой точки).
+"""
+
+import bisect
+import math
+import threading
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# (ширина корзины в секундах, число хранимых корзин):
+# 1 час посекундно, сутки поминутно, неделя почасово
+DEFAULT_TIERS = ((1, 3600), (60, 1440), (3600, 168))
+
+NAN = float('nan')
+
+
+def resolution_label(width: int) -> str:
+    """Имя уровня по ширине корзины: 1 -> '1s', 60 -> '1m', 3600 -> '1h'"""
+    if width % 3600 == 0:
+        return f"{width // 3600}h"
+    if width % 60 == 0:
+        return f"{width // 60}m"
+    return f"{width}s"
+
+
+class EnumInterner:
+    """Словарь строковых значений (clock_source, gnss_sync, status) -> код"""
+
+    # Код 0 зарезервирован для отсутствующего значения
+    def __init__(self):
+        self.values = [None]
+        self.codes = {None: 0}
+
+    def code(self, value: Optional[str]) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self.codes[value] = code
+        return code
+
+    def decode(self, code: int) -> Optional[str]:
+        return self.values[code]
+
+
+class ColumnarRing:
+    """
+    Кольцевой буфер фиксированной емкости с типизированными колонками
+
+    Первая колонка - 'timestamp'; отметки времени неубывают, поэтому
+    выборка по интервалу - это двоичный поиск и срезы (не более двух
+    из-за кольца), без перебора точек в Python.
+    """
+
+    def __init__(self, capacity: int, columns: Dict[str, str]):
+        self.capacity = capacity
+        self.typecodes = dict(columns)
+        self.columns = {name: array(typecode, bytes(array(typecode).itemsize * capacity))
+                        for name, typecode in self.typecodes.items()}
+        self.size = 0
+        self.head = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, row: Dict[str, Any]) -> None:
+        for name, column in self.columns.items():
+            column[self.head] = row[name]
+        self.head = (self.head + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+    def _segments(self) -> List[Tuple[int, int]]:
+        if self.size < self.capacity:
+            return [(0, self.size)]
+        return [(self.head, self.capacity), (0, self.head)]
+
+    def slices(self, since: Optional[float] = None, until: Optional[float] = None) -> List[Tuple[int, int]]:
+        """Срезы [start, end) колонок, попадающие в интервал [since, until]"""
+        timestamps = self.columns['timestamp']
+        result = []
+        for start, end in self._segments():
+            if since is not None:
+                start = bisect.bisect_left(timestamps, since, start, end)
+            if until is not None:
+                end = bisect.bisect_right(timestamps, until, start, end)
+            if start < end:
+                result.append((start, end))
+        return result
+
+    def first_timestamp(self) -> Optional[float]:
+        if not self.size:
+            return None
+        return self.columns['timestamp'][self._segments()[0][0]]
+
+    def select(self, slices: List[Tuple[int, int]], as_numpy: bool = NUMPY_AVAILABLE) -> Dict[str, Any]:
+        """Колонки по срезам: numpy массивы или array"""
+        selected = {}
+        for name, column in self.columns.items():
+            if as_numpy:
+                view = np.frombuffer(column, dtype=column.typecode)
+                parts = [view[start:end] for start, end in slices]
+                selected[name] = (parts[0].copy() if len(parts) == 1 else
+                                  np.concatenate(parts) if parts else view[:0].copy())
+            else:
+                part = array(column.typecode)
+                for start, end in slices:
+                    part.extend(column[start:end])
+                selected[name] = part
+        return selected
+
+
+class MultiResolutionHistory:
+    """
+    История метрик устройства с ограниченной памятью
+
+    Числовые поля (fields) хранятся как float64 (NaN - нет значения),
+    строковые (enum_fields) - как коды EnumInterner. Каждое измерение
+    попадает в сырое кольцо и в текущие корзины уровней свертки
+    (min/max/mean/last числовых полей); заполненная корзина переходит в
+    кольцо своего уровня.
+    """
+
+    def __init__(self, fields: Iterable[str], enum_fields: Iterable[str] = (),
+                 raw_maxlen: int = 6000, tiers: Iterable[Tuple[int, int]] = DEFAULT_TIERS):
+        self.fields = tuple(fields)
+        self.enum_fields = tuple(enum_fields)
+        self.enums = {field: EnumInterner() for field in self.enum_fields}
+
+        raw_columns = {'timestamp': 'd'}
+        raw_columns.update((field, 'd') for field in self.fields)
+        raw_columns.update((field, 'H') for field in self.enum_fields)
+        self.raw = ColumnarRing(raw_maxlen, raw_columns)
+
+        rollup_columns = {'timestamp': 'd', 'count': 'L'}
+        for field in self.fields:
+            rollup_columns.update({
+                f'{field}_min': 'd', f'{field}_max': 'd', f'{field}_sum': 'd',
+                f'{field}_n': 'L', f'{field}_last': 'd'
+            })
+        self.tiers = [
+            {'width': width, 'label': resolution_label(width),
+             'ring': ColumnarRing(maxlen, rollup_columns), 'current': None}
+            for width, maxlen in tiers
+        ]
+        self._lock = threading.Lock()
+
+    def _new_bucket(self, start: float) -> Dict[str, Any]:
+        bucket = {'timestamp': start, 'count': 0}
+        for field in self.fields:
+            bucket.update({
+                f'{field}_min': NAN, f'{field}_max': NAN, f'{field}_sum': 0.0,
+                f'{field}_n': 0, f'{field}_last': NAN
+            })
+        return bucket
+
+    def add(self, timestamp: float, values: Dict[str, Any]) -> None:
+        """Добавление измерения (отсутствующие поля сохраняются как NaN / код 0)"""
+        row = {'timestamp': timestamp}
+        for field in self.fields:
+            value = values.get(field)
+            row[field] = NAN if value is None else float(value)
+        with self._lock:
+            for field in self.enum_fields:
+                row[field] = self.enums[field].code(values.get(field))
+            self.raw.append(row)
+
+            for tier in self.tiers:
+                start = timestamp - timestamp % tier['width']
+                bucket = tier['current']
+                if bucket is None or bucket['timestamp'] != start:
+                    if bucket is not None:
+                        tier['ring'].append(bucket)
+                    bucket = tier['current'] = self._new_bucket(start)
+                bucket['count'] += 1
+                for field in self.fields:
+                    value = row[field]
+                    if math.isnan(value):
+                        continue
+                    if not value >= bucket[f'{field}_min']:
+                        bucket[f'{field}_min'] = value
+                    if not value <= bucket[f'{field}_max']:
+                        bucket[f'{field}_max'] = value
+                    bucket[f'{field}_sum'] += value
+                    bucket[f'{field}_n'] += 1
+                    bucket[f'{field}_last'] = value
+
+    def resolutions(self) -> List[str]:
+        """Доступные разрешения: 'raw' и имена уровней свертки"""
+        return ['raw'] + [tier['label'] for tier in self.tiers]
+
+    def _tier(self, resolution: str) -> Dict[str, Any]:
+        for tier in self.tiers:
+            if tier['label'] == resolution:
+                return tier
+        raise KeyError(resolution)
+
+    def query_columns(self, resolution: str = 'raw', since: Optional[float] = None,
+                      until: Optional[float] = None, as_numpy: bool = NUMPY_AVAILABLE) -> Dict[str, Any]:
+        """
+        Колонки истории заданного разрешения в интервале [since, until]
+
+        Для 'raw' строковые поля возвращаются кодами (см. self.enums),
+        для уровней свертки - колонки '<поле>_min/_max/_sum/_n/_last',
+        последней идет текущая (незавершенная) корзина.
+        """
+        with self._lock:
+            if resolution == 'raw':
+                return self.raw.select(self.raw.slices(since, until), as_numpy)
+
+            tier = self._tier(resolution)
+            # Корзина [start, start + width) пересекается с интервалом
+            ring_since = None if since is None else since - tier['width']
+            columns = tier['ring'].select(tier['ring'].slices(ring_since, until), as_numpy)
+            if len(columns['timestamp']) and since is not None and columns['timestamp'][0] + tier['width'] <= since:
+                columns = {name: values[1:] for name, values in columns.items()}
+            current = tier['current']
+            if current is not None and (until is None or current['timestamp'] <= until) \
+                    and (since is None or current['timestamp'] + tier['width'] > since):
+                for name, values in columns.items():
+                    if as_numpy:
+                        columns[name] = np.append(values, current[name]).astype(values.dtype)
+                    else:
+                        values.append(current[name])
+            return columns
+
+    def query(self, resolution: str = 'raw', since: Optional[float] = None,
+              until: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Точки истории в виде словарей (для JSON ответов API)"""
+        columns = self.query_columns(resolution, since, until, as_numpy=False)
+        points = []
+        if resolution == 'raw':
+            for i, timestamp in enumerate(columns['timestamp']):
+                point = {'timestamp': timestamp}
+                for field in self.fields:
+                    value = columns[field][i]
+                    point[field] = None if math.isnan(value) else value
+                for field in self.enum_fields:
+                    point[field] = self.enums[field].decode(columns[field][i])
+                points.append(point)
+            return points
+
+        width = self._tier(resolution)['width']
+        for i, timestamp in enumerate(columns['timestamp']):
+            point = {'timestamp': timestamp, 'width_seconds': width, 'count': columns['count'][i]}
+            for field in self.fields:
+                n = columns[f'{field}_n'][i]
+                point[field] = {
+                    'min': columns[f'{field}_min'][i] if n else None,
+                    'max': columns[f'{field}_max'][i] if n else None,
+                    'mean': columns[f'{field}_sum'][i] / n if n else None,
+                    'last': columns[f'{field}_last'][i] if n else None
+                }
+            points.append(point)
+        return points
+
+    def span(self) -> Dict[str, Optional[float]]:
+        """Самая ранняя отметка времени по каждому разрешению"""
+        with self._lock:
+            span = {'raw': self.raw.first_timestamp()}
+            for tier in self.tiers:
+                oldest = tier['ring'].first_timestamp()
+                if oldest is None and tier['current'] is not None:
+                    oldest = tier['current']['timestamp']
+                span[tier['label']] = oldest
+            return span
+
+    def pick_resolution(self, since: float, step: float) -> str:
+        """
+        Самое детальное разрешение с корзинами не шире step, которое
+        покрывает начало интервала (иначе - самое глубокое из подходящих)
+        """
+        span = self.span()
+        candidates = ['raw'] + [tier['label'] for tier in self.tiers if tier['width'] <= step]
+        for resolution in candidates:
+            if span[resolution] is not None and span[resolution] <= since:
+                return resolution
+        filled = [resolution for resolution in candidates if span[resolution] is not None]
+        return min(filled, key=lambda resolution: span[resolution]) if filled else 'raw'
+
+    def _stat_columns(self, resolution: str, columns: Dict[str, Any],
+                      fields: Tuple[str, ...]) -> Dict[str, Any]:
+        """Приведение сырых колонок к виду колонок свертки"""
+        if resolution != 'raw':
+            return columns
+        stats = {'timestamp': columns['timestamp']}
+        if NUMPY_AVAILABLE and isinstance(columns['timestamp'], np.ndarray):
+            stats['count'] = np.ones(len(columns['timestamp']), dtype=np.uint64)
+            for field in fields:
+                values = columns[field]
+                valid = ~np.isnan(values)
+                stats.update({
+                    f'{field}_min': values, f'{field}_max': values, f'{field}_last': values,
+                    f'{field}_sum': np.where(valid, values, 0.0), f'{field}_n': valid.astype(np.uint64)
+                })
+        else:
+            stats['count'] = [1] * len(columns['timestamp'])
+            for field in fields:
+                values = columns[field]
+                stats.update({
+                    f'{field}_min': values, f'{field}_max': values, f'{field}_last': values,
+                    f'{field}_sum': [0.0 if math.isnan(v) else v for v in values],
+                    f'{field}_n': [0 if math.isnan(v) else 1 for v in values]
+                })
+        return stats
+
+    def downsample(self, since: float, until: float, step: float,
+                   fields: Optional[Iterable[str]] = None,
+                   resolution: Optional[str] = None) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Прореживание истории в корзины шириной step секунд
+
+        Каждая корзина хранит min/max/mean/last (min-max прореживание,
+        экстремумы не теряются). Источником служит самый подходящий
+        уровень истории (см. pick_resolution). Возвращает (разрешение
+        источника, точки).
+        """
+        fields = self.fields if fields is None else tuple(fields)
+        if resolution is None:
+            resolution = self.pick_resolution(since, step)
+        columns = self._stat_columns(
+            resolution, self.query_columns(resolution, since, until, as_numpy=NUMPY_AVAILABLE), fields)
+        timestamps = columns['timestamp']
+        if not len(timestamps):
+            return resolution, []
+
+        if NUMPY_AVAILABLE and isinstance(timestamps, np.ndarray):
+            keys = np.floor(timestamps / step)
+            starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+            buckets = {'timestamp': keys[starts] * step,
+                       'count': np.add.reduceat(columns['count'], starts)}
+            index = np.arange(len(timestamps))
+            for field in fields:
+                n = columns[f'{field}_n']
+                last_index = np.maximum.reduceat(np.where(n > 0, index, -1), starts)
+                buckets.update({
+                    f'{field}_min': np.fmin.reduceat(columns[f'{field}_min'], starts),
+                    f'{field}_max': np.fmax.reduceat(columns[f'{field}_max'], starts),
+                    f'{field}_sum': np.add.reduceat(columns[f'{field}_sum'], starts),
+                    f'{field}_n': np.add.reduceat(n, starts),
+                    f'{field}_last': np.where(last_index >= 0, columns[f'{field}_last'][last_index], NAN)
+                })
+            buckets = {name: values.tolist() for name, values in buckets.items()}
+        else:
+            buckets = {name: [] for name in ['timestamp', 'count'] + [
+                f'{field}_{stat}' for field in fields for stat in ('min', 'max', 'sum', 'n', 'last')]}
+            current_key = None
+            for i, timestamp in enumerate(timestamps):
+                key = math.floor(timestamp / step)
+                if key != current_key:
+                    current_key = key
+                    buckets['timestamp'].append(key * step)
+                    buckets['count'].append(0)
+                    for field in fields:
+                        for stat, initial in (('min', NAN), ('max', NAN), ('sum', 0.0), ('n', 0), ('last', NAN)):
+                            buckets[f'{field}_{stat}'].append(initial)
+                buckets['count'][-1] += columns['count'][i]
+                for field in fields:
+                    if not columns[f'{field}_n'][i]:
+                        continue
+                    low, high = columns[f'{field}_min'][i], columns[f'{field}_max'][i]
+                    if not low >= buckets[f'{field}_min'][-1]:
+                        buckets[f'{field}_min'][-1] = low
+                    if not high <= buckets[f'{field}_max'][-1]:
+                        buckets[f'{field}_max'][-1] = high
+                    buckets[f'{field}_sum'][-1] += columns[f'{field}_sum'][i]
+                    buckets[f'{field}_n'][-1] += columns[f'{field}_n'][i]
+                    buckets[f'{field}_last'][-1] = columns[f'{field}_last'][i]
+
+        points = []
+        for i, timestamp in enumerate(buckets['timestamp']):
+            point = {'timestamp': timestamp, 'count': int(buckets['count'][i])}
+            for field in fields:
+                n = buckets[f'{field}_n'][i]
+                point[field] = {
+                    'min': buckets[f'{field}_min'][i] if n else None,
+                    'max': buckets[f'{field}_max'][i] if n else None,
+                    'mean': buckets[f'{field}_sum'][i] / n if n else None,
+                    'last': buckets[f'{field}_last'][i] if n else None
+                }
+            points.append(point)
+        return resolution, points
+
+    def memory_bytes(self) -> int:
+        """Объем памяти, занимаемый колонками"""
+        rings = [self.raw] + [tier['ring'] for tier in self.tiers]
+        return sum(column.itemsize * len(column) for ring in rings for column in ring.columns.values())
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Netdev Native Module
+Обнаружение сетевых интерфейсов и их возможностей PTP без запуска ip/ethtool
+
+Список интерфейсов и состояние линка берутся одним дампом rtnetlink
+(RTM_GETLINK), драйвер, скорость и возможности timestamping - ioctl
+SIOCETHTOOL (ETHTOOL_GDRVINFO, ETHTOOL_GSET, ETHTOOL_GET_TS_INFO).
+Результаты кэшируются до события RTM_NEWLINK/RTM_DELLINK из группы
+RTMGRP_LINK, поэтому сбор без изменений линков стоит одного recv().
+Счетчики драйвера (ethtool -S) читаются ETHTOOL_GSTATS, а их имена
+(ETHTOOL_GSTRINGS) запрашиваются один раз на драйвер.
+"""
+
+import ctypes
+import socket
+import struct
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+    NETDEV_NATIVE_AVAILABLE = hasattr(socket, 'AF_NETLINK')
+except ImportError:
+    NETDEV_NATIVE_AVAILABLE = False
+
+# === rtnetlink (linux/netlink.h, linux/rtnetlink.h, linux/if_link.h) ===
+NLMSG_HEADER = struct.Struct('=IHHII')
+IFINFOMSG = struct.Struct('=BxHiII')
+RTATTR = struct.Struct('=HH')
+
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+RTM_GETLINK = 18
+RTMGRP_LINK = 0x1
+
+IFLA_ADDRESS = 1
+IFLA_IFNAME = 3
+IFLA_MTU = 4
+IFLA_OPERSTATE = 16
+
+IFF_UP = 0x1
+IFF_LOOPBACK = 0x8
+IFF_RUNNING = 0x40
+IFF_LOWER_UP = 0x10000
+ARPHRD_ETHER = 1
+
+OPERSTATES = ('unknown', 'notpresent', 'down', 'lowerlayerdown', 'testing', 'dormant', 'up')
+
+# === ethtool (linux/sockios.h, linux/ethtool.h, linux/net_tstamp.h) ===
+SIOCETHTOOL = 0x8946
+IFNAMSIZ = 16
+IFREQ_SIZE = 40
+
+ETHTOOL_GSET = 0x00000001
+ETHTOOL_GDRVINFO = 0x00000003
+ETHTOOL_GSTRINGS = 0x0000001b
+ETHTOOL_GSTATS = 0x0000001d
+ETHTOOL_GET_TS_INFO = 0x00000041
+ETH_SS_STATS = 1
+ETH_GSTRING_LEN = 32
+
+# Счетчики, для которых считается скорость: timestamping, таймауты, потери
+RATE_COUNTER_MARKERS = ('hwtstamp', 'timestamp', 'ptp', 'timeout', 'drop', 'missed')
+
+# cmd, driver[32], version[32], fw_version[32], bus_info[32], erom_version[32],
+# reserved2[12], n_priv_flags, n_stats, testinfo_len, eedump_len, regdump_len
+DRVINFO = struct.Struct('=I32s32s32s32s32s12sIIIII')
+# cmd, supported, advertising, speed, duplex, port, phy_address, transceiver, autoneg,
+# mdio_support, maxtxpkt, maxrxpkt, speed_hi, eth_tp_mdix, eth_tp_mdix_ctrl, lp_advertising, reserved[2]
+ETHTOOL_CMD = struct.Struct('=IIIHBBBBBBIIHBBI8x')
+# cmd, so_timestamping, phc_index, tx_types, tx_reserved[3], rx_filters, rx_reserved[3]
+TS_INFO = struct.Struct('=IIiI12xI12x')
+
+SPEED_UNKNOWN = 0xFFFFFFFF
+DUPLEX = {0: 'half', 1: 'full'}
+
+SOF_TIMESTAMPING = ('tx_hardware', 'tx_software', 'rx_hardware', 'rx_software', 'software',
+                    'sys_hardware', 'raw_hardware', 'opt_id', 'tx_sched', 'tx_ack',
+                    'opt_cmsg', 'opt_tsonly', 'opt_stats', 'opt_pktinfo', 'opt_tx_swhw',
+                    'bind_phc')
+HWTSTAMP_TX_TYPES = ('off', 'on', 'onestep_sync', 'onestep_p2p')
+HWTSTAMP_FILTERS = ('none', 'all', 'some', 'ptp_v1_l4_event', 'ptp_v1_l4_sync', 'ptp_v1_l4_delay_req',
+                    'ptp_v2_l4_event', 'ptp_v2_l4_sync', 'ptp_v2_l4_delay_req',
+                    'ptp_v2_l2_event', 'ptp_v2_l2_sync', 'ptp_v2_l2_delay_req',
+                    'ptp_v2_event', 'ptp_v2_sync', 'ptp_v2_delay_req', 'ntp_all')
+
+
+def _align(length: int) -> int:
+    return (length + 3) & ~3
+
+
+def _flag_names(mask: int, names) -> List[str]:
+    return [name for bit, name in enumerate(names) if mask & (1 << bit)]
+
+
+def _cstring(raw: bytes) -> str:
+    return raw.split(b'\0', 1)[0].decode(errors='replace')
+
+
+def parse_messages(data: bytes) -> List[tuple]:
+    """Разбор буфера netlink на (тип, флаги, полезная нагрузка)"""
+    messages = []
+    offset = 0
+    while offset + NLMSG_HEADER.size <= len(data):
+        length, msg_type, flags, _, _ = NLMSG_HEADER.unpack_from(data, offset)
+        if length < NLMSG_HEADER.size:
+            break
+        messages.append((msg_type, flags, data[offset + NLMSG_HEADER.size:offset + length]))
+        offset += _align(length)
+    return messages
+
+
+def parse_link(payload: bytes) -> Dict[str, Any]:
+    """Разбор RTM_NEWLINK: ifinfomsg и атрибуты IFLA_*"""
+    _, link_type, index, flags, _ = IFINFOMSG.unpack_from(payload)
+    link = {
+        'index': index,
+        'type': link_type,
+        'flags': flags,
+        'admin_up': bool(flags & IFF_UP),
+        'carrier': bool(flags & IFF_LOWER_UP),
+        'loopback': bool(flags & IFF_LOOPBACK)
+    }
+    offset = IFINFOMSG.size
+    while offset + RTATTR.size <= len(payload):
+        length, attr_type = RTATTR.unpack_from(payload, offset)
+        if length < RTATTR.size:
+            break
+        value = payload[offset + RTATTR.size:offset + length]
+        if attr_type == IFLA_IFNAME:
+            link['name'] = _cstring(value)
+        elif attr_type == IFLA_MTU:
+            link['mtu'] = struct.unpack('=I', value[:4])[0]
+        elif attr_type == IFLA_OPERSTATE:
+            state = value[0]
+            link['operstate'] = OPERSTATES[state] if state < len(OPERSTATES) else 'unknown'
+        elif attr_type == IFLA_ADDRESS:
+            link['address'] = ':'.join(f'{byte:02x}' for byte in value)
+        offset += _align(length)
+    return link
+
+
+def list_links() -> List[Dict[str, Any]]:
+    """Дамп всех сетевых интерфейсов одним запросом RTM_GETLINK"""
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE) as sock:
+        sock.bind((0, 0))
+        request = IFINFOMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)
+        sock.send(NLMSG_HEADER.pack(NLMSG_HEADER.size + len(request), RTM_GETLINK,
+                                    NLM_F_REQUEST | NLM_F_DUMP, 1, 0) + request)
+        links = []
+        while True:
+            for msg_type, _, payload in parse_messages(sock.recv(65536)):
+                if msg_type == NLMSG_DONE:
+                    return links
+                if msg_type == NLMSG_ERROR:
+                    error = struct.unpack_from('=i', payload)[0]
+                    if error:
+                        raise OSError(-error, 'RTM_GETLINK')
+                    return links
+                if msg_type == RTM_NEWLINK:
+                    links.append(parse_link(payload))
+
+
+class LinkWatcher:
+    """Подписка на события линков RTMGRP_LINK (неблокирующий сокет)"""
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW | socket.SOCK_NONBLOCK,
+                                  socket.NETLINK_ROUTE)
+        self.sock.bind((0, RTMGRP_LINK))
+        self.events = 0
+
+    def changed(self) -> bool:
+        """Были ли события линков с прошлого вызова (очередь вычитывается)"""
+        changed = False
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except BlockingIOError:
+                return changed
+            except OSError:
+                # ENOBUFS: очередь переполнена, часть событий потеряна
+                return True
+            for msg_type, _, _ in parse_messages(data):
+                if msg_type in (RTM_NEWLINK, RTM_DELLINK):
+                    self.events += 1
+                    changed = True
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+class Ethtool:
+    """Запросы SIOCETHTOOL через один сокет"""
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.calls = 0
+
+    def request(self, interface: str, command: bytes, size: int) -> Optional[bytes]:
+        """ioctl с буфером команды; None, если драйвер не поддерживает запрос"""
+        buffer = ctypes.create_string_buffer(command, max(size, len(command)))
+        name = interface.encode()[:IFNAMSIZ - 1]
+        ifreq = struct.pack(f'{IFNAMSIZ}sP', name, ctypes.addressof(buffer))
+        ifreq += b'\0' * (IFREQ_SIZE - len(ifreq))
+        self.calls += 1
+        try:
+            fcntl.ioctl(self.sock.fileno(), SIOCETHTOOL, ifreq)
+        except OSError:
+            return None
+        return buffer.raw[:size]
+
+    def drvinfo(self, interface: str) -> Optional[Dict[str, Any]]:
+        """Драйвер, версия прошивки, шина и число счетчиков (ethtool -i)"""
+        raw = self.request(interface, struct.pack('=I', ETHTOOL_GDRVINFO), DRVINFO.size)
+        if raw is None:
+            return None
+        fields = DRVINFO.unpack(raw)
+        return {
+            'driver': _cstring(fields[1]),
+            'version': _cstring(fields[2]),
+            'fw_version': _cstring(fields[3]),
+            'bus_info': _cstring(fields[4]),
+            'n_stats': fields[8]
+        }
+
+    def link_settings(self, interface: str) -> Optional[Dict[str, Any]]:
+        """Скорость (Мбит/с) и дуплекс (ethtool)"""
+        raw = self.request(interface, struct.pack('=I', ETHTOOL_GSET), ETHTOOL_CMD.size)
+        if raw is None:
+            return None
+        fields = ETHTOOL_CMD.unpack(raw)
+        speed = fields[3] | (fields[12] << 16)
+        return {
+            'speed_mbps': None if speed in (SPEED_UNKNOWN, 0xFFFF, 0) else speed,
+            'duplex': DUPLEX.get(fields[4], 'unknown'),
+            'autoneg': bool(fields[8])
+        }
+
+    def ts_info(self, interface: str) -> Optional[Dict[str, Any]]:
+        """Возможности timestamping и индекс PHC (ethtool -T)"""
+        raw = self.request(interface, struct.pack('=I', ETHTOOL_GET_TS_INFO), TS_INFO.size)
+        if raw is None:
+            return None
+        _, so_timestamping, phc_index, tx_types, rx_filters = TS_INFO.unpack(raw)
+        return {
+            'capabilities': _flag_names(so_timestamping, SOF_TIMESTAMPING),
+            'phc_index': phc_index,
+            'tx_types': _flag_names(tx_types, HWTSTAMP_TX_TYPES),
+            'rx_filters': _flag_names(rx_filters, HWTSTAMP_FILTERS)
+        }
+
+    def stat_names(self, interface: str, n_stats: int) -> Optional[List[str]]:
+        """Имена счетчиков драйвера (ETH_SS_STATS)"""
+        raw = self.request(interface, struct.pack('=III', ETHTOOL_GSTRINGS, ETH_SS_STATS, n_stats),
+                           12 + n_stats * ETH_GSTRING_LEN)
+        if raw is None:
+            return None
+        return [_cstring(raw[12 + i * ETH_GSTRING_LEN:12 + (i + 1) * ETH_GSTRING_LEN]) for i in range(n_stats)]
+
+    def stats(self, interface: str, n_stats: int) -> Optional[tuple]:
+        """Значения счетчиков драйвера в порядке stat_names()"""
+        raw = self.request(interface, struct.pack('=II', ETHTOOL_GSTATS, n_stats), 8 + n_stats * 8)
+        if raw is None:
+            return None
+        return struct.unpack_from(f'={n_stats}Q', raw, 8)
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+class NicStatistics:
+    """
+    Счетчики драйвера сетевой карты и их скорости в секунду
+
+    Таблица имен запрашивается один раз на (драйвер, число счетчиков) и
+    дальше каждое чтение - один ioctl ETHTOOL_GSTATS. Предыдущая выборка
+    каждого интерфейса хранится, по ней считаются скорости счетчиков,
+    относящихся к PTP (RATE_COUNTER_MARKERS). Уменьшение счетчика
+    (сброс драйвера) дает скорость None.
+    """
+
+    def __init__(self, ethtool: 'Ethtool', markers=RATE_COUNTER_MARKERS):
+        self.ethtool = ethtool
+        self.markers = markers
+        self._tables = {}
+        self._previous = {}
+        self.table_loads = 0
+
+    def _table(self, interface: str, driver: str, n_stats: int) -> Optional[tuple]:
+        key = (driver, n_stats)
+        table = self._tables.get(key)
+        if table is None:
+            names = self.ethtool.stat_names(interface, n_stats)
+            if names is None:
+                return None
+            rated = [i for i, name in enumerate(names) if any(marker in name.lower() for marker in self.markers)]
+            table = self._tables[key] = (names, rated)
+            self.table_loads += 1
+        return table
+
+    def read(self, interface: str, driver: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Абсолютные значения всех счетчиков и скорости счетчиков PTP"""
+        if not driver or not driver.get('n_stats'):
+            return None
+        n_stats = driver['n_stats']
+        table = self._table(interface, driver['driver'], n_stats)
+        values = self.ethtool.stats(interface, n_stats)
+        if table is None or values is None:
+            return None
+        names, rated = table
+        now = time.monotonic()
+
+        rates = {}
+        previous = self._previous.get(interface)
+        if previous is not None and len(previous[1]) == n_stats:
+            elapsed = now - previous[0]
+            for i in rated:
+                delta = values[i] - previous[1][i]
+                rates[names[i]] = delta / elapsed if delta >= 0 and elapsed > 0 else None
+        self._previous[interface] = (now, values)
+        return {
+            'counters': dict(zip(names, values)),
+            'rates': rates,
+            'interval_seconds': now - previous[0] if previous is not None else None
+        }
+
+
+class NetdevCache:
+    """
+    Кэш интерфейсов и их возможностей с инвалидацией по событиям линков
+
+    Пока нет событий RTMGRP_LINK, повторный сбор не делает ни дампа
+    rtnetlink, ни ioctl: события приходят и при смене operstate/carrier,
+    так что кэшированные состояние и скорость остаются верными.
+    """
+
+    def __init__(self):
+        self.watcher = LinkWatcher()
+        self.ethtool = Ethtool()
+        self.statistics = NicStatistics(self.ethtool)
+        self.dumps = 0
+        self.invalidations = 0
+        self._links = None
+        self._details = {}
+        self._lock = threading.Lock()
+
+    def links(self) -> Dict[str, Dict[str, Any]]:
+        """Интерфейсы по именам (дамп только после событий линков)"""
+        with self._lock:
+            if self.watcher.changed() or self._links is None:
+                if self._links is not None:
+                    self.invalidations += 1
+                self._links = {link['name']: link for link in list_links() if 'name' in link}
+                self._details = {}
+                self.dumps += 1
+            return self._links
+
+    def details(self, interface: str) -> Optional[Dict[str, Any]]:
+        """Состояние линка, драйвер, скорость и timestamping интерфейса"""
+        link = self.links().get(interface)
+        if link is None:
+            return None
+        with self._lock:
+            details = self._details.get(interface)
+            if details is None:
+                details = dict(link)
+                details['driver'] = self.ethtool.drvinfo(interface)
+                details['link_settings'] = self.ethtool.link_settings(interface)
+                details['timestamping'] = self.ethtool.ts_info(interface)
+                self._details[interface] = details
+            return details
+
+    def interface_statistics(self, interface: str) -> Optional[Dict[str, Any]]:
+        """Счетчики драйвера интерфейса и скорости счетчиков PTP"""
+        details = self.details(interface)
+        if details is None:
+            return None
+        with self._lock:
+            return self.statistics.read(interface, details['driver'])
+
+    def ptp_interfaces(self) -> List[str]:
+        """Ethernet интерфейсы с аппаратными часами PTP (PHC)"""
+        interfaces = []
+        for name, link in sorted(self.links().items(), key=lambda item: item[1]['index']):
+            if link['loopback'] or link['type'] != ARPHRD_ETHER:
+                continue
+            timestamping = self.details(name)['timestamping']
+            if timestamping and timestamping['phc_index'] >= 0:
+                interfaces.append(name)
+        return interfaces
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'dumps': self.dumps,
+            'invalidations': self.invalidations,
+            'link_events': self.watcher.events,
+            'ethtool_calls': self.ethtool.calls,
+            'stat_tables': self.statistics.table_loads
+        }
+
+    def close(self) -> None:
+        self.watcher.close()
+        self.ethtool.close()
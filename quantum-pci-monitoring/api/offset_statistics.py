@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Offset Statistics Module
+Гистограммы и скользящие квантили offset/drift между scrape Prometheus
+
+Все оценки обновляются за O(1) на выборку и не хранят сами выборки,
+поэтому их можно вести на частоте быстрого опроса (high_rate_hz).
+"""
+
+import bisect
+import math
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+# Границы корзин |offset| в нс и |drift| в ppb (le, +Inf добавляется автоматически)
+DEFAULT_BUCKETS = {
+    'offset_ns': (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 100000, 1000000),
+    'drift_ppb': (1, 5, 10, 50, 100, 500, 1000, 5000),
+}
+
+DEFAULT_QUANTILES = (0.5, 0.99, 0.999)
+
+
+class Histogram:
+    """Кумулятивная гистограмма в семантике Prometheus (счетчики не сбрасываются)"""
+
+    def __init__(self, buckets: Iterable[float]):
+        self.bounds = sorted(float(bound) for bound in buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def add(self, value: float) -> None:
+        # Число корзин фиксировано, поиск по границам - константа на выборку
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def buckets(self) -> List[List[Any]]:
+        """Пары [граница, накопленное число] с последней границей '+Inf'"""
+        result = []
+        total = 0
+        for bound, count in zip(self.bounds + [math.inf], self.counts):
+            total += count
+            result.append([bound, total])
+        return result
+
+
+class P2Quantile:
+    """
+    Оценка квантиля алгоритмом P² (Jain, Chlamtac, 1985)
+
+    Пять маркеров сдвигаются параболической интерполяцией по мере
+    поступления выборок: память и время на выборку постоянны.
+    """
+
+    def __init__(self, quantile: float):
+        self.quantile = quantile
+        self.count = 0
+        self._heights = []
+        self._positions = [0, 1, 2, 3, 4]
+        p = quantile
+        self._desired = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+        self._increments = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        heights = self._heights
+        if self.count <= 5:
+            bisect.insort(heights, value)
+            return
+
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = bisect.bisect_right(heights, value, 1, 4) - 1
+
+        positions = self._positions
+        for i in range(cell + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        for i in (1, 2, 3):
+            delta = self._desired[i] - positions[i]
+            if (delta >= 1 and positions[i + 1] - positions[i] > 1) or \
+                    (delta <= -1 and positions[i - 1] - positions[i] < -1):
+                step = 1 if delta > 0 else -1
+                height = self._parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (positions[i + step] - positions[i])
+                heights[i] = height
+                positions[i] += step
+
+    def _parabolic(self, i: int, step: int) -> float:
+        q, n = self._heights, self._positions
+        return q[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+            (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    def value(self) -> Optional[float]:
+        if not self.count:
+            return None
+        if self.count <= 5:
+            # До инициализации маркеров - точный квантиль по рангу
+            return self._heights[min(self.count - 1, round(self.quantile * (self.count - 1)))]
+        return self._heights[2]
+
+
+class FieldStatistics:
+    """
+    Статистика модуля одного поля (|offset_ns| или |drift_ppb|) устройства
+
+    Гистограмма накапливается с запуска, как счетчик Prometheus. Квантили
+    и максимум считаются по окнам window секунд: публикуются результаты
+    последнего завершенного окна (до его завершения - текущего), поэтому
+    при редком scrape видны хвосты распределения за все окно, а не только
+    последняя выборка.
+    """
+
+    def __init__(self, buckets: Iterable[float], quantiles: Iterable[float] = DEFAULT_QUANTILES,
+                 window: float = 60.0):
+        self.histogram = Histogram(buckets)
+        self.quantiles = tuple(quantiles)
+        self.window = window
+        self._window_start = None
+        self._estimators = None
+        self._max = None
+        self._published = None
+        self._lock = threading.Lock()
+
+    def _summary(self) -> Dict[str, Any]:
+        return {
+            'quantiles': {q: estimator.value() for q, estimator in self._estimators.items()},
+            'max': self._max,
+            'samples': next(iter(self._estimators.values())).count if self._estimators else 0,
+            'window_start': self._window_start
+        }
+
+    def add(self, value: float, timestamp: Optional[float] = None) -> None:
+        value = abs(value)
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            self.histogram.add(value)
+            if self._window_start is None or timestamp - self._window_start >= self.window:
+                if self._window_start is not None:
+                    self._published = self._summary()
+                self._window_start = timestamp
+                self._estimators = {q: P2Quantile(q) for q in self.quantiles}
+                self._max = value
+            for estimator in self._estimators.values():
+                estimator.add(value)
+            self._max = max(self._max, value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Гистограмма и квантили окна для экспорта"""
+        with self._lock:
+            window = self._published
+            if window is None and self._estimators is not None:
+                window = self._summary()
+            return {
+                'buckets': self.histogram.buckets(),
+                'count': self.histogram.count,
+                'sum': self.histogram.sum,
+                'window': window,
+                'window_seconds': self.window
+            }
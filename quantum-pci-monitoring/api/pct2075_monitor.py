@@ -4,11 +4,12 @@ PCT2075TP Temperature Monitor
 Мониторинг датчика температуры PCT2075TP через I2C
 """
 
-import subprocess
 import time
 import json
 from typing import Dict, Optional, Any
 
+from i2c_bus import get_bus
+
 class PCT2075Monitor:
     """
     Мониторинг датчика температуры PCT2075TP
@@ -16,6 +17,7 @@ class PCT2075Monitor:
     
     def __init__(self):
         self.i2c_bus = 1
+        self.bus = get_bus(self.i2c_bus)
         self.device_address = '48'  # PCT2075TP на адресе 0x48
         self.last_reading = None
         self.last_update = None
@@ -25,30 +27,15 @@ class PCT2075Monitor:
     def is_available(self) -> bool:
         """Проверка доступности PCT2075TP"""
         try:
-            result = subprocess.run(
-                ['i2cget', '-y', str(self.i2c_bus), f'0x{self.device_address}', '0x00', 'w'],
-                capture_output=True, text=True, timeout=5
-            )
-            return result.returncode == 0
+            self.bus.read_word_data(int(self.device_address, 16), 0x00)
+            return True
         except Exception:
             return False
     
     def _read_i2c_register(self, register: str) -> Optional[int]:
         """Чтение регистра I2C"""
         try:
-            result = subprocess.run(
-                ['i2cget', '-y', str(self.i2c_bus), f'0x{self.device_address}', register, 'w'],
-                capture_output=True, text=True, timeout=5
-            )
-            
-            if result.returncode == 0:
-                # Убираем 0x и преобразуем в int
-                hex_value = result.stdout.strip()
-                return int(hex_value, 16)
-            else:
-                print(f"❌ Ошибка чтения I2C {self.device_address}:{register} - {result.stderr}")
-                return None
-                
+            return self.bus.read_word_data(int(self.device_address, 16), int(register, 16))
         except Exception as e:
             print(f"❌ Ошибка чтения I2C {self.device_address}:{register} - {e}")
             return None
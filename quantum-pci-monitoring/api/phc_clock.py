@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+PHC Clock Module
+Чтение аппаратных часов PTP (PHC) без запуска testptp
+
+/dev/ptpN открывается один раз и используется как динамические POSIX
+часы: время - clock_gettime, подстройка частоты - clock_adjtime с
+modes = 0, возможности - ioctl PTP_CLOCK_GETCAPS. Часы открываются на
+чтение и запись, как в testptp: большинство ядер (в том числе 5.15, 6.1,
+6.6) отвечают EACCES на clock_adjtime без FMODE_WRITE даже при
+modes = 0. Без прав на запись открытие только на чтение все равно дает
+время, возможности и PTP_SYS_OFFSET*. Список часов и их имена берутся из
+/sys/class/ptp, поэтому чтение статуса стоит нескольких системных
+вызовов и может идти с частотой сэмплера.
+
+Расхождение PHC с CLOCK_REALTIME измеряется ioctl PTP_SYS_OFFSET_PRECISE
+(аппаратный cross-timestamp), PTP_SYS_OFFSET_EXTENDED (системное время
+снимается драйвером вплотную к чтению PHC) или PTP_SYS_OFFSET: из пачки
+выборок берется выборка с наименьшей задержкой чтения. Расхождение двух
+PHC - разность их расхождений с системными часами, измеренных подряд.
+"""
+
+import ctypes
+import errno
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+    _libc = ctypes.CDLL(None, use_errno=True)
+    _clock_adjtime = _libc.clock_adjtime
+    PHC_AVAILABLE = hasattr(time, 'clock_gettime_ns')
+except (ImportError, OSError, AttributeError):
+    PHC_AVAILABLE = False
+
+SYSFS_PTP = '/sys/class/ptp'
+
+# Идентификатор динамических часов по дескриптору (linux/posix-timers.h)
+CLOCKFD = 3
+
+# Частота struct timex - ppm с 16 битами дробной части
+SCALED_PPM = 65536
+
+# struct ptp_clock_caps: 9 полей int и 11 резервных (linux/ptp_clock.h)
+PTP_CLOCK_CAPS = struct.Struct('=9i44x')
+PTP_CLOCK_CAPS_FIELDS = ('max_adj', 'n_alarm', 'n_ext_ts', 'n_per_out', 'pps',
+                         'n_pins', 'cross_timestamping', 'adjust_phase', 'max_phase_adj')
+PTP_CLK_MAGIC = ord('=')
+
+# struct ptp_clock_time: секунды s64, наносекунды u32, резерв u32
+PTP_CLOCK_TIME = struct.Struct('=qI4x')
+PTP_MAX_SAMPLES = 25
+# Заголовок запросов PTP_SYS_OFFSET*: n_samples и три резервных u32
+PTP_SYS_OFFSET_HEADER = struct.Struct('=I12x')
+PTP_SYS_OFFSET_SIZE = PTP_SYS_OFFSET_HEADER.size + (2 * PTP_MAX_SAMPLES + 1) * PTP_CLOCK_TIME.size
+PTP_SYS_OFFSET_EXTENDED_SIZE = PTP_SYS_OFFSET_HEADER.size + 3 * PTP_MAX_SAMPLES * PTP_CLOCK_TIME.size
+# struct ptp_sys_offset_precise: device, sys_realtime, sys_monoraw и четыре резервных u32
+PTP_SYS_OFFSET_PRECISE_SIZE = 3 * PTP_CLOCK_TIME.size + 16
+
+# Ошибки, означающие, что драйвер не поддерживает запрос
+UNSUPPORTED_ERRNOS = (errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL)
+
+
+def _ioc(direction: int, magic: int, number: int, size: int) -> int:
+    return (direction << 30) | (size << 16) | (magic << 8) | number
+
+
+def _ior(magic: int, number: int, size: int) -> int:
+    return _ioc(2, magic, number, size)
+
+
+PTP_CLOCK_GETCAPS = _ior(PTP_CLK_MAGIC, 1, PTP_CLOCK_CAPS.size)
+PTP_SYS_OFFSET = _ioc(1, PTP_CLK_MAGIC, 5, PTP_SYS_OFFSET_SIZE)
+PTP_SYS_OFFSET_PRECISE = _ioc(3, PTP_CLK_MAGIC, 8, PTP_SYS_OFFSET_PRECISE_SIZE)
+PTP_SYS_OFFSET_EXTENDED = _ioc(3, PTP_CLK_MAGIC, 9, PTP_SYS_OFFSET_EXTENDED_SIZE)
+
+
+class Timeval(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_long), ('tv_usec', ctypes.c_long)]
+
+
+class Timex(ctypes.Structure):
+    """struct timex (linux/timex.h); выравнивание long добавляет ctypes"""
+    _fields_ = [
+        ('modes', ctypes.c_uint),
+        ('offset', ctypes.c_long),
+        ('freq', ctypes.c_long),
+        ('maxerror', ctypes.c_long),
+        ('esterror', ctypes.c_long),
+        ('status', ctypes.c_int),
+        ('constant', ctypes.c_long),
+        ('precision', ctypes.c_long),
+        ('tolerance', ctypes.c_long),
+        ('time', Timeval),
+        ('tick', ctypes.c_long),
+        ('ppsfreq', ctypes.c_long),
+        ('jitter', ctypes.c_long),
+        ('shift', ctypes.c_int),
+        ('stabil', ctypes.c_long),
+        ('jitcnt', ctypes.c_long),
+        ('calcnt', ctypes.c_long),
+        ('errcnt', ctypes.c_long),
+        ('stbcnt', ctypes.c_long),
+        ('tai', ctypes.c_int),
+        ('_reserved', ctypes.c_int * 11),
+    ]
+
+
+def fd_to_clockid(fd: int) -> int:
+    """FD_TO_CLOCKID: ((~fd) << 3) | CLOCKFD"""
+    return ((~fd) << 3) | CLOCKFD
+
+
+def scaled_ppm_to_ppb(freq: int) -> float:
+    return freq * 1000.0 / SCALED_PPM
+
+
+def parse_caps(raw: bytes) -> Dict[str, int]:
+    return dict(zip(PTP_CLOCK_CAPS_FIELDS, PTP_CLOCK_CAPS.unpack(raw)))
+
+
+def _clock_times(raw: bytes, offset: int, count: int) -> List[int]:
+    """Массив struct ptp_clock_time в наносекундах"""
+    times = []
+    for i in range(count):
+        seconds, nanoseconds = PTP_CLOCK_TIME.unpack_from(raw, offset + i * PTP_CLOCK_TIME.size)
+        times.append(seconds * 1000000000 + nanoseconds)
+    return times
+
+
+def parse_sys_offset(raw: bytes, samples: int) -> List[Tuple[int, int, int]]:
+    """PTP_SYS_OFFSET: sys, phc, sys, ... -> тройки (sys до, phc, sys после)"""
+    times = _clock_times(raw, PTP_SYS_OFFSET_HEADER.size, 2 * samples + 1)
+    return [(times[2 * i], times[2 * i + 1], times[2 * i + 2]) for i in range(samples)]
+
+
+def parse_sys_offset_extended(raw: bytes, samples: int) -> List[Tuple[int, int, int]]:
+    """PTP_SYS_OFFSET_EXTENDED: тройки (sys до, phc, sys после) по выборкам"""
+    times = _clock_times(raw, PTP_SYS_OFFSET_HEADER.size, 3 * samples)
+    return [tuple(times[3 * i:3 * i + 3]) for i in range(samples)]
+
+
+def best_sample(samples: List[Tuple[int, int, int]]) -> Dict[str, int]:
+    """
+    Выборка с наименьшей задержкой чтения: PHC сравнивается с серединой
+    интервала системного времени, погрешность - не больше половины задержки
+    """
+    before, phc, after = min(samples, key=lambda sample: sample[2] - sample[0])
+    sys_ns = before + (after - before) // 2
+    return {'offset_ns': phc - sys_ns, 'delay_ns': after - before, 'phc_ns': phc, 'sys_ns': sys_ns}
+
+
+def _read_attribute(path: Path) -> Optional[str]:
+    try:
+        return path.read_text().strip()
+    except OSError:
+        return None
+
+
+def list_clocks(root: str = SYSFS_PTP) -> List[Dict[str, Any]]:
+    """Часы PTP из sysfs: индекс, устройство, имя и сетевой интерфейс"""
+    clocks = []
+    base = Path(root)
+    if not base.is_dir():
+        return clocks
+    for entry in base.iterdir():
+        if not entry.name.startswith('ptp') or not entry.name[3:].isdigit():
+            continue
+        net = entry / 'device' / 'net'
+        try:
+            interfaces = sorted(path.name for path in net.iterdir())
+        except OSError:
+            interfaces = []
+        clocks.append({
+            'index': int(entry.name[3:]),
+            'device': f'/dev/{entry.name}',
+            'clock_name': _read_attribute(entry / 'clock_name'),
+            'interfaces': interfaces
+        })
+    return sorted(clocks, key=lambda clock: clock['index'])
+
+
+class PHCClock:
+    """Открытые часы /dev/ptpN"""
+
+    def __init__(self, device: str):
+        self.device = device
+        try:
+            self.fd = os.open(device, os.O_RDWR)
+            self.writable = True
+        except PermissionError:
+            self.fd = os.open(device, os.O_RDONLY)
+            self.writable = False
+        self.clockid = fd_to_clockid(self.fd)
+        self._caps = None
+        self._offset_methods = None
+
+    def time_ns(self) -> int:
+        """Время PHC (нс, шкала часов - обычно TAI)"""
+        return time.clock_gettime_ns(self.clockid)
+
+    def adjtime(self) -> Timex:
+        """clock_adjtime с modes = 0: текущая подстройка без изменений"""
+        timex = Timex()
+        if _clock_adjtime(ctypes.c_int(self.clockid), ctypes.byref(timex)) < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), self.device)
+        return timex
+
+    def frequency_ppb(self) -> float:
+        """Текущая подстройка частоты PHC (ppb, testptp -f)"""
+        return scaled_ppm_to_ppb(self.adjtime().freq)
+
+    def caps(self) -> Dict[str, int]:
+        """Возможности часов (PTP_CLOCK_GETCAPS, testptp -c); не меняются, кэшируются"""
+        if self._caps is None:
+            buffer = bytearray(PTP_CLOCK_CAPS.size)
+            fcntl.ioctl(self.fd, PTP_CLOCK_GETCAPS, buffer)
+            self._caps = parse_caps(bytes(buffer))
+        return self._caps
+
+    def _sys_offset_precise(self, samples: int) -> Dict[str, int]:
+        buffer = bytearray(PTP_SYS_OFFSET_PRECISE_SIZE)
+        fcntl.ioctl(self.fd, PTP_SYS_OFFSET_PRECISE, buffer)
+        phc, sys_ns, _ = _clock_times(buffer, 0, 3)
+        return {'offset_ns': phc - sys_ns, 'delay_ns': 0, 'phc_ns': phc, 'sys_ns': sys_ns}
+
+    def _sys_offset_extended(self, samples: int) -> Dict[str, int]:
+        buffer = bytearray(PTP_SYS_OFFSET_HEADER.pack(samples))
+        buffer.extend(bytes(PTP_SYS_OFFSET_EXTENDED_SIZE - len(buffer)))
+        fcntl.ioctl(self.fd, PTP_SYS_OFFSET_EXTENDED, buffer)
+        return best_sample(parse_sys_offset_extended(buffer, samples))
+
+    def _sys_offset_basic(self, samples: int) -> Dict[str, int]:
+        buffer = bytearray(PTP_SYS_OFFSET_HEADER.pack(samples))
+        buffer.extend(bytes(PTP_SYS_OFFSET_SIZE - len(buffer)))
+        fcntl.ioctl(self.fd, PTP_SYS_OFFSET, buffer)
+        return best_sample(parse_sys_offset(buffer, samples))
+
+    def sys_offset(self, samples: int = 9) -> Dict[str, Any]:
+        """
+        Расхождение PHC - CLOCK_REALTIME (нс) и задержка чтения
+
+        Методы пробуются от точного к простому; неподдерживаемый драйвером
+        метод исключается при первом отказе, дальше сразу вызывается рабочий.
+        """
+        samples = max(1, min(samples, PTP_MAX_SAMPLES))
+        if self._offset_methods is None:
+            methods = [('extended', self._sys_offset_extended), ('basic', self._sys_offset_basic)]
+            try:
+                if self.caps().get('cross_timestamping'):
+                    methods.insert(0, ('precise', self._sys_offset_precise))
+            except OSError:
+                pass
+            self._offset_methods = methods
+        while self._offset_methods:
+            name, method = self._offset_methods[0]
+            try:
+                result = method(samples)
+            except OSError as e:
+                if e.errno not in UNSUPPORTED_ERRNOS or len(self._offset_methods) == 1:
+                    raise
+                self._offset_methods.pop(0)
+                continue
+            result['method'] = name
+            return result
+        raise OSError(errno.EOPNOTSUPP, 'PTP_SYS_OFFSET не поддерживается', self.device)
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Время, частота и возможности одним вызовом; ошибка чтения частоты
+        (EACCES без права записи) не мешает вернуть время и возможности
+        """
+        phc_ns = self.time_ns()
+        status = {
+            'device': self.device,
+            'time_ns': phc_ns,
+            'time': phc_ns / 1e9,
+            'frequency_ppb': None,
+            'caps': self.caps(),
+            'writable': self.writable
+        }
+        try:
+            status['frequency_ppb'] = self.frequency_ppb()
+        except OSError as e:
+            status['frequency_error'] = str(e)
+        return status
+
+    def close(self) -> None:
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class PHCRegistry:
+    """
+    Все часы PTP системы с открытыми дескрипторами
+
+    Состав часов сверяется с /sys/class/ptp на каждом вызове (чтение
+    каталога), дескрипторы новых часов открываются один раз и держатся
+    открытыми, исчезнувшие часы закрываются.
+    """
+
+    def __init__(self, root: str = SYSFS_PTP):
+        self.root = root
+        self.reads = 0
+        self.errors = 0
+        self._clocks = {}
+        self._lock = threading.Lock()
+
+    def clock(self, device: str) -> PHCClock:
+        """Открытые часы по пути /dev/ptpN (открываются при первом обращении)"""
+        with self._lock:
+            phc = self._clocks.get(device)
+            if phc is None:
+                phc = self._clocks[device] = PHCClock(device)
+            return phc
+
+    def _sync(self) -> List[Dict[str, Any]]:
+        listed = list_clocks(self.root)
+        devices = {clock['device'] for clock in listed}
+        for device in list(self._clocks):
+            if device not in devices:
+                self._clocks.pop(device).close()
+        for clock in listed:
+            if clock['device'] not in self._clocks:
+                try:
+                    self._clocks[clock['device']] = PHCClock(clock['device'])
+                except OSError as e:
+                    clock['error'] = str(e)
+        return listed
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Статус всех часов: время, частота, возможности, имя и интерфейсы"""
+        with self._lock:
+            result = []
+            for clock in self._sync():
+                phc = self._clocks.get(clock['device'])
+                if phc is not None:
+                    try:
+                        clock.update(phc.status())
+                        self.reads += 1
+                    except OSError as e:
+                        clock['error'] = str(e)
+                        self.errors += 1
+                result.append(clock)
+            return result
+
+    def stats(self) -> Dict[str, int]:
+        return {'open_clocks': len(self._clocks), 'reads': self.reads, 'errors': self.errors}
+
+    def close(self) -> None:
+        with self._lock:
+            for phc in self._clocks.values():
+                phc.close()
+            self._clocks = {}
+
+
+def timecard_clock(sysfs_path: str) -> Optional[str]:
+    """/dev/ptpN устройства Timecard по ссылке ptp в /sys/class/timecard/ocpN"""
+    try:
+        name = os.path.basename(os.path.realpath(os.path.join(sysfs_path, 'ptp'), strict=True))
+    except (OSError, TypeError):
+        return None
+    return f'/dev/{name}' if name.startswith('ptp') else None
+
+
+class PHCOffsetMeter:
+    """
+    Измерение расхождений PHC устройства с CLOCK_REALTIME и с PHC сетевых карт
+
+    Каждое измерение - пачка samples выборок на каждые часы; PHC↔PHC
+    считается как разность расхождений с системными часами, измеренных
+    подряд, задержка - сумма задержек обоих измерений.
+    """
+
+    def __init__(self, registry: Optional[PHCRegistry] = None, samples: int = 9,
+                 compare_phcs: bool = True):
+        self.registry = registry or PHCRegistry()
+        self.samples = samples
+        self.compare_phcs = compare_phcs
+        self.measurements = 0
+        self.errors = 0
+
+    def measure(self, device: str) -> Dict[str, Any]:
+        """Расхождения часов device: peers['sys'] и peers['ptpN'] для остальных PHC"""
+        reference = self.registry.clock(device).sys_offset(self.samples)
+        peers = {'sys': {'offset_ns': reference['offset_ns'], 'delay_ns': reference['delay_ns']}}
+        if self.compare_phcs:
+            for clock in list_clocks(self.registry.root):
+                if clock['device'] == device:
+                    continue
+                try:
+                    other = self.registry.clock(clock['device']).sys_offset(self.samples)
+                except OSError:
+                    self.errors += 1
+                    continue
+                peers[os.path.basename(clock['device'])] = {
+                    'offset_ns': reference['offset_ns'] - other['offset_ns'],
+                    'delay_ns': reference['delay_ns'] + other['delay_ns'],
+                    'interfaces': clock['interfaces']
+                }
+        self.measurements += 1
+        return {'device': device, 'method': reference['method'], 'peers': peers}
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Prometheus Collector Module
+Экспорт метрик Prometheus напрямую из кэша снимков сэмплера
+"""
+
+import threading
+import time
+from collections import namedtuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    from prometheus_client import CollectorRegistry, start_http_server
+    from prometheus_client.core import GaugeMetricFamily, HistogramMetricFamily
+    from prometheus_client.utils import floatToGoString
+    from prometheus_client.openmetrics.exposition import CONTENT_TYPE_LATEST, generate_latest
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+# Метка, получающая окончание ключа снимка ('device:ocp0' -> device_id="ocp0")
+KEY_LABELS = {'device:': 'device_id', 'sensor:': 'sensor', 'phc:': 'device_id'}
+
+STATUS_LEVELS = {'ok': 0, 'warning': 1, 'critical': 2}
+
+# Поле статистики выборок (offset_statistics.py) -> префикс имени и единица метрик
+STATISTICS_METRICS = {
+    'offset_ns': ('timecard_ptp_offset_abs', 'nanoseconds', '|offset|'),
+    'drift_ppb': ('timecard_ptp_drift_abs', 'ppb', '|drift|'),
+}
+
+# Колонка результата stability_analysis -> метрика
+STABILITY_METRICS = (
+    ('adev', 'timecard_oscillator_allan_deviation', 'Overlapping Allan deviation of the PHC offset'),
+    ('mdev', 'timecard_oscillator_modified_allan_deviation', 'Modified Allan deviation of the PHC offset'),
+    ('tdev_seconds', 'timecard_oscillator_time_deviation_seconds', 'Time deviation (TDEV) in seconds'),
+    ('mtie_seconds', 'timecard_oscillator_mtie_seconds', 'Maximum time interval error (MTIE) in seconds'),
+)
+
+
+def _count_severity(severity):
+    return lambda alerts: sum(1 for alert in alerts if alert.get('severity') == severity)
+
+
+# Строка таблицы: ключ снимка (точный или префикс 'device:'), путь к полю в снимке
+# ('*' перебирает ключи словаря и кладет их в очередную метку из labels),
+# имя и справка метрики, постоянные метки и преобразование значения
+MetricSpec = namedtuple('MetricSpec', 'key path name documentation labels const_labels transform')
+MetricSpec.__new__.__defaults__ = ((), (), None)
+
+METRICS = (
+    # === Устройство (ptp_ocp sysfs) ===
+    MetricSpec('device:', ('ptp', 'offset_ns'), 'timecard_ptp_offset_nanoseconds',
+               'PTP offset (clock_status_offset) in nanoseconds'),
+    MetricSpec('device:', ('ptp', 'drift_ppb'), 'timecard_ptp_drift_ppb',
+               'PTP drift (clock_status_drift) in ppb'),
+    MetricSpec('device:', ('ptp', 'status'), 'timecard_ptp_status',
+               'PTP offset status (0=ok, 1=warning, 2=critical)', transform=STATUS_LEVELS.get),
+    MetricSpec('device:', ('ptp', 'utc_tai_offset'), 'timecard_utc_tai_offset_seconds',
+               'UTC-TAI offset in seconds'),
+    MetricSpec('device:', ('ptp', 'tod_correction'), 'timecard_tod_correction',
+               'TOD correction value'),
+    MetricSpec('device:', ('gnss', 'status'), 'timecard_gnss_sync',
+               'GNSS sync state (1=SYNC, 0=otherwise)', transform=lambda status: status == 'ok'),
+    MetricSpec('device:', ('gnss', 'status'), 'timecard_gnss_status',
+               'GNSS status (0=ok, 1=warning, 2=critical)', transform=STATUS_LEVELS.get),
+    MetricSpec('device:', ('sma', '*', 'config'), 'timecard_sma_config_info',
+               'SMA connector configuration (value in label "config")', ('connector', 'config')),
+    MetricSpec('device:', ('alerts',), 'timecard_active_alerts',
+               'Number of active alerts by severity', const_labels=(('severity', 'critical'),),
+               transform=_count_severity('critical')),
+    MetricSpec('device:', ('alerts',), 'timecard_active_alerts',
+               'Number of active alerts by severity', const_labels=(('severity', 'warning'),),
+               transform=_count_severity('warning')),
+
+    # === Расхождения PHC устройства (PTP_SYS_OFFSET*) ===
+    MetricSpec('phc:', ('peers', '*', 'offset_ns'), 'timecard_phc_offset_nanoseconds',
+               'PHC offset to CLOCK_REALTIME (peer="sys") or to a NIC PHC in nanoseconds', ('peer',)),
+    MetricSpec('phc:', ('peers', '*', 'delay_ns'), 'timecard_phc_offset_delay_nanoseconds',
+               'Read delay of the minimum-delay PTP_SYS_OFFSET sample in nanoseconds', ('peer',)),
+
+    # === ptp4l (наборы данных по сокету управления) ===
+    MetricSpec('network:ptp4l', ('running',), 'timecard_ptp4l_up',
+               'ptp4l answered management queries (0/1)'),
+    MetricSpec('network:ptp4l', ('current_data_set', 'offset_from_master_ns'),
+               'timecard_ptp4l_offset_from_master_nanoseconds', 'ptp4l offsetFromMaster in nanoseconds'),
+    MetricSpec('network:ptp4l', ('current_data_set', 'mean_path_delay_ns'),
+               'timecard_ptp4l_mean_path_delay_nanoseconds', 'ptp4l meanPathDelay in nanoseconds'),
+    MetricSpec('network:ptp4l', ('current_data_set', 'steps_removed'),
+               'timecard_ptp4l_steps_removed', 'ptp4l stepsRemoved'),
+    MetricSpec('network:ptp4l', ('time_status_np', 'master_offset_ns'),
+               'timecard_ptp4l_master_offset_nanoseconds', 'ptp4l TIME_STATUS_NP master_offset in nanoseconds'),
+    MetricSpec('network:ptp4l', ('time_status_np', 'gm_present'),
+               'timecard_ptp4l_gm_present', 'Grandmaster present (0/1)'),
+    MetricSpec('network:ptp4l', ('parent_data_set', 'grandmaster_clock_class'),
+               'timecard_ptp4l_grandmaster_clock_class', 'Grandmaster clockClass'),
+    MetricSpec('network:ptp4l', ('ports', '*', 'port_state_code'), 'timecard_ptp4l_port_state',
+               'ptp4l port state (1=INITIALIZING ... 6=MASTER, 8=UNCALIBRATED, 9=SLAVE)', ('port',)),
+
+    # === Дополнительные датчики ===
+    MetricSpec('sensor:', ('available',), 'timecard_sensor_available',
+               'Sensor availability (0/1)'),
+    MetricSpec('sensor:ina219', ('devices', '*', 'bus_voltage', 'value'), 'timecard_ina219_bus_voltage_volts',
+               'INA219 bus voltage in volts', ('address',)),
+    MetricSpec('sensor:ina219', ('devices', '*', 'shunt_voltage', 'value'), 'timecard_ina219_shunt_voltage_volts',
+               'INA219 shunt voltage in volts', ('address',)),
+    MetricSpec('sensor:ina219', ('devices', '*', 'bus_voltage', 'filter_status'), 'timecard_ina219_filtered',
+               'INA219 bus voltage replaced by the filter (0/1)', ('address',),
+               transform=lambda status: status == 'filtered'),
+    MetricSpec('sensor:bmp280', ('temperature_c',), 'timecard_bmp280_temperature_celsius',
+               'BMP280 temperature in Celsius'),
+    MetricSpec('sensor:bmp280', ('pressure_pa',), 'timecard_bmp280_pressure_pascals',
+               'BMP280 pressure in pascals'),
+    MetricSpec('sensor:bno055', ('data', 'euler_angles', '*'), 'timecard_bno055_euler_degrees',
+               'BNO055 Euler angles in degrees', ('axis',)),
+    MetricSpec('sensor:bno055', ('data', 'calibration_status', '*'), 'timecard_bno055_calibration',
+               'BNO055 calibration level (0-3)', ('subsystem',)),
+    MetricSpec('sensor:bno055', ('data', 'temperature'), 'timecard_bno055_temperature_celsius',
+               'BNO055 temperature in Celsius'),
+)
+
+
+def _number(value) -> Optional[float]:
+    """Числовое значение или None для отсутствующих/нечисловых полей"""
+    if isinstance(value, (bool, int, float)):
+        return float(value)
+    return None
+
+
+def resolve(data: Any, path: Tuple[str, ...], bound: Tuple[str, ...] = ()) -> Iterator[Tuple[Tuple[str, ...], Any]]:
+    """Значения по пути с подстановками '*': пары (значения меток, значение поля)"""
+    for depth, step in enumerate(path):
+        if step == '*':
+            if not isinstance(data, dict):
+                return
+            for name, child in data.items():
+                yield from resolve(child, path[depth + 1:], bound + (str(name),))
+            return
+        if not isinstance(data, dict) or step not in data:
+            return
+        data = data[step]
+    yield bound, data
+
+
+class SnapshotCollector:
+    """
+    Collector prometheus_client, читающий кэш снимков при каждом scrape
+
+    Scrape не делает HTTP запросов и не обращается к sysfs/I2C: метрики
+    строятся из последних снимков сэмплера по таблице METRICS, поэтому они
+    не старше периода его источников. Таблица один раз группируется по
+    ключам снимков; при scrape для снимка проходят только его строки.
+    Возраст каждого снимка экспортируется отдельно
+    (timecard_snapshot_age_seconds), чтобы остановку сэмплера было видно.
+    """
+
+    def __init__(self, snapshots, metrics: Tuple[MetricSpec, ...] = METRICS, statistics=None, stability=None):
+        self.snapshots = snapshots
+        self.metrics = metrics
+        # Функция {device_id: {поле: FieldStatistics.snapshot()}} или None
+        self.statistics = statistics
+        # Функция {device_id: StabilityAccumulator.results()} или None
+        self.stability = stability
+        self._by_key = {}
+        self._by_prefix = {}
+        self._label_names = {}
+        self._plans = {}
+        for spec in metrics:
+            target = self._by_prefix if spec.key.endswith(':') else self._by_key
+            target.setdefault(spec.key, []).append(spec)
+            prefix = spec.key[:spec.key.index(':') + 1]
+            labels = [KEY_LABELS[prefix]] if spec.key.endswith(':') else []
+            labels += list(spec.labels) + [name for name, _ in spec.const_labels]
+            existing = self._label_names.setdefault(spec.name, (spec.documentation, labels))
+            if existing[1] != labels:
+                raise ValueError(f"Метрика {spec.name}: разные наборы меток в таблице")
+
+    def describe(self):
+        # Без describe реестр вызвал бы collect() при регистрации
+        return []
+
+    def specs_for(self, key: str) -> List[MetricSpec]:
+        """Строки таблицы, относящиеся к ключу снимка"""
+        return self._by_key.get(key, []) + self._by_prefix.get(key[:key.find(':') + 1], [])
+
+    def _plan(self, key: str) -> List[Tuple[MetricSpec, List[str], List[str]]]:
+        """Строки таблицы ключа с готовыми значениями меток ключа и постоянных меток"""
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = [(spec,
+                     [key[key.index(':') + 1:]] if spec.key.endswith(':') else [],
+                     [value for _, value in spec.const_labels])
+                    for spec in self.specs_for(key)]
+            self._plans[key] = plan
+        return plan
+
+    def collect(self) -> Iterator['GaugeMetricFamily']:
+        families = {name: GaugeMetricFamily(name, documentation, labels=labels)
+                    for name, (documentation, labels) in self._label_names.items()}
+        age = GaugeMetricFamily('timecard_snapshot_age_seconds',
+                                'Age of the sampler snapshot in seconds', labels=['key'])
+        stale = GaugeMetricFamily('timecard_snapshot_stale',
+                                  'Snapshot is older than its stale threshold (0/1)', labels=['key'])
+
+        now = time.time()
+        for key in sorted(self.snapshots.keys()):
+            entry = self.snapshots.get(key)
+            if entry is None:
+                continue
+            entry_age = max(0.0, now - entry['timestamp'])
+            age.add_metric([key], entry_age)
+            stale.add_metric([key], 1.0 if entry_age > entry['stale_after'] else 0.0)
+            self._add_samples(families, key, entry['data'])
+
+        yield from families.values()
+        yield age
+        yield stale
+        if self.statistics is not None:
+            yield from self._statistics_families(self.statistics())
+        if self.stability is not None:
+            yield from self._stability_families(self.stability())
+
+    def _statistics_families(self, statistics: Dict[str, Dict[str, Dict[str, Any]]]) -> Iterator[Any]:
+        """Гистограммы, квантили и максимум окна по выборкам быстрого опроса"""
+        for field, (prefix, unit, title) in STATISTICS_METRICS.items():
+            histogram = HistogramMetricFamily(f"{prefix}_{unit}",
+                                              f"Histogram of {title} samples in {unit}", labels=['device_id'])
+            quantiles = GaugeMetricFamily(f"{prefix}_quantile_{unit}",
+                                          f"Streaming quantiles of {title} over the last window",
+                                          labels=['device_id', 'quantile'])
+            maximum = GaugeMetricFamily(f"{prefix}_max_{unit}",
+                                        f"Maximum {title} over the last window", labels=['device_id'])
+            for device_id in sorted(statistics):
+                field_stats = statistics[device_id].get(field)
+                if field_stats is None:
+                    continue
+                buckets = [(floatToGoString(bound), count) for bound, count in field_stats['buckets']]
+                histogram.add_metric([device_id], buckets, field_stats['sum'])
+                window = field_stats['window']
+                if window is None:
+                    continue
+                for quantile, value in window['quantiles'].items():
+                    if value is not None:
+                        quantiles.add_metric([device_id, floatToGoString(quantile)], value)
+                maximum.add_metric([device_id], window['max'])
+            yield histogram
+            yield quantiles
+            yield maximum
+
+    def _stability_families(self, stability: Dict[str, Dict[str, Any]]) -> Iterator[Any]:
+        """ADEV/MDEV/TDEV/MTIE по лестнице τ"""
+        for column, name, documentation in STABILITY_METRICS:
+            family = GaugeMetricFamily(name, documentation, labels=['device_id', 'tau_seconds'])
+            for device_id in sorted(stability):
+                result = stability[device_id]
+                for tau, value in zip(result['tau_seconds'], result[column]):
+                    if value is not None:
+                        family.add_metric([device_id, floatToGoString(tau)], value)
+            yield family
+
+    def _add_samples(self, families: Dict[str, 'GaugeMetricFamily'], key: str, data: Dict[str, Any]) -> None:
+        for spec, key_labels, const_values in self._plan(key):
+            for bound, value in resolve(data, spec.path):
+                if spec.transform is not None:
+                    value = spec.transform(value)
+                if len(bound) < len(spec.labels):
+                    # Строковое значение уходит в последнюю метку (info-метрика)
+                    if not isinstance(value, str):
+                        continue
+                    bound, value = bound + (value,), 1
+                value = _number(value)
+                if value is not None:
+                    families[spec.name].add_metric(key_labels + list(bound) + const_values, value)
+
+
+class OpenMetricsRenderer:
+    """
+    Кэшированный текст OpenMetrics для /metrics основного API
+
+    Текст строится не чаще раза в max_age секунд (период самого частого
+    источника снимков) и отдается всем scrape этого окна без обхода
+    снимков, поэтому частый опрос несколькими репликами Prometheus не
+    добавляет работы. Одновременные scrape просроченного кэша ждут
+    одного построения, а не строят текст каждый.
+    """
+
+    def __init__(self, snapshots, max_age: float = 0.5, metrics: Tuple[MetricSpec, ...] = METRICS,
+                 statistics=None, stability=None):
+        self.snapshots = snapshots
+        self.max_age = max_age
+        self.registry = CollectorRegistry()
+        self.registry.register(SnapshotCollector(snapshots, metrics, statistics, stability))
+        self.renders = 0
+        self.hits = 0
+        self._body = None
+        self._rendered_at = 0.0
+        self._version = None
+        self._lock = threading.Lock()
+
+    def render(self) -> bytes:
+        """Текст OpenMetrics из кэша или построенный заново"""
+        with self._lock:
+            now = time.monotonic()
+            if self._body is not None and now - self._rendered_at < self.max_age:
+                self.hits += 1
+                return self._body
+            self._body = generate_latest(self.registry)
+            self._rendered_at = now
+            self._version = self.snapshots.version
+            self.renders += 1
+            return self._body
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики построений и попаданий в кэш"""
+        return {
+            'renders': self.renders,
+            'cache_hits': self.hits,
+            'max_age_seconds': self.max_age,
+            'snapshot_version': self._version,
+            'body_bytes': len(self._body) if self._body is not None else 0
+        }
+
+
+def start_collector_server(snapshots, port: int, host: str = '0.0.0.0', statistics=None,
+                           stability=None) -> 'CollectorRegistry':
+    """
+    Отдельный реестр с SnapshotCollector и HTTP сервер /metrics в этом процессе
+    """
+    registry = CollectorRegistry()
+    registry.register(SnapshotCollector(snapshots, statistics=statistics, stability=stability))
+    start_http_server(port, addr=host, registry=registry)
+    return registry
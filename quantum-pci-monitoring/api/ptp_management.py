@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+PTP Management Module
+Клиент управляющих сообщений ptp4l (как pmc -u) без запуска pmc
+
+Сообщения IEEE 1588 MANAGEMENT с TLV отправляются в UNIX сокет ptp4l
+(/var/run/ptp4l) с одного постоянного сокета клиента. Опрос - пачка
+GET CURRENT_DATA_SET, PARENT_DATA_SET, PORT_DATA_SET и TIME_STATUS_NP,
+ответы сопоставляются по sequenceId. boundaryHops = 0: запросы не
+уходят дальше локального ptp4l (pmc -b 0).
+"""
+
+import os
+import select
+import socket
+import struct
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+PMC_AVAILABLE = hasattr(socket, 'AF_UNIX')
+
+DEFAULT_SOCKET = '/var/run/ptp4l'
+
+# Общий заголовок сообщения PTP v2 и заголовок управляющего сообщения
+PTP_HEADER = struct.Struct('>BBHBBHq4x8sHHBb')
+MANAGEMENT_HEADER = struct.Struct('>8sHBBBx')
+TLV_HEADER = struct.Struct('>HHH')
+
+MESSAGE_TYPE_MANAGEMENT = 0xD
+PTP_VERSION = 2
+CONTROL_MANAGEMENT = 0x04
+LOG_INTERVAL_UNUSED = 0x7f
+
+ACTION_GET = 0
+ACTION_RESPONSE = 2
+
+TLV_MANAGEMENT = 0x0001
+TLV_MANAGEMENT_ERROR_STATUS = 0x0002
+
+WILDCARD_CLOCK = b'\xff' * 8
+WILDCARD_PORT = 0xffff
+
+# Наборы данных: managementId и формат поля данных
+CURRENT_DATA_SET = 0x2001
+PARENT_DATA_SET = 0x2002
+PORT_DATA_SET = 0x2004
+TIME_STATUS_NP = 0xC000
+
+DATA_SETS = {
+    # stepsRemoved, offsetFromMaster, meanPathDelay (TimeInterval - нс · 2^16)
+    CURRENT_DATA_SET: struct.Struct('>Hqq'),
+    # parentPortIdentity, parentStats, observedParentOffsetScaledLogVariance,
+    # observedParentClockPhaseChangeRate, grandmasterPriority1, grandmasterClockQuality,
+    # grandmasterPriority2, grandmasterIdentity
+    PARENT_DATA_SET: struct.Struct('>8sHBxHiBBBHB8s'),
+    # portIdentity, portState, logMinDelayReqInterval, peerMeanPathDelay, logAnnounceInterval,
+    # announceReceiptTimeout, logSyncInterval, delayMechanism, logMinPdelayReqInterval, versionNumber
+    PORT_DATA_SET: struct.Struct('>8sHBbqbBbBbB'),
+    # master_offset, ingress_time, cumulativeScaledRateOffset, scaledLastGmPhaseChange,
+    # gmTimeBaseIndicator, lastGmPhaseChange (ScaledNs), gmPresent, gmIdentity
+    TIME_STATUS_NP: struct.Struct('>qqiiH12si8s'),
+}
+
+DATA_SET_NAMES = {
+    CURRENT_DATA_SET: 'current_data_set',
+    PARENT_DATA_SET: 'parent_data_set',
+    PORT_DATA_SET: 'port_data_set',
+    TIME_STATUS_NP: 'time_status_np',
+}
+
+PORT_STATES = {
+    1: 'INITIALIZING', 2: 'FAULTY', 3: 'DISABLED', 4: 'LISTENING', 5: 'PRE_MASTER',
+    6: 'MASTER', 7: 'PASSIVE', 8: 'UNCALIBRATED', 9: 'SLAVE',
+}
+
+MANAGEMENT_ERRORS = {
+    0x0001: 'RESPONSE_TOO_BIG', 0x0002: 'NO_SUCH_ID', 0x0003: 'WRONG_LENGTH',
+    0x0004: 'WRONG_VALUE', 0x0005: 'NOT_SETABLE', 0x0006: 'NOT_SUPPORTED',
+    0xFFFE: 'GENERAL_ERROR',
+}
+
+
+def _identity(clock: bytes) -> str:
+    """clockIdentity в записи pmc: 001122.fffe.334455"""
+    text = clock.hex()
+    return f'{text[:6]}.{text[6:10]}.{text[10:]}'
+
+
+def _scaled_ns(value: int) -> float:
+    return value / 65536.0
+
+
+def build_message(management_id: int, sequence: int, action: int = ACTION_GET,
+                  data: Optional[bytes] = None, domain: int = 0, boundary_hops: int = 0,
+                  source: Tuple[bytes, int] = (b'\0' * 8, 0)) -> bytes:
+    """
+    Управляющее сообщение с одним TLV
+
+    Для GET поле данных заполняется нулями во всю длину набора данных,
+    как это делает pmc по умолчанию.
+    """
+    if data is None:
+        data = bytes(DATA_SETS[management_id].size) if management_id in DATA_SETS else b''
+    if len(data) % 2:
+        data += b'\0'
+    tlv = TLV_HEADER.pack(TLV_MANAGEMENT, 2 + len(data), management_id) + data
+    body = MANAGEMENT_HEADER.pack(WILDCARD_CLOCK, WILDCARD_PORT, boundary_hops, boundary_hops, action) + tlv
+    header = PTP_HEADER.pack(MESSAGE_TYPE_MANAGEMENT, PTP_VERSION, PTP_HEADER.size + len(body), domain, 0,
+                             0, 0, source[0], source[1], sequence, CONTROL_MANAGEMENT, LOG_INTERVAL_UNUSED)
+    return header + body
+
+
+def parse_data_set(management_id: int, data: bytes) -> Dict[str, Any]:
+    """Поле данных TLV в словарь с единицами pmc (TimeInterval - в нс)"""
+    layout = DATA_SETS[management_id]
+    fields = layout.unpack_from(data)
+    if management_id == CURRENT_DATA_SET:
+        return {
+            'steps_removed': fields[0],
+            'offset_from_master_ns': _scaled_ns(fields[1]),
+            'mean_path_delay_ns': _scaled_ns(fields[2])
+        }
+    if management_id == PARENT_DATA_SET:
+        return {
+            'parent_port_identity': f'{_identity(fields[0])}-{fields[1]}',
+            'parent_stats': fields[2],
+            'observed_parent_offset_scaled_log_variance': fields[3],
+            'observed_parent_clock_phase_change_rate': fields[4],
+            'grandmaster_priority1': fields[5],
+            'grandmaster_clock_class': fields[6],
+            'grandmaster_clock_accuracy': fields[7],
+            'grandmaster_offset_scaled_log_variance': fields[8],
+            'grandmaster_priority2': fields[9],
+            'grandmaster_identity': _identity(fields[10])
+        }
+    if management_id == PORT_DATA_SET:
+        return {
+            'port_identity': f'{_identity(fields[0])}-{fields[1]}',
+            'port_number': fields[1],
+            'port_state': PORT_STATES.get(fields[2], str(fields[2])),
+            'port_state_code': fields[2],
+            'log_min_delay_req_interval': fields[3],
+            'peer_mean_path_delay_ns': _scaled_ns(fields[4]),
+            'log_announce_interval': fields[5],
+            'announce_receipt_timeout': fields[6],
+            'log_sync_interval': fields[7],
+            'delay_mechanism': fields[8],
+            'log_min_pdelay_req_interval': fields[9],
+            'version_number': fields[10] & 0x0f
+        }
+    return {
+        'master_offset_ns': fields[0],
+        'ingress_time_ns': fields[1],
+        'cumulative_scaled_rate_offset': fields[2] / 2.0 ** 41,
+        'scaled_last_gm_phase_change': fields[3],
+        'gm_time_base_indicator': fields[4],
+        'gm_present': bool(fields[6]),
+        'gm_identity': _identity(fields[7])
+    }
+
+
+def parse_message(message: bytes) -> Optional[Dict[str, Any]]:
+    """Ответ ptp4l: sequenceId, managementId, данные или ошибка; None - не ответ"""
+    if len(message) < PTP_HEADER.size + MANAGEMENT_HEADER.size + TLV_HEADER.size:
+        return None
+    header = PTP_HEADER.unpack_from(message)
+    if header[0] & 0x0f != MESSAGE_TYPE_MANAGEMENT:
+        return None
+    body = MANAGEMENT_HEADER.unpack_from(message, PTP_HEADER.size)
+    if body[4] & 0x0f != ACTION_RESPONSE:
+        return None
+    offset = PTP_HEADER.size + MANAGEMENT_HEADER.size
+    tlv_type, length, management_id = TLV_HEADER.unpack_from(message, offset)
+    data = message[offset + TLV_HEADER.size:offset + 4 + length]
+    result = {'sequence': header[9], 'management_id': management_id, 'port_number': header[8]}
+    if tlv_type == TLV_MANAGEMENT_ERROR_STATUS:
+        # Для ошибки на месте managementId стоит код ошибки, затем managementId
+        result['error'] = MANAGEMENT_ERRORS.get(management_id, hex(management_id))
+        result['management_id'] = struct.unpack_from('>H', data)[0] if len(data) >= 2 else None
+        return result
+    if tlv_type != TLV_MANAGEMENT:
+        return None
+    if management_id in DATA_SETS and len(data) >= DATA_SETS[management_id].size:
+        result['data'] = parse_data_set(management_id, data)
+    return result
+
+
+class PMCClient:
+    """
+    Постоянное соединение с UNIX сокетом ptp4l
+
+    Сокет клиента привязывается к пути рядом с сокетом ptp4l (как у pmc:
+    /var/run/pmc.<pid>), ptp4l отвечает на этот адрес. Один опрос - все
+    запросы пачкой и ожидание ответов не дольше timeout.
+    """
+
+    def __init__(self, server: str = DEFAULT_SOCKET, client: Optional[str] = None,
+                 domain: int = 0, timeout: float = 0.2):
+        self.server = server
+        self.client = client or os.path.join(os.path.dirname(server) or '.', f'pmc.{os.getpid()}')
+        self.domain = domain
+        self.timeout = timeout
+        self.sock = None
+        self.polls = 0
+        self.errors = 0
+        self.last_status = None
+        self.last_poll = 0.0
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> socket.socket:
+        if self.sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            try:
+                if os.path.exists(self.client):
+                    os.unlink(self.client)
+                sock.bind(self.client)
+            except OSError:
+                sock.close()
+                raise
+            sock.setblocking(False)
+            self.sock = sock
+        return self.sock
+
+    def _next_sequence(self) -> int:
+        self._sequence = (self._sequence + 1) & 0xffff
+        return self._sequence
+
+    def query(self, management_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        GET набора managementId; ответы по каждому id (несколько для портовых
+        наборов данных - по одному от каждого порта)
+        """
+        with self._lock:
+            sock = self._connect()
+            # Ответы на прошлые опросы, пришедшие после таймаута
+            self._drain(sock)
+            pending = {}
+            for management_id in management_ids:
+                sequence = self._next_sequence()
+                pending[sequence] = management_id
+                try:
+                    sock.sendto(build_message(management_id, sequence, domain=self.domain), self.server)
+                except OSError:
+                    self.close_socket()
+                    raise
+
+            replies = {management_id: [] for management_id in management_ids}
+            deadline = time.monotonic() + self.timeout
+            while any(not answers for answers in replies.values()):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not select.select([sock], [], [], remaining)[0]:
+                    break
+                self._collect(sock, pending, replies)
+            # Остальные порты отвечают сразу за первым
+            self._collect(sock, pending, replies)
+            self.polls += 1
+            return replies
+
+    def _collect(self, sock: socket.socket, pending: Dict[int, int],
+                 replies: Dict[int, List[Dict[str, Any]]]) -> None:
+        while True:
+            try:
+                message = sock.recv(1024)
+            except BlockingIOError:
+                return
+            reply = parse_message(message)
+            if reply is None or reply['sequence'] not in pending:
+                continue
+            replies[pending[reply['sequence']]].append(reply)
+
+    def _drain(self, sock: socket.socket) -> None:
+        while True:
+            try:
+                sock.recv(1024)
+            except BlockingIOError:
+                return
+
+    def poll(self) -> Dict[str, Any]:
+        """
+        Состояние ptp4l: CURRENT_DATA_SET, PARENT_DATA_SET, TIME_STATUS_NP
+        и PORT_DATA_SET всех портов (по номерам портов); running = False,
+        если ptp4l не ответил
+        """
+        status = {'running': False, 'socket': self.server}
+        try:
+            replies = self.query(list(DATA_SET_NAMES))
+        except OSError as e:
+            status['error'] = str(e)
+            return self._record(status)
+        errors = {}
+        for management_id, answers in replies.items():
+            name = DATA_SET_NAMES[management_id]
+            for reply in answers:
+                if 'error' in reply:
+                    errors[name] = reply['error']
+            data = [reply['data'] for reply in answers if 'data' in reply]
+            if management_id == PORT_DATA_SET:
+                status['ports'] = {str(port['port_number']): port for port in data}
+            elif data:
+                status[name] = data[0]
+        status['running'] = any(replies.values())
+        if errors:
+            status['errors'] = errors
+        if not status['running']:
+            status['error'] = 'ptp4l не ответил'
+        return self._record(status)
+
+    def _record(self, status: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            if not status['running']:
+                self.errors += 1
+            self.last_status = status
+            self.last_poll = time.monotonic()
+        return status
+
+    def latest(self, max_age: float) -> Dict[str, Any]:
+        """Результат последнего опроса, если он не старше max_age секунд, иначе новый опрос"""
+        with self._lock:
+            if self.last_status is not None and time.monotonic() - self.last_poll <= max_age:
+                return self.last_status
+        return self.poll()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'polls': self.polls, 'errors': self.errors}
+
+    def close_socket(self) -> None:
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+            try:
+                os.unlink(self.client)
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        with self._lock:
+            self.close_socket()
+
+
+def servo_values(status: Dict[str, Any]) -> Dict[str, Any]:
+    """Поля истории: offsetFromMaster, meanPathDelay, master_offset и состояние первого порта"""
+    current = status.get('current_data_set', {})
+    ports = status.get('ports') or {}
+    first = ports[min(ports, key=int)] if ports else {}
+    return {
+        'offset_from_master_ns': current.get('offset_from_master_ns'),
+        'mean_path_delay_ns': current.get('mean_path_delay_ns'),
+        'master_offset_ns': status.get('time_status_np', {}).get('master_offset_ns'),
+        'port_state': first.get('port_state')
+    }
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Push Channel Module
+Рассылка изменений снимков по WebSocket комнатам в виде дельт
+"""
+
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Поля, которые меняются каждый цикл и не считаются изменением данных
+IGNORED_FIELDS = frozenset({'timestamp'})
+
+# Ключи комнат совпадают с ключами кэша снимков
+ROOM_PREFIXES = ('device:', 'sensor:', 'network:', 'phc:')
+
+
+def flatten(data: Any, prefix: Tuple[str, ...] = (), out: Optional[Dict] = None) -> Dict[Tuple[str, ...], Any]:
+    """Словарь путь -> значение листа (списки и пустые словари - листья)"""
+    if out is None:
+        out = {}
+    if isinstance(data, dict) and data:
+        for key, value in data.items():
+            if key in IGNORED_FIELDS:
+                continue
+            flatten(value, prefix + (str(key),), out)
+    else:
+        out[prefix] = data
+    return out
+
+
+def comparable(value: Any) -> Any:
+    """Лист без полей IGNORED_FIELDS в словарях списка (например, время создания алертов)"""
+    if isinstance(value, list):
+        return [comparable(item) for item in value]
+    if isinstance(value, dict):
+        return {key: comparable(item) for key, item in value.items() if key not in IGNORED_FIELDS}
+    return value
+
+
+class PushChannel:
+    """
+    Публикация снимков подписчикам комнат 'device:<id>', 'sensor:<имя>', 'network:ptp', 'phc:<id>'
+
+    При каждом обновлении снимка вычисляется разница с предыдущим
+    опубликованным состоянием ключа. Если изменились только отметки
+    времени, ничего не отправляется; иначе в комнату уходит кадр 'delta'
+    с порядковым номером seq. Клиент, пропустивший номер, запрашивает
+    'resync' и получает полное состояние с текущим seq.
+
+    Снимки обновляются из потоков сэмплера, а отправлять кадры можно
+    только из модели конкурентности сервера (зеленые потоки eventlet),
+    поэтому publish() кладет кадры в очередь, а фоновая задача сервера
+    (start) раз в flush_interval секунд отправляет их по порядку.
+    """
+
+    def __init__(self, socketio, snapshots, flush_interval: float = 0.05):
+        self.socketio = socketio
+        self.snapshots = snapshots
+        self.flush_interval = flush_interval
+        self._state = {}
+        self._outbox = deque()
+        self._lock = threading.Lock()
+        self.frames_sent = 0
+        self.frames_suppressed = 0
+        snapshots.add_listener(self.publish)
+
+    def publish(self, key: str, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Вычисление дельты для нового снимка и постановка ее в очередь отправки"""
+        flat = flatten(entry['data'])
+        with self._lock:
+            previous = self._state.get(key)
+            if previous is None:
+                changes = flat
+                removed = []
+                seq = 1
+            else:
+                changes = {path: value for path, value in flat.items()
+                           if path not in previous['flat']
+                           or comparable(previous['flat'][path]) != comparable(value)}
+                removed = [path for path in previous['flat'] if path not in flat]
+                if not changes and not removed:
+                    previous['data'] = entry['data']
+                    self.frames_suppressed += 1
+                    return None
+                seq = previous['seq'] + 1
+            self._state[key] = {'seq': seq, 'flat': flat, 'data': entry['data']}
+
+            frame = {
+                'key': key,
+                'seq': seq,
+                'changes': [[list(path), value] for path, value in changes.items()],
+                'removed': [list(path) for path in removed],
+                'timestamp': entry['timestamp']
+            }
+            # Постановка в очередь под блокировкой сохраняет порядок seq внутри комнаты
+            self._outbox.append(frame)
+        return frame
+
+    def flush(self) -> int:
+        """Отправка накопленных кадров в комнаты, возвращает их число"""
+        sent = 0
+        while self._outbox:
+            frame = self._outbox.popleft()
+            self.socketio.emit('delta', frame, to=frame['key'])
+            sent += 1
+        self.frames_sent += sent
+        return sent
+
+    def start(self) -> None:
+        """Запуск фоновой задачи отправки в модели конкурентности сервера"""
+        def flush_loop():
+            while True:
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"Ошибка отправки дельт: {e}")
+                self.socketio.sleep(self.flush_interval)
+
+        self.socketio.start_background_task(flush_loop)
+
+    def resync_frame(self, key: str) -> Dict[str, Any]:
+        """Полное состояние ключа с номером последней дельты"""
+        with self._lock:
+            state = self._state.get(key)
+            if state is not None:
+                seq, data = state['seq'], state['data']
+            else:
+                entry = self.snapshots.get(key)
+                seq, data = 0, entry['data'] if entry else None
+        entry = self.snapshots.get(key)
+        return {
+            'key': key,
+            'seq': seq,
+            'data': data,
+            'snapshot': self.snapshots.metadata(entry) if entry else None
+        }
+
+    def expand_keys(self, keys: Iterable[str]) -> List[str]:
+        """Разворачивание масок вида 'device:*' в существующие ключи"""
+        expanded = []
+        for key in keys:
+            if not isinstance(key, str) or not key.startswith(ROOM_PREFIXES):
+                continue
+            if key.endswith('*'):
+                expanded.extend(self.snapshots.keys(key[:-1]))
+            else:
+                expanded.append(key)
+        return list(dict.fromkeys(expanded))
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики отправленных и подавленных кадров"""
+        with self._lock:
+            return {
+                'keys': {key: state['seq'] for key, state in self._state.items()},
+                'frames_sent': self.frames_sent,
+                'frames_queued': len(self._outbox),
+                'frames_suppressed': self.frames_suppressed
+            }
@@ -4,20 +4,32 @@ Quantum-PCI Realistic Monitoring API
 Мониторинг ТОЛЬКО реальных метрик, доступных в ptp_ocp драйвере
 """
 
-from flask import Flask, jsonify, request, send_from_directory
-from flask_socketio import SocketIO
+from flask import Flask, Response, jsonify, request, send_from_directory
+from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_cors import CORS
-import subprocess
-import threading
 import time
 import os
 import glob
+import math
+import contextvars
+import functools
 from collections import deque, defaultdict
 from pathlib import Path
 
+from snapshot_cache import SnapshotCache
+from sysfs_reader import get_reader
+from metrics_history import MultiResolutionHistory
+from offset_statistics import FieldStatistics, DEFAULT_BUCKETS, DEFAULT_QUANTILES
+from stability_analysis import StabilityAccumulator, analyze, tau_ladder, uniform_phase
+from timeseries_store import TimeSeriesStore
+from push_channel import PushChannel
+from sampling_engine import SamplingEngine
+from i2c_bus import get_bus, MUX_ALL_CHANNELS
+
 # Импорт PTP мониторинга
 try:
-    from intel_network_monitor import get_ptp_network_metrics, get_ptp_network_health, get_ptp_network_ptp_metrics, get_ptp_interface_metrics
+    from intel_network_monitor import get_ptp_network_metrics, get_ptp_network_health, get_ptp_network_ptp_metrics, get_ptp_interface_metrics, get_ptp_interface_statistics, get_ptp_phc_status, get_ptp4l_status
+    from ptp_management import servo_values
     PTP_MONITORING_AVAILABLE = True
     print("✅ PTP мониторинг доступен")
 except ImportError as e:
@@ -47,24 +59,135 @@ print("❌ PCT2075 мониторинг отключен - датчик неис
 
 # Импорт BNO055 мониторинга
 try:
-    from bno055_monitor import BNO055Monitor
+    from bno055_monitor import bno055_monitor, get_bno055_data, get_bno055_info
     BNO055_MONITORING_AVAILABLE = True
     print("✅ BNO055 мониторинг доступен")
 except ImportError as e:
     BNO055_MONITORING_AVAILABLE = False
     print(f"⚠️  BNO055 мониторинг недоступен - {e}")
 
+# Расхождения PHC устройства с системными часами и PHC сетевых карт
+try:
+    from phc_clock import PHCOffsetMeter, timecard_clock, PHC_AVAILABLE
+except ImportError as e:
+    PHC_AVAILABLE = False
+    print(f"⚠️  Измерение расхождений PHC недоступно - {e}")
+
+# Экспорт метрик Prometheus из кэша снимков
+try:
+    from prometheus_collector import (OpenMetricsRenderer, start_collector_server,
+                                      CONTENT_TYPE_LATEST, PROMETHEUS_AVAILABLE)
+except ImportError as e:
+    PROMETHEUS_AVAILABLE = False
+    print(f"⚠️  Prometheus экспорт недоступен - {e}")
+
+# eventlet - рабочий режим сервера (см. run_server)
+try:
+    import eventlet  # noqa: F401
+    EVENTLET_AVAILABLE = True
+except ImportError:
+    EVENTLET_AVAILABLE = False
+
 
 # === Конфигурация ===
+# Поля многоуровневой истории устройства
+HISTORY_FIELDS = ('offset_ns', 'drift_ppb')
+HISTORY_ENUM_FIELDS = ('status', 'clock_source', 'gnss_sync')
+# Поля истории расхождений PHC (на каждую пару часов)
+PHC_HISTORY_FIELDS = ('offset_ns', 'delay_ns')
+# Последняя секунда 9999 года - предел datetime при разбиении на суточные сегменты
+MAX_TIMESTAMP = 253402300799.0
+# Поля истории сервопривода ptp4l (CURRENT_DATA_SET, TIME_STATUS_NP, PORT_DATA_SET)
+PTP4L_HISTORY_FIELDS = ('offset_from_master_ns', 'mean_path_delay_ns', 'master_offset_ns')
+PTP4L_HISTORY_ENUM_FIELDS = ('port_state',)
+
 CONFIG = {
     'version': '2.0.0-realistic',
     'server': {
-        'port': 8080,
+        'host': os.environ.get('MONITORING_HOST', '0.0.0.0'),
+        'port': int(os.environ.get('MONITORING_PORT', 8080)),
+        # 'eventlet' - рабочий режим, 'dev' - сервер разработки Werkzeug
+        'mode': os.environ.get('MONITORING_SERVER', 'eventlet'),
+        # Максимум одновременно обслуживаемых соединений в режиме eventlet
+        'concurrency': int(os.environ.get('MONITORING_CONCURRENCY', 1000)),
+        # Потоки eventlet.tpool, в которых выполняются обработчики HTTP (sysfs, I2C,
+        # SQLite, ioctl и сокет ptp4l блокируют поток и не должны выполняться на хабе)
+        'handler_threads': int(os.environ.get('MONITORING_HANDLER_THREADS', 32)),
         'cors_allowed_origins': ['http://localhost:8080', 'http://127.0.0.1:8080']
     },
     'monitoring': {
-        'update_interval_seconds': 5,
-        'history_maxlen': 1000,
+        # Частота опроса clock_status_offset/drift (0 - только полное чтение устройства)
+        'high_rate_hz': 10,
+        # Сырое кольцо истории (10 минут при 10 Гц) и уровни свертки (ширина, с; число корзин)
+        'history_raw_maxlen': 6000,
+        'history_tiers': [(1, 3600), (60, 1440), (3600, 168)],
+        # Ограничение числа точек в ответе /api/device/<id>/history
+        'history_max_points': 2000,
+        'snapshot_stale_after_seconds': 15,
+        # Гистограммы |offset|/|drift| (границы корзин) и квантили по окнам для /metrics;
+        # обновляются на каждой выборке истории, в том числе на частоте high_rate_hz
+        'statistics': {
+            'buckets': DEFAULT_BUCKETS,
+            'quantiles': DEFAULT_QUANTILES,
+            'window_seconds': 60,
+        },
+        # ADEV/MDEV/TDEV/MTIE: шаг ряда фазы, наибольшее τ инкрементальной оценки
+        # и пропуск (в шагах), который еще заполняется интерполяцией
+        'stability': {
+            'tau0_seconds': 1.0,
+            'max_tau_seconds': 1000,
+            'max_gap_samples': 5,
+        },
+        # PHC устройства <-> CLOCK_REALTIME и <-> PHC сетевых карт: выборок в пачке
+        # PTP_SYS_OFFSET* (берется выборка с наименьшей задержкой) и сравнение с PHC карт
+        'phc_offset': {
+            'samples': 9,
+            'compare_nic_phcs': True,
+        },
+    },
+    'sampling': {
+        # Случайный сдвиг запуска внутри слота, доля периода
+        'jitter': 0.05,
+        # Окно запусков для статистики задержек (/api/sampler/stats)
+        'stats_window': 512,
+        # Период (interval, с) и предельное время чтения (timeout, с) каждого источника;
+        # зависший источник пропускает запуски, не задерживая остальные
+        'sources': {
+            'device': {'interval': 1.0, 'timeout': 2.0},
+            # Период быстрых выборок задается monitoring.high_rate_hz
+            'offset': {'timeout': 0.5},
+            'ina219': {'interval': 0.5, 'timeout': 1.0},
+            'bmp280': {'interval': 5.0, 'timeout': 3.0},
+            'bno055': {'interval': 1.0, 'timeout': 3.0},
+            # Сетевые карты PTP: rtnetlink и ioctl ethtool с кэшем до событий линков
+            'network': {'interval': 30.0, 'timeout': 20.0},
+            # Счетчики драйверов PTP интерфейсов (один ioctl ETHTOOL_GSTATS на порт)
+            'network_stats': {'interval': 1.0, 'timeout': 1.0},
+            # Время и частота PHC (clock_gettime/clock_adjtime по открытым /dev/ptpN)
+            'network_phc': {'interval': 1.0, 'timeout': 1.0},
+            # Расхождения PHC устройства (по пачке ioctl PTP_SYS_OFFSET* на каждые часы)
+            'phc_offset': {'interval': 1.0, 'timeout': 0.5},
+            # Наборы данных ptp4l по его UNIX сокету (путь - переменная PTP4L_UDS)
+            'ptp4l': {'interval': 1.0, 'timeout': 0.5},
+        },
+    },
+    'prometheus': {
+        # /metrics основного API строится из кэша снимков (без HTTP опроса API)
+        'enabled': True,
+        # Готовый текст переиспользуется всеми scrape в течение периода самого
+        # частого источника снимков (sensor:ina219)
+        'render_cache_seconds': 0.5,
+        # Отдельный порт /metrics (как у прежнего экспортера), только если задан
+        'port': int(os.environ['PROMETHEUS_PORT']) if os.environ.get('PROMETHEUS_PORT') else None,
+    },
+    'timeseries': {
+        # Долговременное хранилище на диске (SQLite WAL, файл на сутки)
+        'enabled': True,
+        'directory': os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'timeseries'),
+        'retention_days': 14,
+        'flush_interval_seconds': 1.0,
+        # Быстрые выборки offset/drift пишутся на диск не чаще этого интервала
+        'device_interval_seconds': 1.0,
     },
     'alerts': {
         'ptp': {
@@ -84,22 +207,13 @@ def initialize_i2c_mux():
 
         # Параметры мультиплексора
         I2C_BUS = 1
-        MUX_ADDR = 0x70
-        MUX_VALUE = 0x0F  # Активация всех шин
+        MUX_VALUE = MUX_ALL_CHANNELS  # Активация всех шин
 
-        # Команда для настройки мультиплексора
-        cmd = f"i2cset -y {I2C_BUS} {MUX_ADDR:#x} {MUX_VALUE:#x}"
+        # Выбор каналов через общую шину (состояние кэшируется в ней же)
+        get_bus(I2C_BUS).select_mux_channels(MUX_VALUE, force=True)
 
-        print(f"   Выполнение: {cmd}")
-
-        # Выполняем команду
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-
-        if result.returncode == 0:
-            print("✅ Мультиплексор I2C успешно настроен")
-            print(f"   Активированы все шины мультиплексора (0x{MUX_VALUE:02X})")
-        else:
-            print(f"⚠️  Предупреждение: не удалось настроить мультиплексор: {result.stderr}")
+        print("✅ Мультиплексор I2C успешно настроен")
+        print(f"   Активированы все шины мультиплексора (0x{MUX_VALUE:02X})")
 
         # Небольшая пауза для стабилизации
         time.sleep(0.5)
@@ -118,7 +232,26 @@ initialize_i2c_mux()
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": CONFIG['server']['cors_allowed_origins']}})
-socketio = SocketIO(app, cors_allowed_origins=CONFIG['server']['cors_allowed_origins'])
+
+if CONFIG['server']['mode'] == 'eventlet' and not EVENTLET_AVAILABLE:
+    print("⚠️  eventlet не установлен - используется сервер разработки (pip install eventlet)")
+    CONFIG['server']['mode'] = 'dev'
+
+# Сэмплер работает в обычных потоках, поэтому monkey patching eventlet не применяется:
+# кадры WebSocket передаются серверу через очередь PushChannel, а обработчики HTTP
+# выполняются в пуле потоков (см. offload_views)
+socketio = SocketIO(app,
+                    async_mode='eventlet' if CONFIG['server']['mode'] == 'eventlet' else 'threading',
+                    cors_allowed_origins=CONFIG['server']['cors_allowed_origins'])
+
+@app.teardown_request
+def _yield_to_other_clients(exc):
+    """
+    Уступка хаба eventlet после каждого запроса: иначе keep-alive клиент,
+    шлющий запросы подряд, обслуживается раньше остальных соединений
+    """
+    if socketio.async_mode == 'eventlet':
+        socketio.sleep(0)
 
 class QuantumPCIRealisticMonitor:
     """
@@ -136,8 +269,55 @@ class QuantumPCIRealisticMonitor:
     
     def __init__(self):
         self.devices = self.discover_devices()
-        self.metrics_history = defaultdict(lambda: deque(maxlen=CONFIG['monitoring']['history_maxlen']))
+        self.snapshots = SnapshotCache(stale_after=CONFIG['monitoring']['snapshot_stale_after_seconds'])
+        self.metrics_history = defaultdict(lambda: MultiResolutionHistory(
+            HISTORY_FIELDS,
+            enum_fields=HISTORY_ENUM_FIELDS,
+            raw_maxlen=CONFIG['monitoring']['history_raw_maxlen'],
+            tiers=CONFIG['monitoring']['history_tiers']
+        ))
+        statistics = CONFIG['monitoring']['statistics']
+        self.offset_statistics = defaultdict(lambda: {
+            field: FieldStatistics(buckets, statistics['quantiles'], statistics['window_seconds'])
+            for field, buckets in statistics['buckets'].items()
+        })
+        stability = CONFIG['monitoring']['stability']
+        self.stability = defaultdict(lambda: StabilityAccumulator(
+            stability['tau0_seconds'],
+            tau_ladder(int(stability['max_tau_seconds'] / stability['tau0_seconds'])),
+            max_gap=stability['max_gap_samples']
+        ))
+        self.phc_history = defaultdict(lambda: MultiResolutionHistory(
+            PHC_HISTORY_FIELDS,
+            raw_maxlen=CONFIG['monitoring']['history_raw_maxlen'],
+            tiers=CONFIG['monitoring']['history_tiers']
+        ))
+        self.ptp4l_history = MultiResolutionHistory(
+            PTP4L_HISTORY_FIELDS,
+            enum_fields=PTP4L_HISTORY_ENUM_FIELDS,
+            raw_maxlen=CONFIG['monitoring']['history_raw_maxlen'],
+            tiers=CONFIG['monitoring']['history_tiers']
+        )
+        self.phc_meter = None
+        if PHC_AVAILABLE:
+            phc_offset = CONFIG['monitoring']['phc_offset']
+            self.phc_meter = PHCOffsetMeter(samples=phc_offset['samples'],
+                                            compare_phcs=phc_offset['compare_nic_phcs'])
         self.alert_history = deque(maxlen=100)
+        # Устройство -> {тип алерта: время первого появления}, пока алерт активен
+        self._alert_since = {}
+        self.store = None
+        self._last_stored = {}
+        if CONFIG['timeseries']['enabled']:
+            try:
+                self.store = TimeSeriesStore(
+                    CONFIG['timeseries']['directory'],
+                    retention_days=CONFIG['timeseries']['retention_days'],
+                    flush_interval=CONFIG['timeseries']['flush_interval_seconds']
+                )
+                self.store.start()
+            except Exception as e:
+                print(f"⚠️  Хранилище временных рядов недоступно - {e}")
         self.start_time = time.time()
         self.start_monitoring()
         
@@ -154,6 +334,7 @@ class QuantumPCIRealisticMonitor:
                         'id': device_id,
                         'sysfs_path': device_dir,
                         'serial': self._read_sysfs(device_dir, 'serialnum'),
+                        'phc': timecard_clock(device_dir) if PHC_AVAILABLE else None,
                         'type': 'Quantum-PCI TimeCard'
                     })
                     print(f"✅ Обнаружено устройство: {device_id}")
@@ -169,26 +350,24 @@ class QuantumPCIRealisticMonitor:
         return devices
     
     def _read_sysfs(self, device_path, attribute):
-        """Безопасное чтение из sysfs"""
-        try:
-            file_path = os.path.join(device_path, attribute)
-            if os.path.exists(file_path):
-                with open(file_path, 'r') as f:
-                    return f.read().strip()
-        except Exception as e:
-            print(f"Ошибка чтения {attribute}: {e}")
-        return None
+        """Безопасное чтение из sysfs (через постоянные дескрипторы)"""
+        return get_reader(device_path).read(attribute)
     
     def get_ptp_metrics(self, device):
         """Получение реальных PTP метрик из драйвера"""
         metrics = {}
         
         # РЕАЛЬНЫЕ метрики из ptp_ocp драйвера
-        offset_raw = self._read_sysfs(device['sysfs_path'], 'clock_status_offset')
-        drift_raw = self._read_sysfs(device['sysfs_path'], 'clock_status_drift')
-        clock_source = self._read_sysfs(device['sysfs_path'], 'clock_source')
-        utc_tai_offset_raw = self._read_sysfs(device['sysfs_path'], 'utc_tai_offset')
-        tod_correction_raw = self._read_sysfs(device['sysfs_path'], 'tod_correction')
+        # Все атрибуты читаются одним пакетом через открытые дескрипторы
+        raw = get_reader(device['sysfs_path']).read_many([
+            'clock_status_offset', 'clock_status_drift', 'clock_source',
+            'utc_tai_offset', 'tod_correction', 'irig_b_mode', 'ts_window_adjust'
+        ])
+        offset_raw = raw['clock_status_offset']
+        drift_raw = raw['clock_status_drift']
+        clock_source = raw['clock_source']
+        utc_tai_offset_raw = raw['utc_tai_offset']
+        tod_correction_raw = raw['tod_correction']
         
         # Парсинг значений
         try:
@@ -212,8 +391,8 @@ class QuantumPCIRealisticMonitor:
             metrics['tod_correction'] = 0
             
         # Настраиваемые параметры
-        irig_b_mode_raw = self._read_sysfs(device['sysfs_path'], 'irig_b_mode')
-        ts_window_adjust_raw = self._read_sysfs(device['sysfs_path'], 'ts_window_adjust')
+        irig_b_mode_raw = raw['irig_b_mode']
+        ts_window_adjust_raw = raw['ts_window_adjust']
         
         try:
             metrics['irig_b_mode'] = int(irig_b_mode_raw) if irig_b_mode_raw else 0
@@ -228,16 +407,19 @@ class QuantumPCIRealisticMonitor:
         metrics['clock_source'] = clock_source or 'UNKNOWN'
         
         # Статус на основе реальных пороговых значений
-        offset_abs = abs(metrics['offset_ns'])
-        if offset_abs > CONFIG['alerts']['ptp']['offset_ns']['critical']:
-            metrics['status'] = 'critical'
-        elif offset_abs > CONFIG['alerts']['ptp']['offset_ns']['warning']:
-            metrics['status'] = 'warning'
-        else:
-            metrics['status'] = 'ok'
+        metrics['status'] = self.offset_status(metrics['offset_ns'])
             
         return metrics
     
+    def offset_status(self, offset_ns):
+        """Статус PTP по порогам смещения"""
+        offset_abs = abs(offset_ns)
+        if offset_abs > CONFIG['alerts']['ptp']['offset_ns']['critical']:
+            return 'critical'
+        elif offset_abs > CONFIG['alerts']['ptp']['offset_ns']['warning']:
+            return 'warning'
+        return 'ok'
+    
     def get_gnss_status(self, device):
         """Получение статуса GNSS (ограниченные данные из драйвера)"""
         gnss_sync = self._read_sysfs(device['sysfs_path'], 'gnss_sync')
@@ -305,8 +487,7 @@ class QuantumPCIRealisticMonitor:
         temp_data = {}
         
         # Проверяем наличие temperature_table (только ART Card)
-        temp_table_path = os.path.join(device['sysfs_path'], 'temperature_table')
-        if os.path.exists(temp_table_path):
+        if get_reader(device['sysfs_path']).exists('temperature_table'):
             temp_data['temperature_table_available'] = True
             temp_data['note'] = 'Temperature table available (ART Card only)'
         else:
@@ -315,8 +496,13 @@ class QuantumPCIRealisticMonitor:
             
         return temp_data
     
-    def generate_alerts(self, device_data):
-        """Генерация алертов на основе реальных данных"""
+    def generate_alerts(self, device_data, device_id=None):
+        """
+        Генерация алертов на основе реальных данных
+        
+        timestamp алерта - время его первого появления: пока набор алертов
+        не меняется, снимок устройства не дает лишних дельт подписчикам.
+        """
         alerts = []
         
         ptp_data = device_data.get('ptp', {})
@@ -324,15 +510,13 @@ class QuantumPCIRealisticMonitor:
             alerts.append({
                 'type': 'ptp_offset_critical',
                 'message': f"PTP offset критический: {ptp_data.get('offset_ns', 0)} нс",
-                'severity': 'critical',
-                'timestamp': time.time()
+                'severity': 'critical'
             })
         elif ptp_data.get('status') == 'warning':
             alerts.append({
                 'type': 'ptp_offset_warning', 
                 'message': f"PTP offset предупреждение: {ptp_data.get('offset_ns', 0)} нс",
-                'severity': 'warning',
-                'timestamp': time.time()
+                'severity': 'warning'
             })
             
         gnss_data = device_data.get('gnss', {})
@@ -340,57 +524,323 @@ class QuantumPCIRealisticMonitor:
             alerts.append({
                 'type': 'gnss_sync_lost',
                 'message': f"GNSS синхронизация потеряна: {gnss_data.get('sync_status', 'UNKNOWN')}",
-                'severity': 'critical', 
-                'timestamp': time.time()
+                'severity': 'critical'
             })
-            
+        
+        now = time.time()
+        previous = self._alert_since.get(device_id, {})
+        since = {alert['type']: previous.get(alert['type'], now) for alert in alerts}
+        self._alert_since[device_id] = since
+        for alert in alerts:
+            alert['timestamp'] = since[alert['type']]
         return alerts
     
+    def collect_device_data(self, device):
+        """Сбор полного набора реальных данных устройства"""
+        device_data = {
+            'ptp': self.get_ptp_metrics(device),
+            'gnss': self.get_gnss_status(device),
+            'sma': self.get_sma_status(device),
+            'device_info': self.get_device_info(device),
+            'temperature': self.get_limited_temperature(device),
+            'timestamp': time.time()
+        }
+        device_data['alerts'] = self.generate_alerts(device_data, device['id'])
+        return device_data
+    
+    def refresh_device(self, device, source='sampler'):
+        """Чтение устройства и публикация снимка в кэш"""
+        device_data = self.collect_device_data(device)
+        self.snapshots.update(f"device:{device['id']}", device_data, source=source,
+                              timestamp=device_data['timestamp'])
+        return device_data
+    
+    def read_sensor(self, name):
+        """Чтение дополнительного датчика по имени"""
+        if name == 'ina219':
+            return get_ina219_data()
+        if name == 'bmp280':
+            return get_bmp280_data()
+        if name == 'bno055':
+            return get_bno055_data()
+        raise KeyError(name)
+    
+    def available_sensors(self):
+        """Список датчиков, для которых доступны модули мониторинга"""
+        sensors = []
+        if INA219_MONITORING_AVAILABLE:
+            sensors.append('ina219')
+        if BMP280_MONITORING_AVAILABLE:
+            sensors.append('bmp280')
+        if BNO055_MONITORING_AVAILABLE:
+            sensors.append('bno055')
+        return sensors
+    
+    def refresh_sensor(self, name, source='sampler'):
+        """Чтение датчика и публикация снимка в кэш"""
+        try:
+            data = self.read_sensor(name)
+        except Exception as e:
+            data = {'error': f'Ошибка чтения {name.upper()}: {e}', 'available': False}
+        self.snapshots.update(f"sensor:{name}", data, source=source)
+        if self.store is not None:
+            self.store.append_many(time.time(), self.sensor_series(name, data))
+        return data
+    
+    def sensor_series(self, name, data):
+        """Числовые значения датчика для хранилища временных рядов"""
+        series = {}
+        if not data.get('available'):
+            return series
+        if name == 'ina219':
+            for address, device_data in data.get('devices', {}).items():
+                if not device_data.get('available'):
+                    continue
+                for quantity in ('bus_voltage', 'shunt_voltage', 'current', 'power'):
+                    if isinstance(device_data.get(quantity), dict):
+                        series[f"sensor.ina219.{address}.{quantity}"] = device_data[quantity].get('value')
+        elif name == 'bmp280':
+            series['sensor.bmp280.temperature_c'] = data.get('temperature_c')
+            series['sensor.bmp280.pressure_pa'] = data.get('pressure_pa')
+        elif name == 'bno055':
+            reading = data.get('data', {})
+            for group in ('euler_angles', 'calibration_status'):
+                for key, value in reading.get(group, {}).items():
+                    series[f"sensor.bno055.{group}.{key}"] = value
+            series['sensor.bno055.temperature'] = reading.get('temperature')
+        return series
+    
+    def refresh_network(self, source='sampler'):
+        """Чтение метрик сетевых карт PTP (rtnetlink/ethtool ioctl) и публикация снимка"""
+        data = get_ptp_network_metrics()
+        self.snapshots.update('network:ptp', data, source=source,
+                              stale_after=3 * CONFIG['sampling']['sources']['network']['interval'])
+        return data
+    
+    def refresh_network_stats(self, source='sampler'):
+        """Счетчики драйверов PTP интерфейсов и их скорости в секунду"""
+        data = {'interfaces': get_ptp_interface_statistics(), 'timestamp': time.time()}
+        self.snapshots.update('network:stats', data, source=source,
+                              stale_after=3 * CONFIG['sampling']['sources']['network_stats']['interval'])
+        return data
+    
+    def refresh_network_phc(self, source='sampler'):
+        """Время, частота и возможности аппаратных часов PTP"""
+        data = dict(get_ptp_phc_status(), timestamp=time.time())
+        self.snapshots.update('network:phc', data, source=source,
+                              stale_after=3 * CONFIG['sampling']['sources']['network_phc']['interval'])
+        return data
+    
+    def refresh_ptp4l(self, source='sampler'):
+        """Состояние ptp4l (offsetFromMaster, meanPathDelay, состояние портов) в историю"""
+        status = get_ptp4l_status()
+        timestamp = time.time()
+        data = dict(status, timestamp=timestamp)
+        self.snapshots.update('network:ptp4l', data, source=source,
+                              stale_after=3 * CONFIG['sampling']['sources']['ptp4l']['interval'])
+        if not status.get('running'):
+            return data
+        values = servo_values(status)
+        self.ptp4l_history.add(timestamp, values)
+        if self.store is not None and \
+                timestamp - self._last_stored.get('ptp4l', 0.0) >= CONFIG['timeseries']['device_interval_seconds']:
+            self._last_stored['ptp4l'] = timestamp
+            self.store.append_many(timestamp, {f"ptp4l.{field}": value for field, value in values.items()
+                                               if value is not None})
+        return data
+    
+    def get_device_snapshot(self, device, fresh=False):
+        """
+        Снимок устройства из кэша сэмплера
+        
+        При fresh=True (или если сэмплер еще не успел отработать)
+        устройство читается синхронно, а кэш обновляется.
+        """
+        entry = self.snapshots.get_or_refresh(f"device:{device['id']}",
+                                              lambda: self.refresh_device(device, source='fresh'), fresh)
+        return entry['data'], self.snapshots.metadata(entry)
+    
+    def get_sensor_snapshot(self, name, fresh=False):
+        """Снимок датчика из кэша сэмплера (см. get_device_snapshot)"""
+        entry = self.snapshots.get_or_refresh(f"sensor:{name}",
+                                              lambda: self.refresh_sensor(name, source='fresh'), fresh)
+        return entry['data'], self.snapshots.metadata(entry)
+    
+    def get_network_snapshot(self, fresh=False):
+        """Снимок метрик сетевых карт PTP (см. get_device_snapshot)"""
+        entry = self.snapshots.get_or_refresh('network:ptp', lambda: self.refresh_network(source='fresh'), fresh)
+        return entry['data'], self.snapshots.metadata(entry)
+    
+    def get_network_phc_snapshot(self, fresh=False):
+        """Снимок статуса PHC (см. get_device_snapshot)"""
+        entry = self.snapshots.get_or_refresh('network:phc', lambda: self.refresh_network_phc(source='fresh'), fresh)
+        return entry['data'], self.snapshots.metadata(entry)
+    
+    def get_network_stats_snapshot(self, fresh=False):
+        """Снимок счетчиков сетевых карт PTP (см. get_device_snapshot)"""
+        entry = self.snapshots.get_or_refresh('network:stats', lambda: self.refresh_network_stats(source='fresh'), fresh)
+        return entry['data'], self.snapshots.metadata(entry)
+    
+    def sample_offset_drift(self, device):
+        """Быстрое чтение динамических атрибутов устройства в историю"""
+        raw = get_reader(device['sysfs_path']).read_dynamic()
+        try:
+            values = {
+                'offset_ns': int(raw['clock_status_offset']),
+                'drift_ppb': int(raw['clock_status_drift'])
+            }
+        except (ValueError, TypeError):
+            return None
+        values['status'] = self.offset_status(values['offset_ns'])
+        values['clock_source'] = raw['clock_source']
+        values['gnss_sync'] = raw['gnss_sync']
+        self.record_history(device, time.time(), values)
+        return values
+    
+    def record_history(self, device, timestamp, values):
+        """Запись выборки в историю в памяти и (с прореживанием) на диск"""
+        self.metrics_history[device['id']].add(timestamp, values)
+        for field, statistics in self.offset_statistics[device['id']].items():
+            if values.get(field) is not None:
+                statistics.add(values[field], timestamp)
+        if values.get('offset_ns') is not None:
+            self.stability[device['id']].add(timestamp, values['offset_ns'])
+        if self.store is None:
+            return
+        if timestamp - self._last_stored.get(device['id'], 0.0) < CONFIG['timeseries']['device_interval_seconds']:
+            return
+        self._last_stored[device['id']] = timestamp
+        self.store.append_many(timestamp, {
+            f"device.{device['id']}.{field}": value for field, value in values.items()
+        })
+    
+    def sample_phc_offset(self, device, source='sampler'):
+        """Расхождения PHC устройства с CLOCK_REALTIME и PHC сетевых карт в историю"""
+        measurement = self.phc_meter.measure(device['phc'])
+        timestamp = time.time()
+        for peer, values in measurement['peers'].items():
+            self.phc_history[f"{device['id']}:{peer}"].add(timestamp, values)
+        data = dict(measurement, timestamp=timestamp)
+        self.snapshots.update(f"phc:{device['id']}", data, source=source,
+                              stale_after=3 * CONFIG['sampling']['sources']['phc_offset']['interval'])
+        
+        stored_key = f"{device['id']}:phc"
+        if self.store is not None and \
+                timestamp - self._last_stored.get(stored_key, 0.0) >= CONFIG['timeseries']['device_interval_seconds']:
+            self._last_stored[stored_key] = timestamp
+            self.store.append_many(timestamp, {
+                f"device.{device['id']}.phc.{peer}.{field}": values[field]
+                for peer, values in measurement['peers'].items() for field in PHC_HISTORY_FIELDS
+            })
+        return data
+    
+    def statistics_snapshot(self):
+        """Гистограммы и квантили offset/drift всех устройств для Prometheus"""
+        return {device_id: {field: statistics.snapshot() for field, statistics in fields.items()}
+                for device_id, fields in list(self.offset_statistics.items())}
+    
+    def stability_snapshot(self):
+        """Инкрементальные ADEV/MDEV/TDEV/MTIE всех устройств"""
+        return {device_id: accumulator.results() for device_id, accumulator in list(self.stability.items())}
+    
+    def sample_device(self, device):
+        """Полное чтение устройства; без быстрого режима пополняет и историю"""
+        device_data = self.refresh_device(device)
+        if not CONFIG['monitoring']['high_rate_hz']:
+            self.record_history(device, device_data['timestamp'], {
+                'offset_ns': device_data['ptp']['offset_ns'],
+                'drift_ppb': device_data['ptp']['drift_ppb'],
+                'status': device_data['ptp']['status'],
+                'clock_source': device_data['ptp']['clock_source'],
+                'gnss_sync': device_data['gnss']['sync_status']
+            })
+        return device_data
+    
     def start_monitoring(self):
-        """Запуск фонового мониторинга"""
-        def monitor_loop():
-            while True:
-                try:
-                    for device in self.devices:
-                        # Сбор ТОЛЬКО реальных данных
-                        device_data = {
-                            'ptp': self.get_ptp_metrics(device),
-                            'gnss': self.get_gnss_status(device),
-                            'sma': self.get_sma_status(device),
-                            'device_info': self.get_device_info(device),
-                            'temperature': self.get_limited_temperature(device),
-                            'timestamp': time.time()
-                        }
-                        
-                        # Генерация алертов
-                        alerts = self.generate_alerts(device_data)
-                        device_data['alerts'] = alerts
-                        
-                        # Сохранение в историю
-                        self.metrics_history[device['id']].append(device_data)
-                        
-                        # WebSocket обновления
-                        socketio.emit('device_update', {
-                            'device_id': device['id'],
-                            'ptp_offset': device_data['ptp']['offset_ns'],
-                            'ptp_drift': device_data['ptp']['drift_ppb'],
-                            'gnss_status': device_data['gnss']['sync_status'],
-                            'timestamp': time.time()
-                        })
-                        
-                except Exception as e:
-                    print(f"Ошибка в цикле мониторинга: {e}")
-                    
-                time.sleep(CONFIG['monitoring']['update_interval_seconds'])
+        """
+        Запуск фонового мониторинга
+        
+        Каждый источник (устройство, быстрый offset/drift, датчики, сетевые
+        карты PTP) - отдельная задача движка со своим периодом и таймаутом.
+        """
+        sampling = CONFIG['sampling']
+        sources = sampling['sources']
+        high_rate_hz = CONFIG['monitoring']['high_rate_hz']
+        self.engine = SamplingEngine(jitter=sampling['jitter'], window=sampling['stats_window'])
+        
+        for device in self.devices:
+            self.engine.add_source(f"device:{device['id']}", lambda d=device: self.sample_device(d),
+                                   sources['device']['interval'], timeout=sources['device']['timeout'])
+            if high_rate_hz:
+                # Быстрые выборки без разброса: важна равномерность ряда
+                self.engine.add_source(f"offset:{device['id']}", lambda d=device: self.sample_offset_drift(d),
+                                       1.0 / high_rate_hz, timeout=sources['offset']['timeout'], jitter=0.0)
+            if self.phc_meter is not None and device.get('phc'):
+                self.engine.add_source(f"phc:{device['id']}", lambda d=device: self.sample_phc_offset(d),
+                                       sources['phc_offset']['interval'], timeout=sources['phc_offset']['timeout'])
+        
+        for sensor in self.available_sensors():
+            self.engine.add_source(f"sensor:{sensor}", lambda name=sensor: self.refresh_sensor(name),
+                                   sources[sensor]['interval'], timeout=sources[sensor]['timeout'])
+        
+        if PTP_MONITORING_AVAILABLE:
+            self.engine.add_source('network:ptp', self.refresh_network,
+                                   sources['network']['interval'], timeout=sources['network']['timeout'])
+            self.engine.add_source('network:stats', self.refresh_network_stats,
+                                   sources['network_stats']['interval'], timeout=sources['network_stats']['timeout'])
+            self.engine.add_source('network:phc', self.refresh_network_phc,
+                                   sources['network_phc']['interval'], timeout=sources['network_phc']['timeout'])
+            self.engine.add_source('network:ptp4l', self.refresh_ptp4l,
+                                   sources['ptp4l']['interval'], timeout=sources['ptp4l']['timeout'])
         
-        monitor_thread = threading.Thread(target=monitor_loop, daemon=True)
-        monitor_thread.start()
+        self.engine.start()
 
 # Создание экземпляра монитора
 monitor = QuantumPCIRealisticMonitor()
 
+# Рассылка изменений снимков подписчикам WebSocket
+push = PushChannel(socketio, monitor.snapshots)
+push.start()
+
+# Prometheus /metrics в этом же процессе
+metrics_renderer = None
+if CONFIG['prometheus']['enabled'] and PROMETHEUS_AVAILABLE:
+    metrics_renderer = OpenMetricsRenderer(monitor.snapshots, CONFIG['prometheus']['render_cache_seconds'],
+                                           statistics=monitor.statistics_snapshot,
+                                           stability=monitor.stability_snapshot)
+    if CONFIG['prometheus']['port']:
+        try:
+            start_collector_server(monitor.snapshots, CONFIG['prometheus']['port'], CONFIG['server']['host'],
+                                   statistics=monitor.statistics_snapshot,
+                                   stability=monitor.stability_snapshot)
+            print(f"📊 Prometheus метрики: http://localhost:{CONFIG['prometheus']['port']}/metrics")
+        except OSError as e:
+            print(f"⚠️  Не удалось запустить Prometheus экспорт на порту {CONFIG['prometheus']['port']}: {e}")
+
 # === API ROUTES ===
 
+def _wants_fresh():
+    """Запрошено ли чтение в обход кэша снимков (?fresh=1)"""
+    return request.args.get('fresh', '').lower() in ('1', 'true', 'yes')
+
+def _time_range(default_span):
+    """
+    Параметры from/to запроса (по умолчанию - последние default_span секунд)
+    
+    ValueError, если это не числа или не отметки времени в 0..MAX_TIMESTAMP:
+    inf, nan и -1e20 проходят float(), но ломают datetime и разбиение по дням.
+    """
+    until = float(request.args.get('to', time.time()))
+    since = float(request.args.get('from', until - default_span))
+    for value in (since, until):
+        if not 0 <= value <= MAX_TIMESTAMP:
+            raise ValueError(f'отметка времени {value} вне диапазона 0..{MAX_TIMESTAMP:.0f}')
+    return since, until
+
+def _find_device(device_id):
+    """Поиск устройства по идентификатору"""
+    return next((d for d in monitor.devices if d['id'] == device_id), None)
+
 @app.route('/')
 def main_page():
     """Главная страница - красивый дашборд"""
@@ -424,6 +874,15 @@ def api_index():
         'endpoints': {
             'devices': '/api/devices',
             'device_status': '/api/device/<device_id>/status', 
+            'device_history': '/api/device/<device_id>/history?from=&to=&step=&fields=',
+            'device_stability': '/api/device/<device_id>/stability?from=&to=&resolution=',
+            'device_phc_offset': '/api/device/<device_id>/phc-offset?from=&to=&step=',
+            'timeseries': '/api/timeseries?series=&from=&to=&step=',
+            'sampler_stats': '/api/sampler/stats',
+            'prometheus_metrics': '/metrics',
+            'ptp_network_stats': '/api/ptp-network/stats',
+            'ptp_network_phc': '/api/ptp-network/phc',
+            'ptp4l': '/api/ptp-network/ptp4l?from=&to=&step=',
             'real_metrics': '/api/metrics/real',
             'alerts': '/api/alerts',
             'roadmap': '/api/roadmap'
@@ -478,10 +937,11 @@ def api_roadmap():
 @app.route('/api/devices')
 def api_devices():
     """Список обнаруженных устройств"""
+    fresh = _wants_fresh()
     devices_info = []
     for device in monitor.devices:
-        device_info = monitor.get_device_info(device)
-        devices_info.append(device_info)
+        device_data, snapshot = monitor.get_device_snapshot(device, fresh=fresh)
+        devices_info.append(dict(device_data['device_info'], snapshot=snapshot))
     
     return jsonify({
         'count': len(monitor.devices),
@@ -493,59 +953,225 @@ def api_devices():
 @app.route('/api/device/<device_id>/status')
 def api_device_status(device_id):
     """Статус конкретного устройства"""
-    device = next((d for d in monitor.devices if d['id'] == device_id), None)
+    device = _find_device(device_id)
+    if not device:
+        return jsonify({'error': 'Device not found'}), 404
+    
+    device_data, snapshot = monitor.get_device_snapshot(device, fresh=_wants_fresh())
+    return jsonify(dict(device_data, snapshot=snapshot))
+
+@app.route('/api/device/<device_id>/history')
+def api_device_history(device_id):
+    """
+    История offset/drift устройства с прореживанием на сервере
+    
+    Параметры: from, to (unix время, по умолчанию последний час),
+    step (ширина корзины в секундах), fields (через запятую).
+    """
+    device = _find_device(device_id)
     if not device:
         return jsonify({'error': 'Device not found'}), 404
     
-    device_data = {
-        'ptp': monitor.get_ptp_metrics(device),
-        'gnss': monitor.get_gnss_status(device),
-        'sma': monitor.get_sma_status(device),
-        'device_info': monitor.get_device_info(device),
-        'temperature': monitor.get_limited_temperature(device),
+    max_points = CONFIG['monitoring']['history_max_points']
+    try:
+        since, until = _time_range(3600)
+        step = float(request.args.get('step', 0)) or (until - since) / max_points
+    except ValueError as e:
+        return jsonify({'error': 'from, to и step должны быть числами', 'message': str(e)}), 400
+    
+    fields = [f for f in request.args.get('fields', ','.join(HISTORY_FIELDS)).split(',') if f]
+    unknown = [f for f in fields if f not in HISTORY_FIELDS]
+    if unknown:
+        return jsonify({'error': f'Неизвестные поля: {", ".join(unknown)}',
+                        'available_fields': list(HISTORY_FIELDS)}), 400
+    if until <= since or not 0 < step < math.inf:
+        return jsonify({'error': 'Требуется from < to и step > 0'}), 400
+    
+    # Не более max_points корзин в ответе
+    step = max(step, (until - since) / max_points)
+    history = monitor.metrics_history[device_id]
+    resolution, points = history.downsample(since, until, step, fields)
+    
+    return jsonify({
+        'device_id': device_id,
+        'from': since,
+        'to': until,
+        'step': step,
+        'fields': fields,
+        'source_resolution': resolution,
+        'available_resolutions': history.resolutions(),
+        'points': points,
         'timestamp': time.time()
-    }
+    })
+
+@app.route('/api/device/<device_id>/phc-offset')
+def api_device_phc_offset(device_id):
+    """
+    Расхождения PHC устройства с CLOCK_REALTIME (peer "sys") и PHC сетевых карт
+    
+    Последнее измерение и история по каждой паре часов с прореживанием;
+    параметры from, to, step - как у /api/device/<id>/history.
+    """
+    device = _find_device(device_id)
+    if not device:
+        return jsonify({'error': 'Device not found'}), 404
+    if monitor.phc_meter is None or not device.get('phc'):
+        return jsonify({'error': 'PHC устройства недоступен',
+                        'message': 'Нет ссылки ptp в sysfs устройства или /dev/ptpN'}), 503
+    
+    max_points = CONFIG['monitoring']['history_max_points']
+    try:
+        since, until = _time_range(3600)
+        step = float(request.args.get('step', 0)) or (until - since) / max_points
+    except ValueError as e:
+        return jsonify({'error': 'from, to и step должны быть числами', 'message': str(e)}), 400
+    if until <= since or not 0 < step < math.inf:
+        return jsonify({'error': 'Требуется from < to и step > 0'}), 400
+    step = max(step, (until - since) / max_points)
     
-    device_data['alerts'] = monitor.generate_alerts(device_data)
-    return jsonify(device_data)
+    entry = monitor.snapshots.get(f"phc:{device_id}")
+    if entry is None or _wants_fresh():
+        try:
+            monitor.sample_phc_offset(device, source='fresh')
+        except OSError as e:
+            return jsonify({'error': 'Ошибка измерения расхождения PHC', 'message': str(e)}), 500
+        entry = monitor.snapshots.get(f"phc:{device_id}")
+    
+    history = {}
+    prefix = f"{device_id}:"
+    for key, peer_history in list(monitor.phc_history.items()):
+        if key.startswith(prefix):
+            resolution, points = peer_history.downsample(since, until, step, list(PHC_HISTORY_FIELDS))
+            history[key[len(prefix):]] = {'source_resolution': resolution, 'points': points}
+    
+    return jsonify({
+        'device_id': device_id,
+        'phc': device['phc'],
+        'latest': entry['data'],
+        'snapshot': monitor.snapshots.metadata(entry),
+        'from': since,
+        'to': until,
+        'step': step,
+        'history': history,
+        'timestamp': time.time()
+    })
+
+@app.route('/api/device/<device_id>/stability')
+def api_device_stability(device_id):
+    """
+    ADEV/MDEV/TDEV/MTIE по истории offset устройства
+    
+    Параметры: from, to (unix время, по умолчанию последний час),
+    resolution (raw, 1s, 1m, 1h; по умолчанию 1s). Ряд берется из
+    последнего непрерывного участка истории; running - инкрементальные
+    оценки сэмплера с момента запуска.
+    """
+    device = _find_device(device_id)
+    if not device:
+        return jsonify({'error': 'Device not found'}), 404
+    
+    history = monitor.metrics_history[device_id]
+    resolution = request.args.get('resolution', '1s')
+    if resolution not in history.resolutions():
+        return jsonify({'error': f'Неизвестное разрешение: {resolution}',
+                        'available_resolutions': history.resolutions()}), 400
+    try:
+        since, until = _time_range(3600)
+    except ValueError as e:
+        return jsonify({'error': 'from и to должны быть числами', 'message': str(e)}), 400
+    
+    columns = history.query_columns(resolution, since, until)
+    if resolution == 'raw':
+        high_rate_hz = CONFIG['monitoring']['high_rate_hz']
+        tau0 = 1.0 / high_rate_hz if high_rate_hz else CONFIG['sampling']['sources']['device']['interval']
+        values = columns['offset_ns']
+    else:
+        tau0 = float(next(tier['width'] for tier in history.tiers if tier['label'] == resolution))
+        values = columns['offset_ns_last']
+    phase = uniform_phase(columns['timestamp'], values, tau0,
+                          max_gap=CONFIG['monitoring']['stability']['max_gap_samples'])
+    
+    return jsonify({
+        'device_id': device_id,
+        'from': since,
+        'to': until,
+        'resolution': resolution,
+        'stability': analyze(phase, tau0),
+        'running': monitor.stability[device_id].results(),
+        'timestamp': time.time()
+    })
+
+@app.route('/api/timeseries')
+def api_timeseries():
+    """
+    Точки ряда из хранилища на диске
+    
+    Параметры: series (например device.ocp0.offset_ns), from, to
+    (unix время, по умолчанию последние сутки), step (ширина корзины в
+    секундах; из корзины берется последняя точка, корзин не более
+    history_max_points).
+    """
+    if monitor.store is None:
+        return jsonify({'error': 'Хранилище временных рядов отключено'}), 503
+    
+    name = request.args.get('series')
+    if not name:
+        return jsonify({'error': 'Параметр series обязателен',
+                        'series': monitor.store.series()}), 400
+    max_points = CONFIG['monitoring']['history_max_points']
+    try:
+        since, until = _time_range(86400)
+        step = float(request.args.get('step', 0)) or (until - since) / max_points
+    except ValueError as e:
+        return jsonify({'error': 'from, to и step должны быть числами', 'message': str(e)}), 400
+    if until <= since or not 0 < step < math.inf:
+        return jsonify({'error': 'Требуется from < to и step > 0'}), 400
+    step = max(step, (until - since) / max_points)
+    
+    points = monitor.store.query(name, since, until, step)
+    return jsonify({
+        'series': name,
+        'from': since,
+        'to': until,
+        'step': step,
+        'count': len(points),
+        'points': points,
+        'timestamp': time.time()
+    })
+
+@app.route('/api/timeseries/series')
+def api_timeseries_series():
+    """Список рядов в хранилище на диске"""
+    if monitor.store is None:
+        return jsonify({'error': 'Хранилище временных рядов отключено'}), 503
+    
+    return jsonify({
+        'series': monitor.store.series(request.args.get('prefix', '')),
+        'segments': monitor.store.segments(),
+        'retention_days': monitor.store.retention_days,
+        'timestamp': time.time()
+    })
 
 @app.route('/api/metrics/real')
 def api_real_metrics():
     """Реальные метрики всех устройств"""
+    fresh = _wants_fresh()
     all_metrics = {}
     
     for device in monitor.devices:
+        device_data, snapshot = monitor.get_device_snapshot(device, fresh=fresh)
         all_metrics[device['id']] = {
-            'ptp': monitor.get_ptp_metrics(device),
-            'gnss': monitor.get_gnss_status(device),
-            'sma': monitor.get_sma_status(device),
-            'timestamp': time.time()
+            'ptp': device_data['ptp'],
+            'gnss': device_data['gnss'],
+            'sma': device_data['sma'],
+            'timestamp': device_data['timestamp'],
+            'snapshot': snapshot
         }
     
-    # Добавляем INA219 данные если доступны
-    if INA219_MONITORING_AVAILABLE:
-        try:
-            ina219_data = get_ina219_data()
-            all_metrics['ina219'] = ina219_data
-        except Exception as e:
-            all_metrics['ina219'] = {'error': f'Ошибка чтения INA219: {e}'}
-    
-    # Добавляем BMP280 данные если доступны
-    if BMP280_MONITORING_AVAILABLE:
-        try:
-            bmp280_data = get_bmp280_data()
-            all_metrics['bmp280'] = bmp280_data
-        except Exception as e:
-            all_metrics['bmp280'] = {'error': f'Ошибка чтения BMP280: {e}'}
-    
-    # Добавляем BNO055 данные если доступны
-    if BNO055_MONITORING_AVAILABLE:
-        try:
-            bno055_monitor = BNO055Monitor()
-            bno055_data = bno055_monitor.get_sensor_data()
-            all_metrics['bno055'] = bno055_data
-        except Exception as e:
-            all_metrics['bno055'] = {'error': f'Ошибка чтения BNO055: {e}'}
+    # INA219, BMP280 и BNO055 данные из снимков сэмплера
+    for sensor in monitor.available_sensors():
+        sensor_data, snapshot = monitor.get_sensor_snapshot(sensor, fresh=fresh)
+        all_metrics[sensor] = dict(sensor_data, snapshot=snapshot)
     
     return jsonify({
         'metrics': all_metrics,
@@ -560,11 +1186,12 @@ def api_ina219():
         return jsonify({'error': 'INA219 мониторинг недоступен'})
     
     try:
-        data = get_ina219_data()
+        data, snapshot = monitor.get_sensor_snapshot('ina219', fresh=_wants_fresh())
         info = get_ina219_info()
         return jsonify({
             'data': data,
             'info': info,
+            'snapshot': snapshot,
             'timestamp': time.time()
         })
     except Exception as e:
@@ -572,21 +1199,34 @@ def api_ina219():
 
 
 
+@app.route('/api/sampler/stats')
+def api_sampler_stats():
+    """Фактический период, пропущенные дедлайны и задержки каждого источника"""
+    return jsonify({
+        'sources': monitor.engine.stats(),
+        'jitter': CONFIG['sampling']['jitter'],
+        'stats_window': CONFIG['sampling']['stats_window'],
+        'metrics_render': metrics_renderer.stats() if metrics_renderer else None,
+        'timestamp': time.time()
+    })
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Метрики Prometheus в формате OpenMetrics из кэша снимков"""
+    if metrics_renderer is None:
+        return jsonify({'error': 'Prometheus экспорт недоступен (prometheus_client не установлен)'}), 503
+    return Response(metrics_renderer.render(), content_type=CONTENT_TYPE_LATEST)
+
 @app.route('/api/alerts')
 def api_alerts():
     """Активные алерты"""
+    fresh = _wants_fresh()
     all_alerts = []
     
     for device in monitor.devices:
-        device_data = {
-            'ptp': monitor.get_ptp_metrics(device),
-            'gnss': monitor.get_gnss_status(device)
-        }
-        
-        alerts = monitor.generate_alerts(device_data)
-        for alert in alerts:
-            alert['device_id'] = device['id']
-            all_alerts.append(alert)
+        device_data, _ = monitor.get_device_snapshot(device, fresh=fresh)
+        for alert in device_data['alerts']:
+            all_alerts.append(dict(alert, device_id=device['id']))
     
     return jsonify({
         'alerts': all_alerts,
@@ -624,14 +1264,89 @@ def api_ptp_network():
         }), 503
     
     try:
-        metrics = get_ptp_network_metrics()
-        return jsonify(metrics)
+        metrics, snapshot = monitor.get_network_snapshot(fresh=_wants_fresh())
+        return jsonify(dict(metrics, snapshot=snapshot))
     except Exception as e:
         return jsonify({
             'error': 'Ошибка получения метрик PTP',
             'message': str(e)
         }), 500
 
+@app.route('/api/ptp-network/stats')
+def api_ptp_network_stats():
+    """Счетчики драйверов PTP интерфейсов и скорости счетчиков timestamping/потерь"""
+    if not PTP_MONITORING_AVAILABLE:
+        return jsonify({
+            'error': 'PTP мониторинг недоступен',
+            'message': 'Модуль intel_network_monitor не найден'
+        }), 503
+    
+    try:
+        statistics, snapshot = monitor.get_network_stats_snapshot(fresh=_wants_fresh())
+        return jsonify(dict(statistics, snapshot=snapshot))
+    except Exception as e:
+        return jsonify({
+            'error': 'Ошибка получения счетчиков сетевых карт',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/ptp-network/phc')
+def api_ptp_network_phc():
+    """Время, подстройка частоты и возможности PHC (/dev/ptpN)"""
+    if not PTP_MONITORING_AVAILABLE:
+        return jsonify({
+            'error': 'PTP мониторинг недоступен',
+            'message': 'Модуль intel_network_monitor не найден'
+        }), 503
+    
+    try:
+        status, snapshot = monitor.get_network_phc_snapshot(fresh=_wants_fresh())
+        return jsonify(dict(status, snapshot=snapshot))
+    except Exception as e:
+        return jsonify({
+            'error': 'Ошибка чтения PHC',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/ptp-network/ptp4l')
+def api_ptp_network_ptp4l():
+    """
+    Состояние ptp4l по сокету управления: наборы данных и история
+    offsetFromMaster/meanPathDelay/master_offset (параметры from, to, step)
+    """
+    if not PTP_MONITORING_AVAILABLE:
+        return jsonify({
+            'error': 'PTP мониторинг недоступен',
+            'message': 'Модуль intel_network_monitor не найден'
+        }), 503
+    
+    max_points = CONFIG['monitoring']['history_max_points']
+    try:
+        since, until = _time_range(3600)
+        step = float(request.args.get('step', 0)) or (until - since) / max_points
+    except ValueError as e:
+        return jsonify({'error': 'from, to и step должны быть числами', 'message': str(e)}), 400
+    if until <= since or not 0 < step < math.inf:
+        return jsonify({'error': 'Требуется from < to и step > 0'}), 400
+    step = max(step, (until - since) / max_points)
+    
+    entry = None if _wants_fresh() else monitor.snapshots.get('network:ptp4l')
+    if entry is None:
+        monitor.refresh_ptp4l(source='fresh')
+        entry = monitor.snapshots.get('network:ptp4l')
+    resolution, points = monitor.ptp4l_history.downsample(since, until, step, list(PTP4L_HISTORY_FIELDS))
+    
+    return jsonify({
+        'status': entry['data'],
+        'snapshot': monitor.snapshots.metadata(entry),
+        'from': since,
+        'to': until,
+        'step': step,
+        'source_resolution': resolution,
+        'points': points,
+        'timestamp': time.time()
+    })
+
 @app.route('/api/ptp-network/health')
 def api_ptp_network_health():
     """API для получения статуса здоровья PTP сетевых карт"""
@@ -774,8 +1489,8 @@ def api_bmp280_data():
         }), 503
     
     try:
-        data = get_bmp280_data()
-        return jsonify(data)
+        data, snapshot = monitor.get_sensor_snapshot('bmp280', fresh=_wants_fresh())
+        return jsonify(dict(data, snapshot=snapshot))
     except Exception as e:
         return jsonify({
             'error': f'Ошибка получения данных BMP280: {str(e)}',
@@ -810,13 +1525,14 @@ def api_bmp280_temperature():
         }), 503
     
     try:
-        from bmp280_monitor import bmp280_monitor
-        temperature = bmp280_monitor.get_temperature_only()
+        data, snapshot = monitor.get_sensor_snapshot('bmp280', fresh=_wants_fresh())
+        temperature = data.get('temperature_c')
         if temperature is not None:
             return jsonify({
                 'temperature_c': temperature,
-                'timestamp': time.time(),
-                'available': True
+                'timestamp': data.get('timestamp', time.time()),
+                'available': True,
+                'snapshot': snapshot
             })
         else:
             return jsonify({
@@ -839,15 +1555,16 @@ def api_bmp280_pressure():
         }), 503
     
     try:
-        from bmp280_monitor import bmp280_monitor
-        pressure = bmp280_monitor.get_pressure_only()
+        data, snapshot = monitor.get_sensor_snapshot('bmp280', fresh=_wants_fresh())
+        pressure = data.get('pressure_pa')
         if pressure is not None:
             return jsonify({
                 'pressure_pa': pressure,
                 'pressure_hpa': pressure / 100,
                 'pressure_mbar': pressure / 100,
-                'timestamp': time.time(),
-                'available': True
+                'timestamp': data.get('timestamp', time.time()),
+                'available': True,
+                'snapshot': snapshot
             })
         else:
             return jsonify({
@@ -870,9 +1587,8 @@ def api_bno055_data():
         }), 503
     
     try:
-        bno055_monitor = BNO055Monitor()
-        data = bno055_monitor.get_sensor_data()
-        return jsonify(data)
+        data, snapshot = monitor.get_sensor_snapshot('bno055', fresh=_wants_fresh())
+        return jsonify(dict(data, snapshot=snapshot))
     except Exception as e:
         return jsonify({
             'error': f'Ошибка получения данных BNO055: {str(e)}',
@@ -889,9 +1605,7 @@ def api_bno055_info():
         }), 503
     
     try:
-        bno055_monitor = BNO055Monitor()
-        info = bno055_monitor.get_device_info()
-        return jsonify(info)
+        return jsonify(get_bno055_info())
     except Exception as e:
         return jsonify({
             'error': f'Ошибка получения информации BNO055: {str(e)}',
@@ -908,9 +1622,9 @@ def api_bno055_calibration():
         }), 503
     
     try:
-        bno055_monitor = BNO055Monitor()
-        calibration = bno055_monitor.get_calibration_status()
-        return jsonify(calibration)
+        data, snapshot = monitor.get_sensor_snapshot('bno055', fresh=_wants_fresh())
+        calibration = bno055_monitor.get_calibration_status(data)
+        return jsonify(dict(calibration, snapshot=snapshot))
     except Exception as e:
         return jsonify({
             'error': f'Ошибка получения статуса калибровки BNO055: {str(e)}',
@@ -927,9 +1641,9 @@ def api_bno055_mode():
         }), 503
     
     try:
-        bno055_monitor = BNO055Monitor()
-        mode = bno055_monitor.get_operation_mode()
-        return jsonify(mode)
+        data, snapshot = monitor.get_sensor_snapshot('bno055', fresh=_wants_fresh())
+        mode = bno055_monitor.get_operation_mode(data)
+        return jsonify(dict(mode, snapshot=snapshot))
     except Exception as e:
         return jsonify({
             'error': f'Ошибка получения режима работы BNO055: {str(e)}',
@@ -976,6 +1690,13 @@ def api_export():
             }
         }
         
+        # Ряды, доступные в хранилище на диске (/api/timeseries)
+        if monitor.store is not None:
+            export_data['timeseries'] = {
+                'series': monitor.store.series(),
+                'segments': monitor.store.segments()
+            }
+        
         # Добавляем BMP280 данные если доступны
         if BMP280_MONITORING_AVAILABLE:
             try:
@@ -1006,16 +1727,15 @@ def handle_connect():
         'timestamp': time.time()
     }
     
-    # Добавляем PTP данные если есть устройства
+    # Добавляем PTP данные если есть устройства (из снимка сэмплера)
     if monitor.devices:
-        device = monitor.devices[0]
-        ptp_data = monitor.get_ptp_metrics(device)
-        status_data['current_offset'] = ptp_data.get('offset_ns', 0)
+        device_data, _ = monitor.get_device_snapshot(monitor.devices[0])
+        status_data['current_offset'] = device_data['ptp'].get('offset_ns', 0)
     
     # Добавляем BMP280 данные если доступны
     if BMP280_MONITORING_AVAILABLE:
         try:
-            bmp280_data = get_bmp280_data()
+            bmp280_data, _ = monitor.get_sensor_snapshot('bmp280')
             status_data['bmp280_available'] = bmp280_data.get('available', False)
             if bmp280_data.get('available'):
                 status_data['bmp280_temperature'] = bmp280_data.get('temperature_c')
@@ -1033,6 +1753,81 @@ def handle_disconnect():
     """Клиент отключился"""
     print('Client disconnected')
 
+@socketio.on('subscribe')
+def handle_subscribe(message):
+    """
+    Подписка на комнаты снимков: {'keys': ['device:ocp0', 'sensor:*']}
+    
+    Для каждой комнаты клиент сразу получает 'resync' с полным
+    состоянием, далее - только кадры 'delta' с изменениями.
+    """
+    keys = push.expand_keys((message or {}).get('keys', []))
+    for key in keys:
+        join_room(key)
+        emit('resync', push.resync_frame(key))
+    emit('subscribed', {'keys': keys, 'timestamp': time.time()})
+
+@socketio.on('unsubscribe')
+def handle_unsubscribe(message):
+    """Отписка от комнат снимков"""
+    for key in push.expand_keys((message or {}).get('keys', [])):
+        leave_room(key)
+
+@socketio.on('resync')
+def handle_resync(message):
+    """Запрос полного состояния комнаты после пропуска seq"""
+    for key in push.expand_keys([(message or {}).get('key')]):
+        emit('resync', push.resync_frame(key))
+
+def _in_thread_pool(view):
+    """Обработчик в потоке eventlet.tpool с контекстом запроса Flask (contextvars)"""
+    from eventlet import tpool
+    
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        return tpool.execute(contextvars.copy_context().run, view, *args, **kwargs)
+    return wrapper
+
+def offload_views():
+    """
+    Перенос обработчиков HTTP с хаба eventlet в пул потоков
+    
+    Без monkey patching любой блокирующий вызов в обработчике (чтение
+    sysfs/I2C при fresh=1, запрос SQLite, ожидание блокировки, которую
+    держит поток сэмплера, опрос ptp4l) останавливал бы хаб, а с ним все
+    HTTP и Socket.IO соединения. Хаб только принимает соединения и ждет
+    результата; обработчики Socket.IO остаются на хабе - они читают кэш
+    снимков и вызывают emit.
+    """
+    if socketio.async_mode != 'eventlet':
+        return
+    from eventlet import tpool
+    tpool.set_num_threads(CONFIG['server']['handler_threads'])
+    for endpoint, view in list(app.view_functions.items()):
+        if not getattr(view, '_offloaded', False):
+            app.view_functions[endpoint] = _in_thread_pool(view)
+            app.view_functions[endpoint]._offloaded = True
+
+def run_server(host=None, port=None):
+    """
+    Запуск HTTP/WebSocket сервера в режиме CONFIG['server']['mode']
+    
+    eventlet обслуживает запросы и WebSocket соединения зелеными потоками
+    (не более concurrency одновременно); dev - однопоточный по сути
+    сервер разработки Werkzeug, только для отладки.
+    """
+    host = host or CONFIG['server']['host']
+    port = port or CONFIG['server']['port']
+    if socketio.async_mode == 'eventlet':
+        offload_views()
+        print(f"🚀 Сервер eventlet на {host}:{port}, до {CONFIG['server']['concurrency']} соединений, "
+              f"{CONFIG['server']['handler_threads']} потоков обработчиков")
+        socketio.run(app, host=host, port=port, debug=False, log_output=False,
+                     max_size=CONFIG['server']['concurrency'])
+    else:
+        print(f"⚠️  Сервер разработки Werkzeug на {host}:{port} - не для рабочей нагрузки")
+        socketio.run(app, host=host, port=port, debug=False, allow_unsafe_werkzeug=True)
+
 if __name__ == '__main__':
     print("="*80)
     print("🚀 Quantum-PCI REALISTIC Monitoring API v2.0")
@@ -1060,4 +1855,4 @@ if __name__ == '__main__':
         print(f"   🕐 {device['id']}: {device.get('serial', 'N/A')}")
     print("="*80)
     
-    socketio.run(app, host='0.0.0.0', port=CONFIG['server']['port'], debug=False)
+    run_server()
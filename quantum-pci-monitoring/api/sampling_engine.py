@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Sampling Engine Module
+Планировщик сбора данных на asyncio: независимая задача на каждый источник
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+def summarize(values: Iterable[float]) -> Optional[Dict[str, float]]:
+    """Сводка окна измерений: среднее, p50, p99, максимум (в секундах)"""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    last = len(ordered) - 1
+    return {
+        'mean': sum(ordered) / len(ordered),
+        'p50': ordered[round(0.50 * last)],
+        'p99': ordered[round(0.99 * last)],
+        'max': ordered[-1]
+    }
+
+
+class SamplingSource:
+    """
+    Источник выборок: блокирующая функция, период, таймаут и разброс запуска
+
+    Функция выполняется в собственном потоке источника, поэтому зависший
+    датчик занимает только свой поток. Пока предыдущий вызов не завершился,
+    новые запуски пропускаются, а не накапливаются в очереди.
+
+    В окне последних window запусков хранятся задержка старта относительно
+    запланированного момента (lateness), длительность чтения (latency) и
+    интервалы между стартами, по которым проверяется выдерживание периода.
+    """
+
+    def __init__(self, name: str, func: Callable[[], Any], period: float,
+                 timeout: Optional[float] = None, jitter: float = 0.0, window: int = 512):
+        self.name = name
+        self.func = func
+        self.period = period
+        self.timeout = timeout
+        self.jitter = jitter
+        self.runs = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.skipped = 0
+        self.deadlines_missed = 0
+        self.lateness = deque(maxlen=window)
+        self.durations = deque(maxlen=window)
+        self.starts = deque(maxlen=window)
+        self.last_duration = None
+        self.last_run = None
+        self.last_error = None
+        self._pending = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"sampler-{name}")
+
+    def actual_period(self) -> Optional[float]:
+        """Средний фактический интервал между стартами в окне"""
+        starts = list(self.starts)
+        if len(starts) < 2:
+            return None
+        return (starts[-1] - starts[0]) / (len(starts) - 1)
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики запусков, пропущенные дедлайны и задержки источника"""
+        actual_period = self.actual_period()
+        return {
+            'period_seconds': self.period,
+            'actual_period_seconds': actual_period,
+            'actual_rate_hz': 1.0 / actual_period if actual_period else None,
+            'timeout_seconds': self.timeout,
+            'runs': self.runs,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'skipped': self.skipped,
+            'deadlines_missed': self.deadlines_missed,
+            'lateness_seconds': summarize(self.lateness),
+            'latency_seconds': summarize(self.durations),
+            'last_duration_seconds': self.last_duration,
+            'last_run': self.last_run,
+            'last_error': self.last_error,
+            'busy': self._pending is not None and not self._pending.done()
+        }
+
+
+def _consume_result(future) -> None:
+    """Забираем результат брошенного по таймауту вызова, чтобы asyncio не ругался"""
+    if not future.cancelled():
+        future.exception()
+
+
+class SamplingEngine:
+    """
+    Цикл asyncio в фоновом потоке, по задаче на каждый источник
+
+    Источники не ждут друг друга: цикл сбора длится столько, сколько самый
+    медленный источник, а не сумму их времен, и зависший датчик не
+    задерживает выборки offset. Запуски идут по фиксированной сетке
+    монотонных дедлайнов (start + n * period), поэтому время чтения не
+    накапливается в дрейф периода. Случайный сдвиг (jitter, доля периода)
+    смещает запуск внутри своего слота и не переносится на следующий,
+    чтобы источники с одинаковым периодом не обращались к шине I2C и
+    sysfs одновременно. Слоты, пропущенные из-за долгого чтения, не
+    догоняются пачкой, а учитываются в deadlines_missed.
+    """
+
+    def __init__(self, jitter: float = 0.05, window: int = 512):
+        self.jitter = jitter
+        self.window = window
+        self.sources = {}
+        self._loop = None
+        self._thread = None
+        self._tasks = []
+
+    def add_source(self, name: str, func: Callable[[], Any], period: float,
+                   timeout: Optional[float] = None, jitter: Optional[float] = None) -> SamplingSource:
+        """Регистрация источника (до запуска движка)"""
+        source = SamplingSource(name, func, period, timeout=timeout,
+                                jitter=self.jitter if jitter is None else jitter, window=self.window)
+        self.sources[name] = source
+        return source
+
+    async def _sample(self, source: SamplingSource, scheduled: float) -> None:
+        if source._pending is not None and not source._pending.done():
+            source.skipped += 1
+            return
+
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        source.lateness.append(max(0.0, started - scheduled))
+        source.starts.append(started)
+        future = loop.run_in_executor(source._executor, source.func)
+        future.add_done_callback(_consume_result)
+        source._pending = future
+        try:
+            if source.timeout:
+                await asyncio.wait_for(asyncio.shield(future), source.timeout)
+            else:
+                await future
+            source.runs += 1
+            source.durations.append(time.monotonic() - started)
+        except asyncio.TimeoutError:
+            source.timeouts += 1
+            source.last_error = f"timeout {source.timeout} с"
+            print(f"⚠️  Источник {source.name} не ответил за {source.timeout} с")
+        except Exception as e:
+            source.errors += 1
+            source.last_error = str(e)
+            print(f"Ошибка источника {source.name}: {e}")
+        source.last_duration = time.monotonic() - started
+        source.last_run = time.time()
+
+    async def _run_source(self, source: SamplingSource) -> None:
+        deadline = time.monotonic()
+        while True:
+            scheduled = deadline + random.uniform(0, source.jitter) * source.period
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self._sample(source, scheduled)
+
+            deadline += source.period
+            now = time.monotonic()
+            if now > deadline:
+                # Чтение заняло дольше периода: пропущенные слоты не догоняем
+                missed = int((now - deadline) // source.period) + 1
+                source.deadlines_missed += missed
+                deadline += missed * source.period
+
+    async def _main(self) -> None:
+        self._tasks = [asyncio.ensure_future(self._run_source(source))
+                       for source in self.sources.values()]
+        try:
+            await asyncio.gather(*self._tasks)
+        except asyncio.CancelledError:
+            pass
+
+    def start(self) -> None:
+        """Запуск цикла asyncio в фоновом потоке"""
+        if self._thread is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self._main())
+
+        self._thread = threading.Thread(target=run, name='sampling-engine', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Остановка задач источников и цикла"""
+        if self._thread is None:
+            return
+
+        def cancel():
+            for task in self._tasks:
+                task.cancel()
+
+        self._loop.call_soon_threadsafe(cancel)
+        self._thread.join(timeout=timeout)
+        self._thread = None
+        for source in self.sources.values():
+            source._executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Счетчики по всем источникам"""
+        return {name: source.stats() for name, source in self.sources.items()}
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Snapshot Cache Module
+Версионированный кэш снимков метрик, заполняемый фоновым сэмплером
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class SnapshotCache:
+    """
+    Кэш снимков по устройствам и датчикам
+
+    Фоновый сэмплер записывает снимки (ключи вида 'device:ocp0',
+    'sensor:ina219'), а REST маршруты только читают их. Каждая запись
+    неизменяема и заменяется целиком, поэтому читатели получают
+    согласованный снимок без копирования.
+    """
+
+    def __init__(self, stale_after: float = 15.0):
+        self.stale_after = stale_after
+        self.version = 0
+        self._entries = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback) -> None:
+        """Подписка на обновления: callback(key, entry) после каждой записи"""
+        self._listeners.append(callback)
+
+    def update(self, key: str, data: Dict[str, Any], source: str = 'sampler',
+               timestamp: Optional[float] = None, stale_after: Optional[float] = None) -> int:
+        """
+        Сохранение нового снимка, возвращает его версию
+        
+        stale_after задает порог устаревания для редко опрашиваемых
+        источников (по умолчанию общий порог кэша).
+        """
+        entry_timestamp = timestamp if timestamp is not None else time.time()
+        with self._lock:
+            previous = self._entries.get(key)
+            self.version += 1
+            self._entries[key] = {
+                'data': data,
+                'version': (previous['version'] + 1) if previous else 1,
+                'global_version': self.version,
+                'timestamp': entry_timestamp,
+                'source': source,
+                'stale_after': stale_after if stale_after is not None else self.stale_after
+            }
+            entry = self._entries[key]
+        for callback in self._listeners:
+            try:
+                callback(key, entry)
+            except Exception as e:
+                print(f"Ошибка обработчика снимка {key}: {e}")
+        return entry['version']
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Получение снимка (или None, если сэмплер его еще не записал)"""
+        return self._entries.get(key)
+
+    def get_or_refresh(self, key: str, refresh: Callable[[], Any], fresh: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Снимок из кэша; при fresh=True (?fresh=1) или если сэмплер еще не
+        записал ключ, сначала синхронно вызывается refresh(), обновляющий кэш
+        """
+        entry = None if fresh else self.get(key)
+        if entry is None:
+            refresh()
+            entry = self.get(key)
+        return entry
+
+    def keys(self, prefix: str = '') -> List[str]:
+        """Список ключей с заданным префиксом"""
+        with self._lock:
+            return [key for key in self._entries if key.startswith(prefix)]
+
+    def metadata(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Метаданные свежести снимка для ответа API"""
+        age = max(0.0, time.time() - entry['timestamp'])
+        return {
+            'version': entry['version'],
+            'timestamp': entry['timestamp'],
+            'age_seconds': round(age, 3),
+            'stale': age > entry['stale_after'],
+            'source': entry['source']
+        }
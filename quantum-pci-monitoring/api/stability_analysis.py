@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Stability Analysis Module
+Оценки стабильности генератора по ряду offset: ADEV, MDEV, TDEV, MTIE
+
+Фаза x (секунды) - offset устройства, выбранный с равномерным шагом tau0.
+Для m = tau / tau0:
+
+- ADEV (перекрывающаяся): σ²(τ) = Σ (x[i+2m] - 2x[i+m] + x[i])² / (2τ²(N-2m))
+- MDEV: Mod σ²(τ) = Σ_j (Σ_{i=j}^{j+m-1} (x[i+2m] - 2x[i+m] + x[i]))² / (2m²τ²(N-3m+1))
+- TDEV: τ · MDEV / √3
+- MTIE: максимум размаха x в окнах из m+1 точек
+
+analyze() считает по сохраненной истории векторно (NumPy, через
+кумулятивные суммы), StabilityAccumulator - инкрементально по мере
+поступления выборок: на каждую выборку добавляется по одному слагаемому
+на каждое τ, без пересчета ряда.
+"""
+
+import math
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+try:
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+def tau_ladder(max_m: int) -> List[int]:
+    """Стандартная лестница множителей τ/τ0: 1, 2, 5, 10, 20, 50, ... до max_m"""
+    ladder = []
+    decade = 1
+    while decade <= max_m:
+        ladder.extend(m for m in (decade, 2 * decade, 5 * decade) if m <= max_m)
+        decade *= 10
+    return ladder
+
+
+def _result(tau0: float, ms: Sequence[int], samples: int) -> Dict[str, Any]:
+    return {
+        'tau0_seconds': tau0,
+        'tau_seconds': [m * tau0 for m in ms],
+        'adev': [None] * len(ms),
+        'mdev': [None] * len(ms),
+        'tdev_seconds': [None] * len(ms),
+        'mtie_seconds': [None] * len(ms),
+        'samples': samples
+    }
+
+
+def _fill(result: Dict[str, Any], index: int, tau: float, adev_sum: float, adev_n: int,
+          mdev_sum: float, mdev_n: int, m: int) -> None:
+    if adev_n:
+        result['adev'][index] = math.sqrt(adev_sum / (2.0 * tau * tau * adev_n))
+    if mdev_n:
+        mdev = math.sqrt(mdev_sum / (2.0 * m * m * tau * tau * mdev_n))
+        result['mdev'][index] = mdev
+        result['tdev_seconds'][index] = tau * mdev / math.sqrt(3.0)
+
+
+def analyze(phase: Sequence[float], tau0: float, ms: Optional[Iterable[int]] = None) -> Dict[str, Any]:
+    """
+    ADEV/MDEV/TDEV/MTIE равномерного ряда фазы (секунды) для множителей ms
+
+    Значения τ, для которых не хватает точек, возвращаются как None.
+    Без NumPy ряд прогоняется через StabilityAccumulator.
+    """
+    n = len(phase)
+    ms = list(ms) if ms is not None else tau_ladder(max(1, n // 3))
+    if not NUMPY_AVAILABLE:
+        accumulator = StabilityAccumulator(tau0, ms)
+        for value in phase:
+            accumulator.append(value)
+        return accumulator.results()
+
+    result = _result(tau0, ms, n)
+    x = np.asarray(phase, dtype=np.float64)
+    prefix = np.concatenate(([0.0], np.cumsum(x)))
+    for index, m in enumerate(ms):
+        tau = m * tau0
+        adev_sum = mdev_sum = 0.0
+        adev_n = mdev_n = 0
+        if n > 2 * m:
+            second = x[2 * m:] - 2.0 * x[m:n - m] + x[:n - 2 * m]
+            adev_sum, adev_n = float(np.dot(second, second)), len(second)
+        if n >= 3 * m:
+            inner = prefix[3 * m:] - 3.0 * prefix[2 * m:n + 1 - m] + 3.0 * prefix[m:n + 1 - 2 * m] - prefix[:n + 1 - 3 * m]
+            mdev_sum, mdev_n = float(np.dot(inner, inner)), len(inner)
+        _fill(result, index, tau, adev_sum, adev_n, mdev_sum, mdev_n, m)
+        if n > m:
+            windows = sliding_window_view(x, m + 1)
+            result['mtie_seconds'][index] = float(np.max(windows.max(axis=1) - windows.min(axis=1)))
+    return result
+
+
+def uniform_phase(timestamps: Sequence[float], values: Sequence[float], tau0: float,
+                  max_gap: int = 5, scale: float = 1e-9) -> List[float]:
+    """
+    Последний непрерывный участок ряда на сетке tau0 (в секундах фазы)
+
+    Пропуски до max_gap шагов заполняются линейной интерполяцией,
+    более длинный пропуск начинает участок заново. NaN считается пропуском.
+    """
+    phase = []
+    last_slot = None
+    for timestamp, value in zip(timestamps, values):
+        if value is None or value != value:
+            continue
+        slot = round(timestamp / tau0)
+        value = float(value) * scale
+        if last_slot is not None:
+            gap = slot - last_slot
+            if gap <= 0:
+                continue
+            if gap > max_gap + 1:
+                phase = []
+            else:
+                previous = phase[-1]
+                phase.extend(previous + (value - previous) * k / gap for k in range(1, gap))
+        phase.append(value)
+        last_slot = slot
+    return phase
+
+
+class StabilityAccumulator:
+    """
+    Инкрементальные ADEV/MDEV/TDEV/MTIE для лестницы τ
+
+    Хранятся только последние 3·max(m)+1 значений фазы и их кумулятивных
+    сумм, суммы квадратов по каждому τ и монотонные очереди скользящих
+    максимума/минимума для MTIE: выборка обрабатывается за O(число τ).
+    """
+
+    def __init__(self, tau0: float, ms: Iterable[int], max_gap: int = 5, scale: float = 1e-9):
+        self.tau0 = tau0
+        self.ms = list(ms)
+        self.max_gap = max_gap
+        self.scale = scale
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Начало нового непрерывного участка"""
+        depth = 3 * max(self.ms, default=1) + 2
+        self.count = 0
+        self.restarts = getattr(self, 'restarts', -1) + 1
+        self._phase = deque(maxlen=depth)
+        self._prefix = deque([0.0], maxlen=depth)
+        self._adev = [[0.0, 0] for _ in self.ms]
+        self._mdev = [[0.0, 0] for _ in self.ms]
+        self._mtie = [0.0 for _ in self.ms]
+        self._window_max = [deque() for _ in self.ms]
+        self._window_min = [deque() for _ in self.ms]
+        self._last_slot = None
+
+    def add(self, timestamp: float, value: float) -> None:
+        """
+        Выборка offset с произвольной отметкой времени: в ряд попадает
+        первая выборка каждого шага tau0, короткие пропуски интерполируются
+        """
+        slot = math.floor(timestamp / self.tau0)
+        with self._lock:
+            if self._last_slot is not None:
+                gap = slot - self._last_slot
+                if gap <= 0:
+                    return
+                if gap > self.max_gap + 1:
+                    self.reset()
+                elif gap > 1:
+                    previous = self._phase[-1]
+                    target = value * self.scale
+                    for k in range(1, gap):
+                        self._append(previous + (target - previous) * k / gap)
+            self._last_slot = slot
+            self._append(value * self.scale)
+
+    def append(self, phase: float) -> None:
+        """Очередная точка уже равномерного ряда фазы (секунды)"""
+        with self._lock:
+            self._append(phase)
+
+    def _append(self, x: float) -> None:
+        phase, prefix = self._phase, self._prefix
+        phase.append(x)
+        prefix.append(prefix[-1] + x)
+        n = self.count
+        self.count += 1
+        for index, m in enumerate(self.ms):
+            # Новое слагаемое ADEV: x[n] - 2x[n-m] + x[n-2m]
+            if n >= 2 * m:
+                second = x - 2.0 * phase[-1 - m] + phase[-1 - 2 * m]
+                self._adev[index][0] += second * second
+                self._adev[index][1] += 1
+            # Новое слагаемое MDEV через кумулятивные суммы S[n+1-k·m]
+            if n + 1 >= 3 * m:
+                inner = prefix[-1] - 3.0 * prefix[-1 - m] + 3.0 * prefix[-1 - 2 * m] - prefix[-1 - 3 * m]
+                self._mdev[index][0] += inner * inner
+                self._mdev[index][1] += 1
+            # Скользящие максимум и минимум по окну из m+1 точек
+            highs, lows = self._window_max[index], self._window_min[index]
+            while highs and highs[-1][1] <= x:
+                highs.pop()
+            highs.append((n, x))
+            while lows and lows[-1][1] >= x:
+                lows.pop()
+            lows.append((n, x))
+            if highs[0][0] <= n - m - 1:
+                highs.popleft()
+            if lows[0][0] <= n - m - 1:
+                lows.popleft()
+            if n >= m:
+                self._mtie[index] = max(self._mtie[index], highs[0][1] - lows[0][1])
+
+    def results(self) -> Dict[str, Any]:
+        """Текущие оценки в формате analyze()"""
+        with self._lock:
+            result = _result(self.tau0, self.ms, self.count)
+            for index, m in enumerate(self.ms):
+                (adev_sum, adev_n), (mdev_sum, mdev_n) = self._adev[index], self._mdev[index]
+                _fill(result, index, m * self.tau0, adev_sum, adev_n, mdev_sum, mdev_n, m)
+                if self.count > m:
+                    result['mtie_seconds'][index] = self._mtie[index]
+            result['restarts'] = self.restarts
+            return result
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Streaming Filter Module
+Потоковая фильтрация показаний датчиков: скользящие медиана, MAD, среднее
+и дисперсия с обновлением за O(log n) / O(1) на выборку и фильтр Хампеля
+
+Используется мониторингом INA219 (фильтр на каждую шину питания) и
+скриптами в корне проекта; filter_batch() прогоняет записанные данные
+векторно.
+"""
+
+import bisect
+import math
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# MAD нормального распределения -> стандартное отклонение
+MAD_SCALE = 1.4826
+
+# Меньше выборок в окне - значение пропускается без проверки на выброс
+MIN_SAMPLES = 3
+
+
+def _kth_of_two(a, a_len: int, b, b_len: int, k: int) -> float:
+    """k-й (с нуля) элемент объединения двух возрастающих последовательностей за O(log n)"""
+    lo, hi = max(0, k + 1 - b_len), min(k + 1, a_len)
+    while lo < hi:
+        i = (lo + hi) // 2
+        if b(k - i) > a(i):
+            lo = i + 1
+        else:
+            hi = i
+    j = k + 1 - lo
+    return max(a(lo - 1) if lo else -math.inf, b(j - 1) if j else -math.inf)
+
+
+class RunningMedian:
+    """
+    Медиана и MAD скользящего окна
+
+    Окно хранится еще и упорядоченным списком: вставка и удаление -
+    двоичный поиск (O(log n) сравнений) и сдвиг указателей в C. Расстояния
+    до медианы слева и справа от нее - две возрастающие последовательности,
+    поэтому MAD находится выбором k-го элемента их объединения без сортировки.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self._values = deque()
+        self._sorted = []
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def add(self, value: float) -> None:
+        if len(self._values) == self.window:
+            oldest = self._values.popleft()
+            del self._sorted[bisect.bisect_left(self._sorted, oldest)]
+        self._values.append(value)
+        bisect.insort(self._sorted, value)
+
+    def median(self) -> Optional[float]:
+        ordered = self._sorted
+        n = len(ordered)
+        if not n:
+            return None
+        middle = n // 2
+        return ordered[middle] if n % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+    def mad(self, median: Optional[float] = None) -> Optional[float]:
+        """Медиана абсолютных отклонений от медианы окна"""
+        ordered = self._sorted
+        n = len(ordered)
+        if not n:
+            return None
+        median = self.median() if median is None else median
+        split = bisect.bisect_left(ordered, median)
+        below = lambda i: median - ordered[split - 1 - i]
+        above = lambda j: ordered[split + j] - median
+        middle = n // 2
+        upper = _kth_of_two(below, split, above, n - split, middle)
+        if n % 2:
+            return upper
+        return (_kth_of_two(below, split, above, n - split, middle - 1) + upper) / 2
+
+
+class RunningStats:
+    """Среднее и дисперсия скользящего окна (Уэлфорд с удалением), O(1) на выборку"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._values = deque()
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def add(self, value: float) -> None:
+        values = self._values
+        if len(values) == self.window:
+            oldest = values.popleft()
+            values.append(value)
+            mean = self.mean + (value - oldest) / self.window
+            self._m2 += (value - oldest) * (value - mean + oldest - self.mean)
+            self.mean = mean
+        else:
+            values.append(value)
+            delta = value - self.mean
+            self.mean += delta / len(values)
+            self._m2 += delta * (value - self.mean)
+
+    def variance(self) -> Optional[float]:
+        """Выборочная дисперсия окна (None, пока в окне меньше двух значений)"""
+        n = len(self._values)
+        return max(0.0, self._m2 / (n - 1)) if n > 1 else None
+
+
+class HampelFilter:
+    """
+    Фильтр Хампеля с проверкой допустимого диапазона для одной шины
+
+    Значение вне valid_range отбрасывается и в окно не попадает. Остальные
+    попадают в окно медианы; выбросом считается отклонение от медианы
+    больше max(n_sigmas · 1.4826 · MAD, min_deviation). Выход - скользящее
+    среднее окна, в котором выбросы заменены медианой; на отброшенной
+    выборке возвращается последнее достоверное значение. Окна медианы и
+    среднего меняются под блокировкой фильтра: один фильтр шины вызывают
+    сэмплер и обработчики ?fresh=1 из разных потоков.
+    """
+
+    def __init__(self, window_size: int = 5, valid_range: Tuple[float, float] = (2.5, 4.0),
+                 n_sigmas: float = 3.0, min_deviation: float = 0.5, initial: Optional[float] = None):
+        self.window_size = window_size
+        self.valid_range = valid_range
+        self.n_sigmas = n_sigmas
+        self.min_deviation = min_deviation
+        self.median = RunningMedian(window_size)
+        self.stats = RunningStats(window_size)
+        self.last_valid_voltage = initial if initial is not None else sum(valid_range) / 2
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def is_valid_voltage(self, voltage: float) -> bool:
+        """Проверка, находится ли значение в допустимом диапазоне"""
+        return self.valid_range[0] <= voltage <= self.valid_range[1]
+
+    def threshold(self, mad: float) -> float:
+        return max(self.n_sigmas * MAD_SCALE * mad, self.min_deviation)
+
+    def filter_voltage(self, voltage: float, raw_value: Any = None) -> Tuple[float, bool, str]:
+        """
+        Фильтрация очередного значения
+
+        Returns:
+            tuple: (отфильтрованное значение, достоверно ли, причина)
+        """
+        with self._lock:
+            return self._filter(voltage)
+
+    def _filter(self, voltage: float) -> Tuple[float, bool, str]:
+        if not self.is_valid_voltage(voltage):
+            self.rejected += 1
+            return self.last_valid_voltage, False, f"Вне диапазона {self.valid_range[0]}-{self.valid_range[1]}V"
+
+        self.median.add(voltage)
+        if len(self.median) < MIN_SAMPLES:
+            self.stats.add(voltage)
+            self.last_valid_voltage = voltage
+            return voltage, True, "Недостаточно данных для фильтрации"
+
+        median = self.median.median()
+        deviation = abs(voltage - median)
+        if deviation > self.threshold(self.median.mad(median)):
+            self.stats.add(median)
+            self.rejected += 1
+            return self.last_valid_voltage, False, \
+                f"Выброс: отклонение {deviation:.3f}V от медианы {median:.3f}V"
+
+        self.stats.add(voltage)
+        self.last_valid_voltage = self.stats.mean
+        return self.last_valid_voltage, True, "OK"
+
+    def state(self) -> Dict[str, Any]:
+        """Состояние окна для API"""
+        with self._lock:
+            return {
+                'median': self.median.median(),
+                'mean': self.stats.mean if len(self.stats) else None,
+                'variance': self.stats.variance(),
+                'window': len(self.median),
+                'rejected': self.rejected
+            }
+
+
+def filter_batch(values: Sequence[float], window_size: int = 5, valid_range: Tuple[float, float] = (2.5, 4.0),
+                 n_sigmas: float = 3.0, min_deviation: float = 0.5,
+                 initial: Optional[float] = None) -> Tuple[List[float], List[bool]]:
+    """
+    Фильтр Хампеля для записанного ряда, результат совпадает с HampelFilter
+
+    С NumPy медиана и MAD считаются по всем окнам сразу, скользящее
+    среднее - через кумулятивные суммы. Возвращает (значения, признаки достоверности).
+    """
+    if not NUMPY_AVAILABLE:
+        hampel = HampelFilter(window_size, valid_range, n_sigmas, min_deviation, initial)
+        results = [hampel.filter_voltage(value) for value in values]
+        return [value for value, _, _ in results], [valid for _, valid, _ in results]
+
+    x = np.asarray(values, dtype=np.float64)
+    in_range = (x >= valid_range[0]) & (x <= valid_range[1])
+    accepted = x[in_range]
+    n = len(accepted)
+
+    # Медиана и MAD окна, заканчивающегося каждой принятой выборкой
+    medians = np.empty(n)
+    mads = np.empty(n)
+    head = min(n, window_size - 1)
+    for i in range(head):
+        window = accepted[:i + 1]
+        medians[i] = np.median(window)
+        mads[i] = np.median(np.abs(window - medians[i]))
+    if n >= window_size:
+        windows = sliding_window_view(accepted, window_size)
+        medians[head:] = np.median(windows, axis=1)
+        mads[head:] = np.median(np.abs(windows - medians[head:, None]), axis=1)
+
+    counts = np.minimum(np.arange(1, n + 1), window_size)
+    warmup = counts < MIN_SAMPLES
+    outlier = ~warmup & (np.abs(accepted - medians) > np.maximum(n_sigmas * MAD_SCALE * mads, min_deviation))
+    cleaned = np.where(outlier, medians, accepted)
+    cumulative = np.concatenate(([0.0], np.cumsum(cleaned)))
+    index = np.arange(n)
+    means = (cumulative[index + 1] - cumulative[np.maximum(0, index + 1 - window_size)]) / counts
+    accepted_output = np.where(warmup, accepted, means)
+
+    valid = np.zeros(len(x), dtype=bool)
+    valid[np.flatnonzero(in_range)[~outlier]] = True
+    output = np.full(len(x), np.nan)
+    output[in_range] = np.where(outlier, np.nan, accepted_output)
+    # Отброшенные выборки получают последнее достоверное значение
+    start = initial if initial is not None else sum(valid_range) / 2
+    last = np.maximum.accumulate(np.where(valid, np.arange(len(x)), -1))
+    output = np.where(last >= 0, output[np.maximum(last, 0)], start)
+    return output.tolist(), valid.tolist()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Sysfs Attribute Reader
+Чтение атрибутов /sys/class/timecard через постоянно открытые дескрипторы
+"""
+
+import errno
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+# Атрибуты, не меняющиеся во время работы драйвера - читаются один раз
+STATIC_ATTRIBUTES = frozenset({
+    'serialnum',
+    'available_clock_sources',
+    'available_sma_inputs',
+    'available_sma_outputs',
+})
+
+# Быстро меняющиеся атрибуты, которые опрашиваются каждый цикл
+DYNAMIC_ATTRIBUTES = (
+    'clock_status_offset',
+    'clock_status_drift',
+    'gnss_sync',
+    'clock_source',
+)
+
+# Значения sysfs атрибутов не превышают одной страницы
+READ_SIZE = 4096
+
+# Через сколько секунд недоступный атрибут проверяется снова (атрибуты
+# появляются после загрузки/перезагрузки драйвера или смены прав)
+MISSING_RECHECK_SECONDS = 30.0
+
+
+class SysfsAttributeReader:
+    """
+    Чтение атрибутов одного sysfs устройства
+
+    Дескриптор каждого атрибута открывается при первом обращении и
+    остается открытым; повторное чтение - один os.pread со смещения 0,
+    при котором ядро заново вызывает show() атрибута. Статические
+    атрибуты читаются один раз. Отсутствие атрибута (или ошибка open)
+    кэшируется на missing_recheck секунд; ENODEV при чтении - признак
+    перезагрузки драйвера - сбрасывает этот кэш и статические значения.
+
+    Открытие, pread и закрытие дескриптора идут под блокировкой читателя
+    (чтение атрибута - микросекунды): иначе другой поток мог бы закрыть
+    дескриптор между его получением и pread, а номер - достаться другому
+    файлу процесса (PHC, netlink, I2C).
+    """
+
+    def __init__(self, device_path: str, static_attributes: Iterable[str] = STATIC_ATTRIBUTES,
+                 missing_recheck: float = MISSING_RECHECK_SECONDS):
+        self.device_path = device_path
+        self.static_attributes = frozenset(static_attributes)
+        self.missing_recheck = missing_recheck
+        self._fds = {}
+        # Атрибут -> время (monotonic), после которого его стоит проверить снова
+        self._missing = {}
+        self._static_values = {}
+        self._lock = threading.Lock()
+
+    def _is_missing(self, attribute: str) -> bool:
+        recheck_at = self._missing.get(attribute)
+        return recheck_at is not None and time.monotonic() < recheck_at
+
+    def _mark_missing(self, attribute: str) -> None:
+        self._missing[attribute] = time.monotonic() + self.missing_recheck
+
+    def _fd(self, attribute: str) -> Optional[int]:
+        # Вызывается под self._lock
+        fd = self._fds.get(attribute)
+        if fd is not None or self._is_missing(attribute):
+            return fd
+        try:
+            fd = os.open(os.path.join(self.device_path, attribute), os.O_RDONLY | os.O_CLOEXEC)
+        except OSError as e:
+            # EACCES, ENODEV и т.п. - как отсутствие атрибута, но с сообщением
+            if not isinstance(e, FileNotFoundError):
+                print(f"Ошибка открытия {attribute}: {e}")
+            self._mark_missing(attribute)
+            return None
+        self._missing.pop(attribute, None)
+        self._fds[attribute] = fd
+        return fd
+
+    def _drop(self, attribute: str) -> None:
+        # Вызывается под self._lock
+        fd = self._fds.pop(attribute, None)
+        if fd is not None:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def exists(self, attribute: str) -> bool:
+        """Наличие атрибута (отсутствие кэшируется на missing_recheck секунд)"""
+        with self._lock:
+            if attribute in self._fds:
+                return True
+            if self._is_missing(attribute):
+                return False
+            if os.path.exists(os.path.join(self.device_path, attribute)):
+                return True
+            self._mark_missing(attribute)
+            return False
+
+    def read(self, attribute: str) -> Optional[str]:
+        """Значение атрибута без завершающих пробелов (None, если недоступен)"""
+        with self._lock:
+            if attribute in self._static_values:
+                return self._static_values[attribute]
+
+            fd = self._fd(attribute)
+            if fd is None:
+                return None
+            try:
+                value = os.pread(fd, READ_SIZE, 0).decode('utf-8', errors='replace').strip()
+            except OSError as e:
+                # Атрибут может возвращать ошибку (например, EBUSY или ENODEV
+                # при перезагрузке драйвера) - дескриптор переоткроется позже
+                print(f"Ошибка чтения {attribute}: {e}")
+                self._drop(attribute)
+                if e.errno == errno.ENODEV:
+                    # После перезагрузки драйвера серийный номер и прошивка читаются заново
+                    self._missing.clear()
+                    self._static_values.clear()
+                return None
+
+            if attribute in self.static_attributes:
+                self._static_values[attribute] = value
+                self._drop(attribute)
+            return value
+
+    def read_many(self, attributes: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Пакетное чтение набора атрибутов"""
+        return {attribute: self.read(attribute) for attribute in attributes}
+
+    def read_dynamic(self) -> Dict[str, Optional[str]]:
+        """Пакетное чтение динамических атрибутов (offset, drift, gnss_sync, источник)"""
+        return self.read_many(DYNAMIC_ATTRIBUTES)
+
+    def close(self) -> None:
+        """Закрытие всех дескрипторов и сброс кэшей"""
+        with self._lock:
+            for attribute in list(self._fds):
+                self._drop(attribute)
+            self._missing.clear()
+            self._static_values.clear()
+
+
+_readers = {}
+_readers_lock = threading.Lock()
+
+
+def get_reader(device_path: str) -> SysfsAttributeReader:
+    """Общий читатель для пути устройства (один набор дескрипторов на процесс)"""
+    with _readers_lock:
+        reader = _readers.get(device_path)
+        if reader is None:
+            reader = SysfsAttributeReader(device_path)
+            _readers[device_path] = reader
+        return reader
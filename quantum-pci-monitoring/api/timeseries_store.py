@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Time Series Store Module
+Встроенное хранилище временных рядов на SQLite (WAL) с сегментами по дням
+"""
+
+import glob
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple, Union
+
+SEGMENT_SUFFIX = '.sqlite'
+
+# Предел буфера, если запись на диск раз за разом не удается
+MAX_PENDING_ROWS = 100000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS samples (
+    series_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    value REAL,
+    text TEXT,
+    PRIMARY KEY (series_id, ts)
+) WITHOUT ROWID;
+"""
+
+Value = Union[float, int, str, None]
+
+
+def segment_day(timestamp: float) -> str:
+    """Имя дневного сегмента (UTC) для отметки времени"""
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+class TimeSeriesStore:
+    """
+    Хранилище рядов вида 'device.ocp0.offset_ns' -> (ts, значение)
+
+    Каждые сутки (UTC) пишутся в отдельный файл SQLite в режиме WAL, что
+    дает атомарные транзакции и переживает аварийное завершение процесса.
+    Сэмплер только добавляет точки в буфер (append), а фоновый поток
+    сбрасывает буфер одной транзакцией на сегмент раз в flush_interval
+    секунд. Сегменты старше retention_days удаляются целиком. Точки, которые
+    не удалось записать, возвращаются в начало буфера (не более max_pending).
+    """
+
+    def __init__(self, directory: str, retention_days: int = 14, flush_interval: float = 1.0,
+                 max_pending: int = MAX_PENDING_ROWS):
+        self.directory = directory
+        self.retention_days = retention_days
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._connections = {}
+        self._series_ids = {}
+        self._flush_thread = None
+        self._stop = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+
+    # === Запись ===
+
+    def append(self, name: str, timestamp: float, value: Value) -> None:
+        """Добавление точки (числовой или строковой) в буфер записи"""
+        if value is None:
+            return
+        with self._buffer_lock:
+            self._buffer.append((name, timestamp, value))
+
+    def append_many(self, timestamp: float, values: Dict[str, Value]) -> None:
+        """Добавление набора рядов с общей отметкой времени"""
+        rows = [(name, timestamp, value) for name, value in values.items() if value is not None]
+        with self._buffer_lock:
+            self._buffer.extend(rows)
+
+    def _connection(self, day: str) -> sqlite3.Connection:
+        connection = self._connections.get(day)
+        if connection is None:
+            connection = sqlite3.connect(os.path.join(self.directory, day + SEGMENT_SUFFIX),
+                                         check_same_thread=False, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # NORMAL в режиме WAL: сбой процесса не теряет зафиксированные транзакции
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self._connections[day] = connection
+            self._series_ids[day] = dict(connection.execute('SELECT name, id FROM series'))
+        return connection
+
+    def _series_id(self, day: str, connection: sqlite3.Connection, name: str) -> int:
+        ids = self._series_ids[day]
+        series_id = ids.get(name)
+        if series_id is None:
+            connection.execute('INSERT OR IGNORE INTO series (name) VALUES (?)', (name,))
+            series_id = connection.execute('SELECT id FROM series WHERE name = ?', (name,)).fetchone()[0]
+            ids[name] = series_id
+        return series_id
+
+    def _requeue(self, rows: List[Tuple[str, float, Value]]) -> None:
+        """Возврат незаписанных точек в начало буфера с вытеснением самых старых"""
+        with self._buffer_lock:
+            self._buffer = rows + self._buffer
+            overflow = len(self._buffer) - self.max_pending
+            if overflow > 0:
+                del self._buffer[:overflow]
+                self.dropped += overflow
+
+    def _write_day(self, day: str, day_rows: List[Tuple[str, float, Optional[float], Optional[str]]]) -> None:
+        connection = self._connection(day)
+        connection.execute('BEGIN')
+        try:
+            connection.executemany(
+                'INSERT OR REPLACE INTO samples (series_id, ts, value, text) VALUES (?, ?, ?, ?)',
+                [(self._series_id(day, connection, name), timestamp, number, text)
+                 for name, timestamp, number, text in day_rows]
+            )
+            connection.execute('COMMIT')
+        except Exception:
+            try:
+                connection.execute('ROLLBACK')
+                self._series_ids[day] = dict(connection.execute('SELECT name, id FROM series'))
+            except sqlite3.Error:
+                # Состояние соединения неизвестно - сегмент переоткроется при следующей записи
+                self._connections.pop(day, None)
+                self._series_ids.pop(day, None)
+                connection.close()
+            raise
+
+    def flush(self) -> int:
+        """Запись буфера на диск, возвращает число записанных точек"""
+        with self._buffer_lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+
+        by_day = {}
+        pending = {}
+        skipped = 0
+        for name, timestamp, value in rows:
+            try:
+                day = segment_day(timestamp)
+                number = None if isinstance(value, str) else float(value)
+            except (TypeError, ValueError, OverflowError, OSError) as e:
+                # Такую точку не записать никогда - в буфер она не возвращается
+                print(f"⚠️ Пропуск точки {name} ({timestamp!r}, {value!r}): {e}")
+                skipped += 1
+                continue
+            by_day.setdefault(day, []).append((name, timestamp, number, value if number is None else None))
+            pending.setdefault(day, []).append((name, timestamp, value))
+        if skipped:
+            with self._buffer_lock:
+                self.dropped += skipped
+
+        written = 0
+        with self._db_lock:
+            days = list(by_day)
+            for index, day in enumerate(days):
+                try:
+                    self._write_day(day, by_day[day])
+                except Exception:
+                    self._requeue([row for unwritten in days[index:] for row in pending[unwritten]])
+                    raise
+                written += len(by_day[day])
+        return written
+
+    # === Чтение ===
+
+    def segments(self) -> List[str]:
+        """Дни, для которых есть сегменты, по возрастанию"""
+        return sorted(os.path.basename(path)[:-len(SEGMENT_SUFFIX)]
+                      for path in glob.glob(os.path.join(self.directory, '*' + SEGMENT_SUFFIX)))
+
+    def _days(self, since: float, until: float) -> List[str]:
+        first, last = segment_day(since), segment_day(until)
+        return [day for day in self.segments() if first <= day <= last]
+
+    def _flush_before_read(self) -> None:
+        # Чтение не зависит от записи: при ошибке отдаются уже зафиксированные точки
+        try:
+            self.flush()
+        except sqlite3.Error as e:
+            print(f"⚠️ Буфер временных рядов не записан перед чтением: {e}")
+
+    def query(self, name: str, since: float, until: float,
+              step: Optional[float] = None) -> List[Tuple[float, Value]]:
+        """
+        Точки ряда в интервале [since, until] по всем затронутым сегментам
+
+        С шагом step - последняя точка в каждой корзине шириной step секунд.
+        """
+        self._flush_before_read()
+        buckets = {}
+        points = []
+        with self._db_lock:
+            for day in self._days(since, until):
+                connection = self._connection(day)
+                series_id = self._series_ids[day].get(name)
+                if series_id is None:
+                    continue
+                # Диапазонный проход по первичному ключу (series_id, ts)
+                if step is None:
+                    rows = connection.execute(
+                        'SELECT ts, value, text FROM samples WHERE series_id = ? AND ts BETWEEN ? AND ? ORDER BY ts',
+                        (series_id, since, until))
+                    points.extend((ts, text if value is None else value) for ts, value, text in rows)
+                    continue
+                # value и text берутся из строки с MAX(ts) в группе
+                rows = connection.execute(
+                    'SELECT MAX(ts), value, text FROM samples WHERE series_id = ? AND ts BETWEEN ? AND ? '
+                    'GROUP BY CAST((ts - ?) / ? AS INTEGER) ORDER BY 1',
+                    (series_id, since, until, since, step))
+                for ts, value, text in rows:
+                    # Корзина на стыке суток собирается из двух сегментов
+                    buckets[int((ts - since) // step)] = (ts, text if value is None else value)
+        return points if step is None else list(buckets.values())
+
+    def series(self, prefix: str = '') -> List[str]:
+        """Имена рядов с заданным префиксом во всех сегментах"""
+        self._flush_before_read()
+        names = set()
+        with self._db_lock:
+            for day in self.segments():
+                self._connection(day)
+                names.update(name for name in self._series_ids[day] if name.startswith(prefix))
+        return sorted(names)
+
+    # === Обслуживание ===
+
+    def apply_retention(self, now: Optional[float] = None) -> List[str]:
+        """Удаление сегментов старше retention_days, возвращает удаленные дни"""
+        now = time.time() if now is None else now
+        oldest_kept = segment_day(now - self.retention_days * 86400)
+        removed = []
+        with self._db_lock:
+            for day in self.segments():
+                if day >= oldest_kept:
+                    continue
+                connection = self._connections.pop(day, None)
+                self._series_ids.pop(day, None)
+                if connection is not None:
+                    connection.close()
+                for suffix in (SEGMENT_SUFFIX, SEGMENT_SUFFIX + '-wal', SEGMENT_SUFFIX + '-shm'):
+                    try:
+                        os.remove(os.path.join(self.directory, day + suffix))
+                    except FileNotFoundError:
+                        pass
+                removed.append(day)
+        return removed
+
+    def _close_idle_segments(self) -> None:
+        """Закрытие соединений с сегментами прошлых дней"""
+        today = segment_day(time.time())
+        with self._db_lock:
+            for day in [day for day in self._connections if day < today]:
+                self._connections.pop(day).close()
+                self._series_ids.pop(day, None)
+
+    def start(self) -> None:
+        """Запуск фонового потока записи и очистки"""
+        if self._flush_thread is not None:
+            return
+
+        def flush_loop():
+            last_maintenance = 0.0
+            while not self._stop.wait(self.flush_interval):
+                try:
+                    self.flush()
+                    if time.monotonic() - last_maintenance > 3600:
+                        self.apply_retention()
+                        self._close_idle_segments()
+                        last_maintenance = time.monotonic()
+                except Exception as e:
+                    print(f"Ошибка записи временных рядов: {e}")
+            self.flush()
+
+        self._flush_thread = threading.Thread(target=flush_loop, daemon=True)
+        self._flush_thread.start()
+
+    def close(self) -> None:
+        """Остановка потока, запись буфера и закрытие сегментов"""
+        self._stop.set()
+        if self._flush_thread is not None:
+            self._flush_thread.join(timeout=5)
+            self._flush_thread = None
+        self.flush()
+        with self._db_lock:
+            for connection in self._connections.values():
+                connection.close()
+            self._connections.clear()
+            self._series_ids.clear()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# benchmark_server.py - Нагрузочный тест API и WebSocket канала мониторинга Quantum-PCI
+
+import argparse
+import http.client
+import threading
+import time
+from urllib.parse import urlparse
+
+try:
+    import socketio
+    SOCKETIO_CLIENT_AVAILABLE = True
+except ImportError:
+    SOCKETIO_CLIENT_AVAILABLE = False
+
+
+def percentile(ordered, fraction):
+    """Перцентиль отсортированного списка (ближайший ранг)"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))]
+
+
+def report(title, latencies, errors, duration):
+    """Печать запросов в секунду и задержек p50/p99/max (мс)"""
+    ordered = sorted(latencies)
+    print(f"📊 {title}")
+    print(f"   Запросов: {len(ordered)}, ошибок: {errors}, за {duration:.1f} с")
+    print(f"   Запросов/с: {len(ordered) / duration:.1f}")
+    print(f"   Задержка, мс: p50={percentile(ordered, 0.50) * 1000:.2f} "
+          f"p99={percentile(ordered, 0.99) * 1000:.2f} max={(ordered[-1] if ordered else 0) * 1000:.2f}")
+
+
+def bench_http(base_url, path, clients, duration):
+    """Параллельные клиенты с keep-alive соединениями опрашивают path до истечения duration"""
+    url = urlparse(base_url)
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker():
+        connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=10)
+        local = []
+        local_errors = 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    local_errors += 1
+                    continue
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                connection.close()
+                connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=10)
+                continue
+            local.append(time.perf_counter() - started)
+        connection.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report(f"HTTP GET {path}, клиентов: {clients}", latencies, errors[0], time.monotonic() - started)
+
+
+def bench_socket(base_url, clients, duration):
+    """
+    Клиенты Socket.IO подписываются на все снимки и в цикле запрашивают
+    resync; задержка - время от запроса до получения полного снимка
+    """
+    latencies = []
+    errors = [0]
+    deltas = [0]
+    lock = threading.Lock()
+
+    def worker():
+        client = socketio.Client()
+        subscribed = threading.Event()
+        answered = threading.Event()
+        keys = []
+
+        @client.on('subscribed')
+        def on_subscribed(message):
+            keys.extend(message['keys'])
+            subscribed.set()
+
+        @client.on('resync')
+        def on_resync(frame):
+            answered.set()
+
+        @client.on('delta')
+        def on_delta(frame):
+            with lock:
+                deltas[0] += 1
+
+        local = []
+        local_errors = 0
+        try:
+            client.connect(base_url)
+            client.emit('subscribe', {'keys': ['device:*', 'sensor:*']})
+            subscribed.wait(10)
+            key = keys[0] if keys else 'device:benchmark'
+            deadline = time.monotonic() + duration
+            while time.monotonic() < deadline:
+                answered.clear()
+                started = time.perf_counter()
+                client.emit('resync', {'key': key})
+                if answered.wait(10):
+                    local.append(time.perf_counter() - started)
+                else:
+                    local_errors += 1
+        except Exception as e:
+            print(f"❌ Ошибка клиента Socket.IO: {e}")
+            local_errors += 1
+        finally:
+            client.disconnect()
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report(f"Socket.IO resync, клиентов: {clients}", latencies, errors[0], time.monotonic() - started)
+    print(f"   Получено кадров delta: {deltas[0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Нагрузочный тест сервера мониторинга')
+    parser.add_argument('--url', default='http://localhost:8080')
+    parser.add_argument('--path', default='/api/metrics/real')
+    parser.add_argument('--clients', type=int, default=20, help='параллельных HTTP клиентов')
+    parser.add_argument('--socket-clients', type=int, default=10, help='параллельных Socket.IO клиентов')
+    parser.add_argument('--duration', type=float, default=10.0, help='длительность каждого теста, с')
+    args = parser.parse_args()
+
+    print("="*80)
+    print(f"🚀 Нагрузочный тест {args.url}")
+    print("="*80)
+    bench_http(args.url, args.path, args.clients, args.duration)
+
+    if args.socket_clients:
+        if SOCKETIO_CLIENT_AVAILABLE:
+            bench_socket(args.url, args.socket_clients, args.duration)
+        else:
+            print("⚠️  python-socketio[client] не установлен - тест WebSocket пропущен")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 # quantum-pci-monitor.py - Мониторинг Quantum-PCI с реальными данными с устройства
 
+import argparse
 import os
 import sys
 import time
@@ -11,7 +12,27 @@ from pathlib import Path
 api_path = Path(__file__).parent / 'api'
 sys.path.insert(0, str(api_path))
 
+def parse_args():
+    """Параметры сервера (по умолчанию из переменных окружения MONITORING_*)"""
+    parser = argparse.ArgumentParser(description='Quantum-PCI Real Monitoring')
+    parser.add_argument('--server', choices=['eventlet', 'dev'],
+                        default=os.environ.get('MONITORING_SERVER', 'eventlet'),
+                        help='eventlet - рабочий режим, dev - сервер разработки Werkzeug')
+    parser.add_argument('--concurrency', type=int,
+                        default=int(os.environ.get('MONITORING_CONCURRENCY', 1000)),
+                        help='максимум одновременных соединений (режим eventlet)')
+    parser.add_argument('--host', default=os.environ.get('MONITORING_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('MONITORING_PORT', 8080)))
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    # Режим сервера выбирается при импорте API (async_mode SocketIO)
+    os.environ['MONITORING_SERVER'] = args.server
+    os.environ['MONITORING_CONCURRENCY'] = str(args.concurrency)
+    os.environ['MONITORING_HOST'] = args.host
+    os.environ['MONITORING_PORT'] = str(args.port)
+
     print("="*80)
     print("🚀 Quantum-PCI Real Monitoring v2.0")
     print("="*80)
@@ -32,21 +53,15 @@ def main():
             spec.loader.exec_module(quantum_pci_api)
 
             print("="*80)
-            print("📊 Realistic Dashboard: http://localhost:8080/realistic-dashboard")
-            print("🔧 Realistic API:       http://localhost:8080/api/")
-            print("🗺️  Roadmap:            http://localhost:8080/api/roadmap")
-            print("🏠 Main Page:           http://localhost:8080/")
+            print(f"📊 Realistic Dashboard: http://localhost:{args.port}/realistic-dashboard")
+            print(f"🔧 Realistic API:       http://localhost:{args.port}/api/")
+            print(f"🗺️  Roadmap:            http://localhost:{args.port}/api/roadmap")
+            print(f"🏠 Main Page:           http://localhost:{args.port}/")
             print("="*80)
             print("🎯 Starting realistic hardware monitoring...")
 
-            # Запускаем сервер
-            quantum_pci_api.socketio.run(
-                quantum_pci_api.app,
-                host='0.0.0.0',
-                port=8080,
-                debug=False,
-                allow_unsafe_werkzeug=True
-            )
+            # Запускаем сервер в выбранном режиме
+            quantum_pci_api.run_server(args.host, args.port)
 
         except ImportError as e:
             print(f"❌ Error importing Quantum-PCI API: {e}")
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Тесты общего модуля доступа к I2C на эмулированной шине
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / 'api'))
+sys.path.insert(0, str(Path(__file__).parent.parent / 'led-testing'))
+
+import i2c_bus
+from i2c_bus import FakeI2CBus, MUX_ADDRESS
+
+
+def make_bus():
+    """Эмулированная шина с мультиплексором, установленная как шина 1"""
+    bus = FakeI2CBus(1)
+    bus.add_device(MUX_ADDRESS)
+    i2c_bus.set_bus(1, bus)
+    return bus
+
+
+def test_word_read_is_little_endian():
+    """Слово SMBus читается младшим байтом вперед, как i2cget ... w"""
+    bus = make_bus()
+    bus.add_device(0x44, {0x02: 0x34, 0x03: 0x12})
+    assert bus.read_word_data(0x44, 0x02) == 0x1234
+
+
+def test_missing_device_raises_oserror():
+    """Обращение к отсутствующему адресу дает OSError"""
+    bus = make_bus()
+    assert not bus.probe(0x29)
+    try:
+        bus.read_byte_data(0x29, 0x00)
+    except OSError:
+        pass
+    else:
+        raise AssertionError("ожидалась OSError")
+
+
+def test_mux_selection_is_cached():
+    """Повторный выбор той же маски не порождает транзакций"""
+    bus = make_bus()
+    bus.select_mux_channels(0x0F)
+    bus.select_mux_channels(0x0F)
+    bus.select_mux_channels(0x0F)
+    mux_writes = [t for t in bus.transactions if t[0] == 'write_byte']
+    assert len(mux_writes) == 1
+    bus.select_mux_channels(0x01)
+    assert bus.devices[MUX_ADDRESS][0] == 0x01
+
+
+def test_ina219_reads_through_shared_bus():
+    """INA219Monitor читает регистры через общую шину без i2cget"""
+    bus = make_bus()
+    for address in (0x40, 0x41, 0x44):
+        bus.add_device(address, {0x02: 0x1A, 0x03: 0x0A})
+
+    from ina219_monitor import INA219Monitor
+    monitor = INA219Monitor()
+    assert monitor.is_available()
+
+    data = monitor.get_all_data()
+    assert data['summary']['active_devices'] == 3
+    assert data['devices']['44']['bus_voltage']['raw'] == 0x0A1A
+
+
+def test_led_monitor_uses_shared_bus():
+    """LEDMonitor пишет PWM регистр и регистр обновления 0x49"""
+    bus = make_bus()
+    bus.add_device(0x37)
+
+    from led_monitor import LEDMonitor
+    monitor = LEDMonitor()
+    assert monitor.check_i2c_device()
+    assert monitor.set_led_brightness(2, 0x80)
+    assert monitor.read_led_status(2) == 0x80
+    assert ('write_byte_data', 0x37, 0x49) in bus.transactions
+
+
+def test_led_status_is_single_block_read():
+    """Статус всех 18 LED читается одной транзакцией"""
+    bus = make_bus()
+    bus.add_device(0x37, {0x01: 0xFF, 0x23: 0x40})
+
+    from led_monitor import LEDMonitor
+    monitor = LEDMonitor()
+    bus.transactions.clear()
+    status = monitor.get_all_led_status()
+
+    assert len(bus.transactions) == 1
+    assert status['Power']['state'] == 'bright'
+    assert status['Test2']['brightness'] == 0x40
+
+
+def test_led_pattern_writes_only_changed_channels():
+    """Паттерн пишется блоками по измененным каналам с одной защелкой 0x49"""
+    bus = make_bus()
+    bus.add_device(0x37)
+
+    from led_monitor import LEDMonitor
+    monitor = LEDMonitor()
+    monitor.get_all_led_status()
+
+    bus.transactions.clear()
+    assert monitor.set_led_pattern('all_on')
+    writes = [t for t in bus.transactions if t[0] == 'write_block']
+    latches = [t for t in bus.transactions if t[2] == 0x49]
+    assert len(writes) == 1 and len(latches) == 1
+    assert all(bus.devices[0x37][reg] == 0xFF for reg in monitor.pwm_regs)
+
+    # Повторное применение того же паттерна не обращается к шине
+    bus.transactions.clear()
+    assert monitor.set_led_pattern('all_on')
+    assert bus.transactions == []
+
+    # Два несмежных канала - две блочные записи, одна защелка
+    assert monitor.write_led_levels({0: 0x10, 5: 0x20, 6: 0x30}) == 3
+    writes = [t for t in bus.transactions if t[0] == 'write_block']
+    assert [t[2] for t in writes] == [0x01, 0x0B]
+    assert len([t for t in bus.transactions if t[2] == 0x49]) == 1
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Тесты многоуровневой истории метрик
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / 'api'))
+
+from metrics_history import MultiResolutionHistory, NUMPY_AVAILABLE
+
+
+def test_rollups_keep_min_max_mean_last():
+    """10 Гц выборки сворачиваются в секундные и минутные корзины"""
+    history = MultiResolutionHistory(('offset_ns', 'drift_ppb'), raw_maxlen=50,
+                                     tiers=((1, 10), (60, 10)))
+    for i in range(30):  # 3 секунды по 10 выборок
+        history.add(1000.0 + i / 10, {'offset_ns': i, 'drift_ppb': -i})
+
+    assert len(history.query('raw')) == 30
+    seconds = history.query('1s')
+    assert [point['timestamp'] for point in seconds] == [1000.0, 1001.0, 1002.0]
+    assert seconds[1]['offset_ns'] == {'min': 10, 'max': 19, 'mean': 14.5, 'last': 19}
+    assert seconds[1]['drift_ppb']['min'] == -19
+
+    minutes = history.query('1m')
+    assert len(minutes) == 1 and minutes[0]['count'] == 30
+    assert history.resolutions() == ['raw', '1s', '1m']
+
+
+def test_memory_is_bounded_and_range_filtered():
+    """Кольца уровней ограничены, запрос фильтруется по времени"""
+    history = MultiResolutionHistory(('offset_ns',), raw_maxlen=5, tiers=((1, 3),))
+    for second in range(10):
+        history.add(float(second), {'offset_ns': second})
+
+    assert [point['offset_ns'] for point in history.query('raw')] == [5, 6, 7, 8, 9]
+    # 3 завершенные корзины + текущая
+    assert [point['timestamp'] for point in history.query('1s')] == [6.0, 7.0, 8.0, 9.0]
+    assert [point['timestamp'] for point in history.query('1s', since=7.5, until=8.0)] == [7.0, 8.0]
+
+
+def test_columns_are_typed_and_enums_interned():
+    """Колонки - типизированные массивы, строковые поля хранятся кодами"""
+    history = MultiResolutionHistory(('offset_ns',), enum_fields=('clock_source',),
+                                     raw_maxlen=100, tiers=((1, 10),))
+    for i in range(20):
+        history.add(100.0 + i / 10, {'offset_ns': i, 'clock_source': 'GNSS' if i < 15 else 'PPS'})
+
+    columns = history.query_columns('raw', since=101.0, as_numpy=False)
+    assert columns['offset_ns'].typecode == 'd' and columns['clock_source'].typecode == 'H'
+    assert list(columns['offset_ns']) == list(range(10, 20))
+    assert history.enums['clock_source'].values == [None, 'GNSS', 'PPS']
+    assert history.query('raw')[-1]['clock_source'] == 'PPS'
+
+    # Выборка не зависит от формы результата (array или numpy)
+    if NUMPY_AVAILABLE:
+        numpy_columns = history.query_columns('1s', as_numpy=True)
+        assert list(numpy_columns['offset_ns_max']) == [9.0, 19.0]
+
+
+def test_ring_wraparound_query_uses_both_segments():
+    """После переполнения кольца интервал собирается из двух срезов"""
+    history = MultiResolutionHistory(('offset_ns',), raw_maxlen=8, tiers=())
+    for i in range(13):
+        history.add(float(i), {'offset_ns': i})
+
+    assert len(history.raw.slices(6.0, 11.0)) == 2
+    assert [p['offset_ns'] for p in history.query('raw', since=6.0, until=11.0)] == [6, 7, 8, 9, 10, 11]
+    # 8 строк x (timestamp + offset) x 8 байт
+    assert history.memory_bytes() == 8 * 2 * 8
+
+
+def test_downsample_min_max_buckets(monkeypatch):
+    """Прореживание дает одинаковые min/max/mean/last с NumPy и без"""
+    import metrics_history
+    history = MultiResolutionHistory(('offset_ns',), raw_maxlen=2000, tiers=((1, 200), (60, 10)))
+    for i in range(1200):  # 2 минуты при 10 Гц, выброс на 45-й секунде
+        history.add(600.0 + i / 10, {'offset_ns': 1000 if i == 450 else i % 10})
+
+    resolution, points = history.downsample(600.0, 720.0, 30)
+    assert resolution == 'raw'
+    assert [p['timestamp'] for p in points] == [600.0, 630.0, 660.0, 690.0]
+    assert points[1]['offset_ns']['max'] == 1000 and points[1]['offset_ns']['min'] == 0
+    assert points[0]['count'] == 300 and points[0]['offset_ns']['mean'] == 4.5
+
+    # Без сырых данных источником становится самая детальная свертка
+    history.raw.size = 0
+    resolution, minute_points = history.downsample(600.0, 720.0, 60)
+    assert resolution == '1s'
+
+    monkeypatch.setattr(metrics_history, 'NUMPY_AVAILABLE', False)
+    assert history.downsample(600.0, 720.0, 60) == (resolution, minute_points)
+    assert minute_points[0]['offset_ns']['max'] == 1000
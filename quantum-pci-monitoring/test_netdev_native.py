@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Тесты обнаружения интерфейсов через rtnetlink и SIOCETHTOOL
+"""
+
+import struct
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent / 'api'))
+
+import netdev_native
+from netdev_native import (IFINFOMSG, NLMSG_HEADER, RTM_NEWLINK, IFLA_IFNAME, IFLA_OPERSTATE,
+                           IFLA_MTU, IFF_UP, IFF_LOWER_UP, parse_link, parse_messages)
+
+
+def rtattr(attr_type, value):
+    length = 4 + len(value)
+    return struct.pack('=HH', length, attr_type) + value + b'\0' * ((-length) % 4)
+
+
+def test_parse_link_message():
+    """Разбор RTM_NEWLINK: имя, MTU, operstate и флаги"""
+    payload = IFINFOMSG.pack(0, 1, 7, IFF_UP | IFF_LOWER_UP, 0)
+    payload += rtattr(IFLA_IFNAME, b'enp1s0\0') + rtattr(IFLA_MTU, struct.pack('=I', 1500))
+    payload += rtattr(IFLA_OPERSTATE, b'\x06')
+    message = NLMSG_HEADER.pack(NLMSG_HEADER.size + len(payload), RTM_NEWLINK, 0, 1, 0) + payload
+
+    (msg_type, _, body), = parse_messages(message)
+    link = parse_link(body)
+    assert msg_type == RTM_NEWLINK
+    assert link['name'] == 'enp1s0' and link['index'] == 7 and link['mtu'] == 1500
+    assert link['operstate'] == 'up' and link['admin_up'] and link['carrier']
+
+
+@pytest.mark.skipif(not netdev_native.NETDEV_NATIVE_AVAILABLE, reason='нет AF_NETLINK')
+def test_cache_reuses_dump_until_link_event():
+    """Повторный запрос без событий линков не делает дампа и ioctl"""
+    cache = netdev_native.NetdevCache()
+    try:
+        links = cache.links()
+        assert 'lo' in links and links['lo']['loopback']
+        cache.ptp_interfaces()
+        calls = cache.stats()['ethtool_calls']
+        cache.ptp_interfaces()
+        assert cache.stats()['dumps'] == 1 and cache.stats()['ethtool_calls'] == calls
+    finally:
+        cache.close()
+
+
+def test_nic_statistics_rates(monkeypatch):
+    """Имена счетчиков читаются один раз, скорости - по разности выборок"""
+    class FakeEthtool:
+        def __init__(self):
+            self.values = [100, 5, 7]
+
+        def stat_names(self, interface, n_stats):
+            return ['rx_packets', 'tx_hwtstamp_timeouts', 'rx_dropped']
+
+        def stats(self, interface, n_stats):
+            return list(self.values)
+
+    clock = iter([10.0, 12.0, 14.0])
+    monkeypatch.setattr(netdev_native.time, 'monotonic', lambda: next(clock))
+    ethtool = FakeEthtool()
+    statistics = netdev_native.NicStatistics(ethtool)
+    driver = {'driver': 'ice', 'n_stats': 3}
+
+    first = statistics.read('enp1s0', driver)
+    assert first['counters']['rx_packets'] == 100 and first['rates'] == {}
+
+    ethtool.values = [300, 9, 7]
+    second = statistics.read('enp1s0', driver)
+    assert second['rates'] == {'tx_hwtstamp_timeouts': 2.0, 'rx_dropped': 0.0}
+    assert second['interval_seconds'] == 2.0
+
+    ethtool.values = [0, 0, 7]
+    assert statistics.read('enp1s0', driver)['rates']['tx_hwtstamp_timeouts'] is None
+    assert statistics.table_loads == 1
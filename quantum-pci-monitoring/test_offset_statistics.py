@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Тесты гистограмм и потоковых квантилей offset/drift
+"""
+
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / 'api'))
+
+from offset_statistics import FieldStatistics, P2Quantile
+
+
+def test_p2_quantile_tracks_exact_quantiles():
+    """Оценка P² близка к точному квантилю без хранения выборок"""
+    rng = random.Random(7)
+    samples = [abs(rng.gauss(0, 100)) for _ in range(20000)]
+    ordered = sorted(samples)
+    for quantile in (0.5, 0.99, 0.999):
+        estimator = P2Quantile(quantile)
+        for value in samples:
+            estimator.add(value)
+        exact = ordered[int(quantile * (len(ordered) - 1))]
+        assert abs(estimator.value() - exact) / exact < 0.03
+
+
+def test_histogram_is_cumulative_and_quantiles_are_windowed():
+    """Гистограмма накапливается с запуска, квантили и максимум - по завершенному окну"""
+    statistics = FieldStatistics((10, 100), quantiles=(0.5,), window=10.0)
+    for i in range(100):
+        statistics.add(-5 if i < 50 else 50, timestamp=i * 0.1)
+    statistics.add(500, timestamp=10.0)
+
+    snapshot = statistics.snapshot()
+    assert snapshot['buckets'] == [[10.0, 50], [100.0, 100], [float('inf'), 101]]
+    assert snapshot['count'] == 101 and snapshot['sum'] == 50 * 5 + 50 * 50 + 500
+    assert snapshot['window']['max'] == 50 and snapshot['window']['samples'] == 100
+    assert snapshot['window']['window_start'] == 0.0
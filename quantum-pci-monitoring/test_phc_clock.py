@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Тесты чтения PHC через динамические POSIX часы
+"""
+
+import ctypes
+import errno
+import struct
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / 'api'))
+
+import phc_clock
+
+
+def test_abi_constants():
+    """Номер ioctl, идентификатор часов и размер struct timex совпадают с ядром"""
+    assert phc_clock.PTP_CLOCK_GETCAPS == 0x80503d01
+    assert phc_clock.PTP_SYS_OFFSET == 0x43403d05
+    assert phc_clock.PTP_SYS_OFFSET_EXTENDED == 0xc4c03d09
+    assert phc_clock.PTP_SYS_OFFSET_PRECISE == 0xc0403d08
+    assert phc_clock.fd_to_clockid(3) == -29
+    if ctypes.sizeof(ctypes.c_long) == 8:
+        assert ctypes.sizeof(phc_clock.Timex) == 208
+    assert phc_clock.scaled_ppm_to_ppb(-65536) == -1000.0
+
+
+def test_parse_caps():
+    """Разбор struct ptp_clock_caps"""
+    raw = struct.pack('=9i', 999999999, 0, 2, 1, 1, 4, 1, 0, 0) + b'\0' * 44
+    caps = phc_clock.parse_caps(raw)
+    assert caps['max_adj'] == 999999999 and caps['n_ext_ts'] == 2 and caps['pps'] == 1
+
+
+def test_list_clocks_from_sysfs(tmp_path):
+    """Часы, их имена и интерфейсы берутся из /sys/class/ptp"""
+    for index, name, interface in ((1, 'ice-ptp', 'enp1s0f0'), (0, 'OCP TAP', None)):
+        clock = tmp_path / f'ptp{index}'
+        clock.mkdir()
+        (clock / 'clock_name').write_text(name + '\n')
+        if interface:
+            (clock / 'device' / 'net' / interface).mkdir(parents=True)
+    (tmp_path / 'unrelated').mkdir()
+
+    clocks = phc_clock.list_clocks(str(tmp_path))
+    assert [clock['device'] for clock in clocks] == ['/dev/ptp0', '/dev/ptp1']
+    assert clocks[0]['clock_name'] == 'OCP TAP' and clocks[0]['interfaces'] == []
+    assert clocks[1]['interfaces'] == ['enp1s0f0']
+
+
+def clock_time(ns):
+    return phc_clock.PTP_CLOCK_TIME.pack(ns // 1000000000, ns % 1000000000)
+
+
+def test_sys_offset_falls_back_and_picks_minimum_delay(monkeypatch):
+    """Без EXTENDED используется PTP_SYS_OFFSET, берется выборка с наименьшей задержкой"""
+    calls = []
+
+    def ioctl(fd, request, buffer):
+        calls.append(request)
+        if request == phc_clock.PTP_CLOCK_GETCAPS:
+            buffer[:] = struct.pack('=9i', 0, 0, 0, 0, 0, 0, 0, 0, 0) + bytes(44)
+        elif request == phc_clock.PTP_SYS_OFFSET_EXTENDED:
+            raise OSError(errno.EOPNOTSUPP, 'not supported')
+        else:
+            # sys, phc, sys, phc, sys: задержки 1000 и 200 нс
+            times = [10_000, 10_500 + 37, 11_000, 11_100 + 37, 11_200]
+            payload = b''.join(clock_time(t) for t in times)
+            buffer[16:16 + len(payload)] = payload
+
+    monkeypatch.setattr(phc_clock.fcntl, 'ioctl', ioctl)
+    clock = phc_clock.PHCClock.__new__(phc_clock.PHCClock)
+    clock.device, clock.fd, clock._caps, clock._offset_methods = '/dev/ptp0', -1, None, None
+
+    result = clock.sys_offset(samples=2)
+    assert result['method'] == 'basic'
+    assert result['offset_ns'] == 37 and result['delay_ns'] == 200
+    calls.clear()
+    clock.sys_offset(samples=2)
+    assert calls == [phc_clock.PTP_SYS_OFFSET]
+
+
+def test_extended_samples_are_triples():
+    """PTP_SYS_OFFSET_EXTENDED: (sys до, phc, sys после) на каждую выборку"""
+    times = [100, 160, 200, 300, 345, 310]
+    raw = bytes(16) + b''.join(clock_time(t) for t in times)
+    samples = phc_clock.parse_sys_offset_extended(raw, 2)
+    assert samples == [(100, 160, 200), (300, 345, 310)]
+    assert phc_clock.best_sample(samples)['offset_ns'] == 345 - 305
+
+
+def test_read_only_clock_keeps_time_and_caps(monkeypatch):
+    """Без права записи часы открываются на чтение, EACCES частоты не теряет время и caps"""
+    flags = []
+
+    def fake_open(path, mode):
+        flags.append(mode)
+        if mode == phc_clock.os.O_RDWR:
+            raise PermissionError(errno.EACCES, 'Permission denied', path)
+        return 7
+
+    def denied(clockid, timex):
+        ctypes.set_errno(errno.EACCES)
+        return -1
+
+    monkeypatch.setattr(phc_clock.os, 'open', fake_open)
+    monkeypatch.setattr(phc_clock, '_clock_adjtime', denied)
+    monkeypatch.setattr(phc_clock.time, 'clock_gettime_ns', lambda clockid: 1_700_000_000_123_456_789)
+    clock = phc_clock.PHCClock('/dev/ptp0')
+    clock._caps = {'max_adj': 1000000}
+
+    status = clock.status()
+    assert flags == [phc_clock.os.O_RDWR, phc_clock.os.O_RDONLY] and not clock.writable
+    assert status['time_ns'] == 1_700_000_000_123_456_789 and status['caps'] == {'max_adj': 1000000}
+    assert status['frequency_ppb'] is None and 'Permission denied' in status['frequency_error']
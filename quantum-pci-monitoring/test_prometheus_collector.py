@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Тесты экспорта Prometheus из кэша снимков
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / 'api'))
+
+from prometheus_client import CollectorRegistry, generate_latest
+
+from prometheus_collector import OpenMetricsRenderer, SnapshotCollector
+from snapshot_cache import SnapshotCache
+
+
+def test_scrape_reads_snapshots_only():
+    """Scrape строит метрики из снимка устройства без обращения к API и sysfs"""
+    snapshots = SnapshotCache()
+    snapshots.update('device:ocp0', {
+        'ptp': {'offset_ns': -42, 'drift_ppb': 7},
+        'gnss': {'sync_status': 'SYNC', 'status': 'ok'},
+        'sma': {'sma1': {'config': 'IN: 10Mhz', 'available': True}, 'available_inputs': ['10Mhz']},
+        'alerts': [{'severity': 'warning', 'type': 'ptp_offset_warning'}],
+    })
+    snapshots.update('sensor:bmp280', {'available': False})
+    snapshots.update('sensor:ina219', {'available': True, 'devices': {
+        '44': {'bus_voltage': {'value': 3.31, 'filter_status': 'ok'}, 'shunt_voltage': {'value': 0.001}},
+        '41': {'available': False, 'error': 'no data'},
+    }})
+    registry = CollectorRegistry()
+    registry.register(SnapshotCollector(snapshots))
+
+    text = generate_latest(registry).decode()
+    assert 'timecard_ptp_offset_nanoseconds{device_id="ocp0"} -42.0' in text
+    assert 'timecard_ptp_drift_ppb{device_id="ocp0"} 7.0' in text
+    assert 'timecard_gnss_sync{device_id="ocp0"} 1.0' in text
+    assert 'timecard_active_alerts{device_id="ocp0",severity="warning"} 1.0' in text
+    assert 'timecard_sma_config_info{config="IN: 10Mhz",connector="sma1",device_id="ocp0"} 1.0' in text
+    assert 'timecard_ina219_bus_voltage_volts{address="44"} 3.31' in text
+    assert 'address="41"' not in text
+    assert 'timecard_sensor_available{sensor="bmp280"} 0.0' in text
+    assert 'timecard_snapshot_stale{key="sensor:bmp280"} 0.0' in text
+    assert registry.get_sample_value('timecard_snapshot_age_seconds', {'key': 'device:ocp0'}) < 1.0
+
+
+def test_openmetrics_render_is_cached_within_period():
+    """Scrape в пределах периода получает тот же текст без повторного построения"""
+    snapshots = SnapshotCache()
+    snapshots.update('device:ocp0', {'ptp': {'offset_ns': 5}})
+    renderer = OpenMetricsRenderer(snapshots, max_age=60.0)
+
+    body = renderer.render()
+    snapshots.update('device:ocp0', {'ptp': {'offset_ns': 6}})
+    assert renderer.render() is body
+    assert body.decode().endswith('# EOF\n')
+    assert 'timecard_ptp_offset_nanoseconds{device_id="ocp0"} 5.0' in body.decode()
+
+    renderer.max_age = 0.0
+    assert 'timecard_ptp_offset_nanoseconds{device_id="ocp0"} 6.0' in renderer.render().decode()
+    assert renderer.stats()['renders'] == 2 and renderer.stats()['cache_hits'] == 1
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Тесты клиента управления ptp4l на локальном имитаторе UNIX сокета
+"""
+
+import socket
+import struct
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent / 'api'))
+
+import ptp_management as pm
+
+CLOCK = bytes.fromhex('001122fffe334455')
+GRANDMASTER = bytes.fromhex('aabbccfffeddeeff')
+
+REPLIES = {
+    pm.CURRENT_DATA_SET: [pm.DATA_SETS[pm.CURRENT_DATA_SET].pack(1, -12 * 65536, 1500 * 65536 + 32768)],
+    pm.PARENT_DATA_SET: [pm.DATA_SETS[pm.PARENT_DATA_SET].pack(GRANDMASTER, 1, 0, 0xffff, 0x7fffffff,
+                                                               128, 6, 0x21, 0x4e5d, 128, GRANDMASTER)],
+    pm.PORT_DATA_SET: [pm.DATA_SETS[pm.PORT_DATA_SET].pack(CLOCK, port, state, 0, 0, 1, 3, 0, 1, 0, 2)
+                       for port, state in ((1, 9), (2, 6))],
+    pm.TIME_STATUS_NP: [pm.DATA_SETS[pm.TIME_STATUS_NP].pack(-11, 0, 0, 0, 0, bytes(12), 1, GRANDMASTER)],
+}
+
+
+class FakePtp4l:
+    """Имитатор сокета ptp4l: отвечает на GET из таблицы REPLIES"""
+
+    def __init__(self, path, errors=()):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(path)
+        self.errors = errors
+        self.requests = []
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        while True:
+            try:
+                message, client = self.sock.recvfrom(1024)
+            except OSError:
+                return
+            header = pm.PTP_HEADER.unpack_from(message)
+            _, _, management_id = pm.TLV_HEADER.unpack_from(message, pm.PTP_HEADER.size + pm.MANAGEMENT_HEADER.size)
+            action = pm.MANAGEMENT_HEADER.unpack_from(message, pm.PTP_HEADER.size)[4] & 0x0f
+            self.requests.append((management_id, action, len(message)))
+            if management_id in self.errors:
+                reply = bytearray(pm.build_message(management_id, header[9], pm.ACTION_RESPONSE,
+                                                   struct.pack('>H4x', management_id)))
+                struct.pack_into('>HHH', reply, pm.PTP_HEADER.size + pm.MANAGEMENT_HEADER.size,
+                                 pm.TLV_MANAGEMENT_ERROR_STATUS, 8, 0x0006)
+                self.sock.sendto(bytes(reply), client)
+                continue
+            for data in REPLIES[management_id]:
+                self.sock.sendto(pm.build_message(management_id, header[9], pm.ACTION_RESPONSE, data), client)
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def ptp4l(tmp_path):
+    fake = FakePtp4l(str(tmp_path / 'ptp4l'), errors=(pm.PARENT_DATA_SET,))
+    yield fake
+    fake.close()
+
+
+def test_poll_reads_data_sets(ptp4l, tmp_path):
+    """Один опрос: offsetFromMaster, meanPathDelay, порты и TIME_STATUS_NP"""
+    client = pm.PMCClient(str(tmp_path / 'ptp4l'), str(tmp_path / 'pmc'), timeout=1.0)
+    try:
+        status = client.poll()
+        status = client.poll()
+    finally:
+        client.close()
+
+    assert status['running']
+    assert status['current_data_set'] == {'steps_removed': 1, 'offset_from_master_ns': -12.0,
+                                          'mean_path_delay_ns': 1500.5}
+    assert status['ports']['1']['port_state'] == 'SLAVE' and status['ports']['2']['port_state'] == 'MASTER'
+    assert status['time_status_np']['gm_present'] and status['time_status_np']['master_offset_ns'] == -11
+    assert status['time_status_np']['gm_identity'] == 'aabbcc.fffe.ddeeff'
+    assert status['errors'] == {'parent_data_set': 'NOT_SUPPORTED'}
+    # GET с нулевым полем данных во всю длину набора, как у pmc
+    assert (pm.CURRENT_DATA_SET, 0, 34 + 14 + 6 + 18) in ptp4l.requests
+    assert pm.servo_values(status) == {'offset_from_master_ns': -12.0, 'mean_path_delay_ns': 1500.5,
+                                       'master_offset_ns': -11, 'port_state': 'SLAVE'}
+    assert client.stats() == {'polls': 2, 'errors': 0}
+
+
+def test_latest_reuses_recent_poll(ptp4l, tmp_path):
+    """Свежий результат опроса переиспользуется, устаревший - опрашивается заново"""
+    client = pm.PMCClient(str(tmp_path / 'ptp4l'), str(tmp_path / 'pmc'), timeout=1.0)
+    try:
+        status = client.poll()
+        requests = len(ptp4l.requests)
+        assert client.latest(max_age=60.0) is status
+        assert len(ptp4l.requests) == requests
+        refreshed = client.latest(max_age=0.0)
+    finally:
+        client.close()
+    assert refreshed is not status and refreshed['running']
+    assert client.stats() == {'polls': 2, 'errors': 0}
+
+
+def test_poll_without_ptp4l(tmp_path):
+    """Нет сокета ptp4l - running = False и текст ошибки"""
+    client = pm.PMCClient(str(tmp_path / 'ptp4l'), str(tmp_path / 'pmc'), timeout=0.05)
+    try:
+        status = client.poll()
+    finally:
+        client.close()
+    assert not status['running'] and status['error']
+    assert client.stats()['errors'] == 1
+    assert not (tmp_path / 'pmc').exists()
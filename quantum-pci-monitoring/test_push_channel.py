@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Тесты рассылки снимков дельтами по WebSocket комнатам
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / 'api'))
+
+from push_channel import PushChannel
+from snapshot_cache import SnapshotCache
+
+
+class RecordingSocketIO:
+    """Заглушка SocketIO, запоминающая отправленные кадры"""
+
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, event, data, to=None):
+        self.emitted.append((event, data, to))
+
+
+def test_deltas_carry_only_changed_fields():
+    """Кадр содержит только изменения, неизменный снимок не отправляется"""
+    socketio = RecordingSocketIO()
+    snapshots = SnapshotCache()
+    push = PushChannel(socketio, snapshots)
+
+    snapshots.update('device:ocp0', {'ptp': {'offset_ns': 10, 'tod': 1}, 'timestamp': 1.0})
+    snapshots.update('device:ocp0', {'ptp': {'offset_ns': 10, 'tod': 1}, 'timestamp': 2.0})
+    snapshots.update('device:ocp0', {'ptp': {'offset_ns': 12}, 'timestamp': 3.0})
+    assert socketio.emitted == [] and push.flush() == 2
+
+    frames = [data for event, data, to in socketio.emitted]
+    assert [event for event, data, to in socketio.emitted] == ['delta', 'delta']
+    assert all(to == 'device:ocp0' for event, data, to in socketio.emitted)
+    assert [frame['seq'] for frame in frames] == [1, 2]
+    assert frames[1]['changes'] == [[['ptp', 'offset_ns'], 12]]
+    assert frames[1]['removed'] == [['ptp', 'tod']]
+    assert push.stats()['frames_suppressed'] == 1
+
+    resync = push.resync_frame('device:ocp0')
+    assert resync['seq'] == 2 and resync['data']['timestamp'] == 3.0
+    assert push.expand_keys(['device:*', 'sensor:bmp280', 'other']) == ['device:ocp0', 'sensor:bmp280']
+
+
+def test_phc_snapshots_have_rooms():
+    """Снимки phc:<id> публикуются в комнаты, на которые можно подписаться"""
+    socketio = RecordingSocketIO()
+    snapshots = SnapshotCache()
+    push = PushChannel(socketio, snapshots)
+
+    snapshots.update('phc:ocp0', {'peers': {'sys': {'offset_ns': 35, 'delay_ns': 410}}, 'timestamp': 1.0})
+    assert push.expand_keys(['phc:*', 'phc:ocp1']) == ['phc:ocp0', 'phc:ocp1']
+    assert push.flush() == 1
+    assert socketio.emitted[0][2] == 'phc:ocp0'
+
+
+def test_unchanged_alert_set_is_suppressed():
+    """Время алертов в списке не считается изменением, новый алерт - считается"""
+    socketio = RecordingSocketIO()
+    snapshots = SnapshotCache()
+    push = PushChannel(socketio, snapshots)
+
+    gnss_lost = {'type': 'gnss_sync_lost', 'severity': 'critical', 'message': 'GNSS: LOST'}
+    for cycle in range(3):
+        snapshots.update('device:ocp0', {'alerts': [dict(gnss_lost, timestamp=100.0 + cycle)],
+                                         'timestamp': 100.0 + cycle})
+    snapshots.update('device:ocp0', {'alerts': [dict(gnss_lost, timestamp=103.0),
+                                                {'type': 'ptp_offset_warning', 'severity': 'warning',
+                                                 'message': 'PTP offset', 'timestamp': 103.0}],
+                                     'timestamp': 103.0})
+    assert push.flush() == 2
+    assert push.stats()['frames_suppressed'] == 2
+
+    (path, alerts), = socketio.emitted[1][1]['changes']
+    assert path == ['alerts'] and [alert['type'] for alert in alerts] == ['gnss_sync_lost', 'ptp_offset_warning']
+    assert alerts[1]['timestamp'] == 103.0
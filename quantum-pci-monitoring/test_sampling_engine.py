@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Тесты планировщика источников на asyncio
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / 'api'))
+
+from sampling_engine import SamplingEngine
+
+
+def test_hung_source_does_not_delay_others():
+    """Зависший датчик получает таймаут и пропуски, быстрый источник работает по графику"""
+    release = threading.Event()
+    engine = SamplingEngine(jitter=0.0)
+    fast = engine.add_source('offset:ocp0', lambda: None, 0.01, timeout=0.5)
+    hung = engine.add_source('sensor:bmp280', lambda: release.wait(5), 0.02, timeout=0.05)
+
+    engine.start()
+    time.sleep(0.4)
+    release.set()
+    engine.stop()
+
+    assert fast.runs >= 20 and fast.timeouts == 0
+    assert hung.timeouts == 1 and hung.skipped >= 5 and hung.runs == 0
+    assert engine.stats()['sensor:bmp280']['last_error'].startswith('timeout')
+
+
+def test_fixed_rate_cadence_and_missed_deadlines():
+    """Время чтения не сдвигает период, долгие чтения учитываются как пропуски"""
+    engine = SamplingEngine(jitter=0.0)
+    # Запас 48 мс на периоде 50 мс: дрожание пула потоков и GIL не дает пропусков
+    steady = engine.add_source('sensor:ina219', lambda: time.sleep(0.002), 0.05)
+    slow = engine.add_source('sensor:bno055', lambda: time.sleep(0.12), 0.05)
+
+    engine.start()
+    time.sleep(0.8)
+    engine.stop()
+
+    assert steady.deadlines_missed == 0
+    assert abs(steady.actual_period() - 0.05) < 0.005
+    assert slow.deadlines_missed >= 5
+    stats = engine.stats()['sensor:ina219']
+    assert stats['latency_seconds']['p50'] >= 0.002
+    assert stats['lateness_seconds']['max'] < 0.05
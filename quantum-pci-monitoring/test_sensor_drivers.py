@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Тесты нативных драйверов BMP280 и BNO055 на эмулированной шине
+"""
+
+import struct
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / 'api'))
+
+import i2c_bus
+from i2c_bus import FakeI2CBus, MUX_ADDRESS
+
+# Пример расчета из даташита BMP280 (значения давления там получены
+# формулой с плавающей точкой, целочисленная отличается на сотые Па)
+DATASHEET_TRIM = (27504, 26435, -1000, 36477, -10685, 3024, 2855, 140, -7, 15500, -14600, 6000)
+DATASHEET_ADC_T = 519888
+DATASHEET_ADC_P = 415148
+
+
+def make_bus():
+    bus = FakeI2CBus(1)
+    bus.add_device(MUX_ADDRESS)
+    i2c_bus.set_bus(1, bus)
+    return bus
+
+
+def add_bmp280(bus):
+    registers = {0xD0: 0x58}
+    for offset, value in enumerate(struct.pack('<HhhHhhhhhhhh', *DATASHEET_TRIM)):
+        registers[0x88 + offset] = value
+    raw = [DATASHEET_ADC_P >> 12, (DATASHEET_ADC_P >> 4) & 0xFF, (DATASHEET_ADC_P & 0x0F) << 4,
+           DATASHEET_ADC_T >> 12, (DATASHEET_ADC_T >> 4) & 0xFF, (DATASHEET_ADC_T & 0x0F) << 4]
+    for offset, value in enumerate(raw):
+        registers[0xF7 + offset] = value
+    bus.add_device(0x76, registers)
+
+
+def test_bmp280_compensation_matches_datasheet():
+    """Целочисленная компенсация дает значения из примера даташита"""
+    from bmp280_driver import compensate
+    names = ['dig_T1', 'dig_T2', 'dig_T3', 'dig_P1', 'dig_P2', 'dig_P3',
+             'dig_P4', 'dig_P5', 'dig_P6', 'dig_P7', 'dig_P8', 'dig_P9']
+    reading = compensate(DATASHEET_ADC_T, DATASHEET_ADC_P, dict(zip(names, DATASHEET_TRIM)))
+    assert reading['temperature_c'] == 25.08
+    assert abs(reading['pressure_pa'] - 100653.27) < 0.05
+
+
+def test_bmp280_calibration_is_cached():
+    """Повторное измерение - одно блочное чтение данных без перечитывания калибровки"""
+    bus = make_bus()
+    add_bmp280(bus)
+
+    from bmp280_monitor import BMP280Monitor
+    monitor = BMP280Monitor()
+    first = monitor.get_sensor_data()
+    assert first['available'] and first['temperature_c'] == 25.08
+
+    bus.transactions.clear()
+    assert monitor.get_sensor_data()['available']
+    assert bus.transactions == [('read_i2c_block_data', 0x76, 0xF7)]
+
+
+def test_bno055_reads_one_block():
+    """Все данные BNO055 читаются одной транзакцией 0x08..0x3E"""
+    bus = make_bus()
+    registers = {0x00: 0xA0, 0x3D: 0x0C, 0x34: 31, 0x35: 0b11100111}
+    for offset, value in enumerate(struct.pack('<hhh', 1600, -160, 320)):
+        registers[0x1A + offset] = value
+    bus.add_device(0x29, registers)
+
+    from bno055_monitor import BNO055Monitor
+    monitor = BNO055Monitor()
+    assert monitor.is_available()
+
+    bus.transactions.clear()
+    result = monitor.get_sensor_data()
+    assert bus.transactions == [('read_block', 0x29, 0x08)]
+    data = result['data']
+    assert data['euler_angles'] == {'heading': 100.0, 'roll': -10.0, 'pitch': 20.0}
+    assert data['temperature'] == 31
+    assert data['calibration_status'] == {'system': 3, 'gyro': 2, 'accel': 1, 'mag': 3}
+    assert data['operation_mode'] == 'NDOF'
+
+
+def test_bno055_availability_is_cached_with_backoff():
+    """Недоступный BNO055 не опрашивается повторно до истечения паузы"""
+    bus = make_bus()
+
+    from bno055_monitor import BNO055Monitor
+    monitor = BNO055Monitor(probe_backoff=60.0)
+    assert not monitor.is_available()
+
+    bus.add_device(0x29, {0x00: 0xA0, 0x3D: 0x0C})
+    bus.transactions.clear()
+    assert not monitor.is_available()
+    assert monitor.get_calibration_status()['available'] is False
+    assert bus.transactions == []
+
+    # После паузы датчик перепроверяется, калибровка и режим - из одного чтения
+    monitor.next_probe = 0.0
+    assert monitor.is_available()
+    bus.transactions.clear()
+    assert monitor.get_calibration_status()['available']
+    assert monitor.get_operation_mode()['mode']['operation_mode'] == 'NDOF'
+    assert len(bus.transactions) == 1
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Тесты версионированного кэша снимков
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / 'api'))
+
+from snapshot_cache import SnapshotCache
+
+
+def test_update_bumps_versions_and_notifies_listeners():
+    """Версия ключа и общая версия растут с каждой записью, подписчик видит запись"""
+    snapshots = SnapshotCache()
+    seen = []
+    snapshots.add_listener(lambda key, entry: seen.append((key, entry['version'])))
+
+    assert snapshots.update('device:ocp0', {'offset_ns': 1}) == 1
+    assert snapshots.update('sensor:bmp280', {'available': False}) == 1
+    assert snapshots.update('device:ocp0', {'offset_ns': 2}) == 2
+
+    entry = snapshots.get('device:ocp0')
+    assert entry['data'] == {'offset_ns': 2} and entry['global_version'] == 3
+    assert snapshots.version == 3
+    assert seen == [('device:ocp0', 1), ('sensor:bmp280', 1), ('device:ocp0', 2)]
+    assert snapshots.keys('device:') == ['device:ocp0']
+    assert snapshots.get('device:ocp1') is None
+
+
+def test_metadata_marks_stale_entries():
+    """Снимок старше stale_after помечается stale, порог можно задать на ключ"""
+    snapshots = SnapshotCache(stale_after=15.0)
+    now = time.time()
+    snapshots.update('device:ocp0', {}, timestamp=now - 1.0)
+    snapshots.update('network:ptp', {}, timestamp=now - 20.0, source='fresh')
+    snapshots.update('network:stats', {}, timestamp=now - 20.0, stale_after=60.0)
+
+    fresh = snapshots.metadata(snapshots.get('device:ocp0'))
+    assert not fresh['stale'] and 1.0 <= fresh['age_seconds'] < 2.0
+    assert fresh['version'] == 1 and fresh['source'] == 'sampler'
+
+    stale = snapshots.metadata(snapshots.get('network:ptp'))
+    assert stale['stale'] and stale['source'] == 'fresh'
+    assert not snapshots.metadata(snapshots.get('network:stats'))['stale']
+
+
+def test_fresh_bypass_refreshes_entry():
+    """Кэшированный снимок читается без опроса, fresh=True и пустой кэш опрашивают источник"""
+    snapshots = SnapshotCache()
+    reads = []
+
+    def refresh():
+        reads.append(len(reads) + 1)
+        snapshots.update('sensor:ina219', {'read': reads[-1]}, source='fresh')
+
+    entry = snapshots.get_or_refresh('sensor:ina219', refresh)
+    assert entry['data'] == {'read': 1} and entry['source'] == 'fresh'
+    assert snapshots.get_or_refresh('sensor:ina219', refresh)['version'] == 1
+
+    entry = snapshots.get_or_refresh('sensor:ina219', refresh, fresh=True)
+    assert entry['data'] == {'read': 2} and entry['version'] == 2
+    assert reads == [1, 2]
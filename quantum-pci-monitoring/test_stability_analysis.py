@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Тесты ADEV/MDEV/TDEV/MTIE по ряду offset
+"""
+
+import math
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / 'api'))
+
+from stability_analysis import StabilityAccumulator, analyze, tau_ladder, uniform_phase
+
+
+def white_fm_phase(count, sigma=1e-9, seed=5):
+    """Фаза при белом частотном шуме: ADEV(τ) = sigma / sqrt(τ) при τ0 = 1 с"""
+    rng = random.Random(seed)
+    phase, x = [], 0.0
+    for _ in range(count):
+        x += rng.gauss(0, sigma)
+        phase.append(x)
+    return phase
+
+
+def test_incremental_matches_batch_and_theory():
+    """Инкрементальная оценка совпадает с пересчетом ряда, ADEV соответствует шуму"""
+    phase = white_fm_phase(6000)
+    ms = tau_ladder(100)
+    batch = analyze(phase, 1.0, ms)
+
+    accumulator = StabilityAccumulator(1.0, ms)
+    for value in phase:
+        accumulator.append(value)
+    running = accumulator.results()
+
+    for column in ('adev', 'mdev', 'tdev_seconds', 'mtie_seconds'):
+        for incremental, full in zip(running[column], batch[column]):
+            assert math.isclose(incremental, full, rel_tol=1e-9)
+    for tau, adev in zip(batch['tau_seconds'], batch['adev']):
+        assert abs(adev * math.sqrt(tau) / 1e-9 - 1.0) < 0.15
+    # Для белого FM отношение MDEV/ADEV стремится к 1/sqrt(2)
+    assert abs(batch['mdev'][-1] / batch['adev'][-1] - 1 / math.sqrt(2)) < 0.1
+    assert batch['mtie_seconds'] == sorted(batch['mtie_seconds'])
+
+
+def test_gaps_are_interpolated_or_restart_the_series():
+    """Короткий пропуск интерполируется, длинный начинает участок заново"""
+    assert uniform_phase([0, 1, 3], [0, 10, 30], 1.0, scale=1) == [0, 10, 20, 30]
+    assert uniform_phase([0, 1, 20, 21], [0, 10, 30, 40], 1.0, max_gap=5, scale=1) == [30, 40]
+
+    accumulator = StabilityAccumulator(1.0, [1], max_gap=2)
+    for timestamp in (0.0, 0.5, 1.0, 3.0, 10.0):
+        accumulator.add(timestamp, timestamp)
+    assert accumulator.count == 1 and accumulator.restarts == 1
+    assert analyze([], 1.0, [1])['adev'] == [None]
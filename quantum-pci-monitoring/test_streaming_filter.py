@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Тесты потоковой фильтрации показаний INA219
+"""
+
+import math
+import random
+import statistics
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / 'api'))
+
+from streaming_filter import HampelFilter, RunningMedian, RunningStats, filter_batch
+
+
+def test_running_statistics_match_full_window():
+    """Скользящие медиана, MAD, среднее и дисперсия совпадают с пересчетом окна"""
+    rng = random.Random(11)
+    for window in (1, 4, 7):
+        median, stats, values = RunningMedian(window), RunningStats(window), []
+        for _ in range(300):
+            value = round(rng.gauss(3.3, 0.05), 3)
+            median.add(value)
+            stats.add(value)
+            values.append(value)
+            recent = values[-window:]
+            center = statistics.median(recent)
+            assert median.median() == center
+            assert math.isclose(median.mad(), statistics.median(abs(v - center) for v in recent), abs_tol=1e-12)
+            assert math.isclose(stats.mean, statistics.mean(recent), abs_tol=1e-9)
+            if len(recent) > 1:
+                assert math.isclose(stats.variance(), statistics.variance(recent), rel_tol=1e-6, abs_tol=1e-12)
+
+
+def test_hampel_rejects_glitches_and_batch_replays_identically():
+    """Ложные показания отбрасываются, пакетный режим дает тот же результат"""
+    rng = random.Random(3)
+    values = [rng.choice([0.268, 32.012, 3.95]) if rng.random() < 0.1 else rng.gauss(3.3, 0.01)
+              for _ in range(2000)]
+    hampel = HampelFilter(window_size=25, valid_range=(2.5, 4.0), min_deviation=0.05, initial=3.3)
+    streamed = [hampel.filter_voltage(value) for value in values]
+    assert all(abs(value - 3.3) < 0.05 for value, _, _ in streamed)
+    assert hampel.rejected == sum(not valid for _, valid, _ in streamed) > 0
+
+    replayed, valid = filter_batch(values, window_size=25, valid_range=(2.5, 4.0), min_deviation=0.05, initial=3.3)
+    assert valid == [ok for _, ok, _ in streamed]
+    assert all(math.isclose(a, b, abs_tol=1e-9) for a, b in zip(replayed, (value for value, _, _ in streamed)))
+
+
+def test_hampel_shared_between_threads_keeps_window_consistent():
+    """Один фильтр из нескольких потоков: упорядоченное окно и среднее не расходятся с выборками"""
+    hampel = HampelFilter(window_size=7, valid_range=(2.5, 4.0), min_deviation=0.05, initial=3.3)
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        def feed(seed):
+            rng = random.Random(seed)
+            for _ in range(3000):
+                hampel.filter_voltage(rng.gauss(3.3, 0.01))
+                hampel.state()
+        threads = [threading.Thread(target=feed, args=(seed,)) for seed in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert hampel.median._sorted == sorted(hampel.median._values)
+    assert len(hampel.stats) == 7
+    assert math.isclose(hampel.stats.mean, statistics.mean(hampel.stats._values), abs_tol=1e-9)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Тесты чтения sysfs атрибутов через постоянные дескрипторы
+"""
+
+import errno
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / 'api'))
+
+import sysfs_reader
+from sysfs_reader import SysfsAttributeReader
+
+
+def make_device(tmp_path):
+    """Каталог с атрибутами в формате /sys/class/timecard/ocpN"""
+    attributes = {
+        'serialnum': 'QPCI-0001\n',
+        'available_clock_sources': 'NONE PPS GNSS MAC\n',
+        'clock_status_offset': '12\n',
+        'clock_status_drift': '-3\n',
+        'gnss_sync': 'SYNC\n',
+        'clock_source': 'GNSS\n',
+    }
+    for name, value in attributes.items():
+        (tmp_path / name).write_text(value)
+    return tmp_path
+
+
+def test_dynamic_attributes_reread_through_same_descriptor(tmp_path):
+    """Повторное чтение видит новое значение без повторного open()"""
+    device = make_device(tmp_path)
+    reader = SysfsAttributeReader(str(device))
+
+    assert reader.read_dynamic() == {
+        'clock_status_offset': '12',
+        'clock_status_drift': '-3',
+        'gnss_sync': 'SYNC',
+        'clock_source': 'GNSS',
+    }
+    fd = reader._fds['clock_status_offset']
+
+    (device / 'clock_status_offset').write_text('-250\n')
+    assert reader.read('clock_status_offset') == '-250'
+    assert reader._fds['clock_status_offset'] == fd
+    reader.close()
+
+
+def test_static_and_missing_attributes_are_cached(tmp_path):
+    """Статические атрибуты читаются один раз, отсутствие атрибута кэшируется"""
+    device = make_device(tmp_path)
+    reader = SysfsAttributeReader(str(device))
+
+    assert reader.read('serialnum') == 'QPCI-0001'
+    (device / 'serialnum').write_text('CHANGED\n')
+    assert reader.read('serialnum') == 'QPCI-0001'
+    assert 'serialnum' not in reader._fds
+
+    assert reader.read('tod_correction') is None
+    (device / 'tod_correction').write_text('0\n')
+    assert reader.read('tod_correction') is None
+    assert not reader.exists('temperature_table')
+    reader.close()
+
+
+def test_open_errors_and_recheck_of_missing_attributes(tmp_path, monkeypatch):
+    """Ошибка open() - None вместо исключения; недоступный атрибут проверяется снова"""
+    device = make_device(tmp_path)
+    reader = SysfsAttributeReader(str(device), missing_recheck=60.0)
+    real_open = os.open
+
+    def denied(path, flags, *args):
+        if path.endswith('clock_status_offset'):
+            raise PermissionError(errno.EACCES, 'Permission denied', path)
+        return real_open(path, flags, *args)
+
+    monkeypatch.setattr(sysfs_reader.os, 'open', denied)
+    assert reader.read_many(['clock_status_offset', 'clock_status_drift']) == {
+        'clock_status_offset': None, 'clock_status_drift': '-3'}
+    monkeypatch.setattr(sysfs_reader.os, 'open', real_open)
+    assert reader.read('clock_status_offset') is None
+
+    # Атрибут появился после загрузки драйвера: виден после истечения срока
+    (device / 'tod_correction').write_text('7\n')
+    clock = [sysfs_reader.time.monotonic()]
+    monkeypatch.setattr(sysfs_reader.time, 'monotonic', lambda: clock[0])
+    reader._missing['tod_correction'] = clock[0] + 60.0
+    assert reader.read('tod_correction') is None
+    clock[0] += 61.0
+    assert reader.read('tod_correction') == '7'
+    assert reader.read('clock_status_offset') == '12'
+    reader.close()
+
+
+def test_enodev_resets_static_values(tmp_path, monkeypatch):
+    """ENODEV при чтении (перезагрузка драйвера) - статические атрибуты читаются заново"""
+    device = make_device(tmp_path)
+    reader = SysfsAttributeReader(str(device))
+    assert reader.read('serialnum') == 'QPCI-0001'
+    assert reader.read('clock_status_offset') == '12'
+    (device / 'serialnum').write_text('QPCI-0002\n')
+
+    real_pread = os.pread
+    def unbound(fd, size, offset):
+        raise OSError(errno.ENODEV, 'No such device')
+    monkeypatch.setattr(sysfs_reader.os, 'pread', unbound)
+    assert reader.read('clock_status_offset') is None
+    assert 'clock_status_offset' not in reader._fds
+
+    monkeypatch.setattr(sysfs_reader.os, 'pread', real_pread)
+    assert reader.read('serialnum') == 'QPCI-0002'
+    assert reader.read('clock_status_offset') == '12'
+    reader.close()
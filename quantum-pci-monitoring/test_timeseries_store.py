@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Тесты хранилища временных рядов на SQLite
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent / 'api'))
+
+from timeseries_store import TimeSeriesStore
+
+DAY = 86400
+# 2024-01-01 23:59:50 UTC - рядом с границей суточных сегментов
+T0 = 1704153590.0
+
+
+def test_range_query_spans_daily_segments(tmp_path):
+    """Точки по обе стороны полуночи попадают в разные сегменты и читаются вместе"""
+    store = TimeSeriesStore(str(tmp_path))
+    for i in range(20):
+        store.append('device.ocp0.offset_ns', T0 + i, i * 10)
+    store.append('device.ocp0.gnss_sync', T0, 'SYNC')
+
+    assert store.flush() == 21
+    assert store.segments() == ['2024-01-01', '2024-01-02']
+
+    points = store.query('device.ocp0.offset_ns', T0 + 5, T0 + 14)
+    assert [value for _, value in points] == [50.0, 60.0, 70.0, 80.0, 90.0,
+                                              100.0, 110.0, 120.0, 130.0, 140.0]
+    assert store.query('device.ocp0.gnss_sync', T0, T0 + 1) == [(T0, 'SYNC')]
+    assert store.series('device.') == ['device.ocp0.gnss_sync', 'device.ocp0.offset_ns']
+    store.close()
+
+    # Данные переживают перезапуск процесса
+    reopened = TimeSeriesStore(str(tmp_path))
+    assert len(reopened.query('device.ocp0.offset_ns', T0, T0 + DAY)) == 20
+    reopened.close()
+
+
+def test_retention_removes_old_segments(tmp_path):
+    """Сегменты старше retention_days удаляются целиком"""
+    store = TimeSeriesStore(str(tmp_path), retention_days=2)
+    for day in range(5):
+        store.append('sensor.bmp280.temperature_c', T0 + 20 + day * DAY, 25.0 + day)
+    store.flush()
+
+    removed = store.apply_retention(now=T0 + 20 + 4 * DAY)
+    assert removed == ['2024-01-02', '2024-01-03']
+    assert store.segments() == ['2024-01-04', '2024-01-05', '2024-01-06']
+    assert not list(tmp_path.glob('2024-01-02*'))
+    store.close()
+
+
+def test_failed_flush_keeps_rows_and_closes_transaction(tmp_path):
+    """Ошибка записи возвращает точки в буфер, а следующая запись проходит"""
+    store = TimeSeriesStore(str(tmp_path), max_pending=4)
+    store.append('device.ocp0.offset_ns', T0, 1)
+    store.append('device.ocp0.offset_ns', T0 + 1, {'bad': 'value'})
+    store.append('device.ocp0.offset_ns', T0 + 2, 3)
+
+    original = store._series_id
+    def failing_series_id(day, connection, name):
+        raise sqlite3.OperationalError('database is locked')
+    store._series_id = failing_series_id
+    with pytest.raises(sqlite3.OperationalError):
+        store.flush()
+    # Неконвертируемая точка отброшена, остальные ждут следующей записи
+    assert store.dropped == 1
+    assert len(store._buffer) == 2
+
+    # Буфер ограничен: при переполнении вытесняются самые старые точки
+    store.append_many(T0 + 3, {'device.ocp0.a': 1, 'device.ocp0.b': 2, 'device.ocp0.c': 3})
+    with pytest.raises(sqlite3.OperationalError):
+        store.flush()
+    assert store.dropped == 2
+    assert [row[1] for row in store._buffer] == [T0 + 2, T0 + 3, T0 + 3, T0 + 3]
+
+    store._series_id = original
+    assert store.flush() == 4
+    assert store.query('device.ocp0.offset_ns', T0, T0 + 10) == [(T0 + 2, 3.0)]
+    store.close()
+
+
+def test_reads_serve_committed_rows_when_flush_fails(tmp_path):
+    """Ошибка записи буфера не ломает чтение: отдаются зафиксированные точки"""
+    store = TimeSeriesStore(str(tmp_path))
+    store.append('device.ocp0.offset_ns', T0, 1)
+    store.flush()
+    store.append('device.ocp0.offset_ns', T0 + 1, 2)
+
+    original = store._series_id
+    def failing_series_id(day, connection, name):
+        raise sqlite3.OperationalError('database or disk is full')
+    store._series_id = failing_series_id
+    assert store.query('device.ocp0.offset_ns', T0, T0 + 10) == [(T0, 1.0)]
+    assert store.series() == ['device.ocp0.offset_ns']
+    assert len(store._buffer) == 1
+
+    store._series_id = original
+    assert store.query('device.ocp0.offset_ns', T0, T0 + 10) == [(T0, 1.0), (T0 + 1, 2.0)]
+    store.close()
+
+
+def test_wide_range_query_is_bucketed(tmp_path):
+    """Диапазон 0..9999 год не перебирает дни, а шаг оставляет последнюю точку корзины"""
+    store = TimeSeriesStore(str(tmp_path))
+    for i in range(20):
+        store.append('device.ocp0.offset_ns', T0 + i, i)
+    store.flush()
+
+    assert len(store.query('device.ocp0.offset_ns', 0, 253402300799)) == 20
+    # Корзины по 5 секунд от T0, в том числе через полночь (T0 + 10)
+    points = store.query('device.ocp0.offset_ns', T0, T0 + 19, step=5)
+    assert points == [(T0 + 4, 4.0), (T0 + 9, 9.0), (T0 + 14, 14.0), (T0 + 19, 19.0)]
+    store.close()